@@ -28,6 +28,7 @@ from .singleton      import Singleton
 from .heartbeat      import Heartbeat, PWatcher
 from .threads        import is_main_thread, is_this_thread, cancel_main_thread
 from .threads        import main_thread, this_thread, get_thread_name, gettid
+from .threads        import get_thread_info
 from .threads        import set_cancellation_handler, unset_cancellation_handler
 from .threads        import raise_in_thread, ThreadExit, SignalRaised
 from .futures        import Future
@@ -64,7 +65,7 @@ from .zmq            import Message
 from .zmq            import Bridge
 from .zmq            import Queue,  Putter,    Getter
 from .zmq            import PubSub, Publisher, Subscriber
-from .zmq            import Server, Client
+from .zmq            import Server, Client, AsyncClient
 
 from .flux           import FluxService, FluxHelper
 
@@ -74,8 +75,11 @@ from .reporter       import Reporter
 from .profile        import Profiler, timestamp, event_to_label
 from .profile        import read_profiles, combine_profiles, clean_profile
 from .profile        import TIME, EVENT, COMP, TID, UID, STATE, MSG, ENTITY
-from .profile        import PROF_KEY_MAX
+from .profile        import PROF_KEY_MAX, PROF_FMT_CSV, PROF_FMT_BIN
+from .profile        import is_binary_profile, ProfileStream, index_profile
+from .profile        import follow_profiles
 from .profile        import Yappi
+from .profile_columns import ProfileColumns
 
 from .json_io        import read_json, read_json_str, write_json
 from .json_io        import parse_json, parse_json_str, dumps_json
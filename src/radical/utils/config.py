@@ -441,6 +441,8 @@ class DefaultConfig(Config, metaclass=DefaultConfigMeta):
         'report_dir' : str,
         'profile'    : bool,
         'profile_dir': str,
+        'profile_sample': str,
+        'profile_rate'  : str,
         'iface'      : list,
     }
 
@@ -55,6 +55,7 @@ from   .misc      import get_env_ns       as ru_get_env_ns
 from   .modules   import import_module    as ru_import_module
 from   .config    import DefaultConfig
 from   .singleton import Singleton
+from   .threads   import get_thread_info  as ru_get_thread_info
 
 
 CRITICAL = logging.CRITICAL
@@ -382,8 +383,9 @@ class Logger(object):
 
             # also log pid and tid
             try:
-                self._logger.info("%-20s pid/tid: %s/%s", '', os.getpid(),
-                            threading.current_thread().name)
+                tname, tid = ru_get_thread_info()
+                self._logger.info("%-20s pid/tid: %s/%s (%s)", '', os.getpid(),
+                                  tname, tid)
             except:
                 pass
 
@@ -819,10 +819,14 @@ def script_2_func(fpath):
 #
 def ru_open(*args, **kwargs):
     '''
-    ensure that we use UTF8 consistently throughout the stack
+    ensure that we use UTF8 consistently throughout the stack (binary modes
+    are passed through as is)
     '''
 
-    if 'encoding' not in kwargs:
+    if len(args) > 1: mode = args[1]
+    else            : mode = kwargs.get('mode', 'r')
+
+    if 'encoding' not in kwargs and 'b' not in mode:
         kwargs['encoding'] = 'utf8'
 
     return open(*args, **kwargs)
@@ -832,21 +836,28 @@ def ru_open(*args, **kwargs):
 #
 def find_port(port_min=10000, port_max=65535):
     '''
-    Find a free port in the given range.  The range defaults to 10000-65535.
-    Returns `None` if no free port could be found.
+    Find the lowest free port in the given range.  The range defaults to
+    10000-65535.  Returns `None` if no free port could be found.
+
+    Note that the port is released again before this method returns, and may be
+    taken by some other process by the time it is used.  Where possible, bind
+    to port `0` (or use `ru.zmq.utils.zmq_bind()`) and let the OS pick a port.
     '''
 
-    for port in range(port_min, port_max):
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        try:
-            sock.bind(('', port))
-            return port
+    # a socket whose `bind` failed remains unbound and can be reused for the
+    # next port
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        for port in range(port_min, port_max):
+            try:
+                sock.bind(('', port))
+                return port
 
-        except socket.error:
-            pass
+            except socket.error:
+                pass
 
-        finally:
-            sock.close()
+    finally:
+        sock.close()
 
 
 # ------------------------------------------------------------------------------
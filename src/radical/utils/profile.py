@@ -2,10 +2,20 @@
 
 import os
 import csv
+import glob
+import mmap
 import time
+import heapq
+import struct
+import atexit
+import tempfile
+
+import threading       as mt
+import multiprocessing as mp
 
 from .ids     import get_radical_base
 from .misc    import as_string, as_list, ru_open
+from .serialize import to_msgpack, from_msgpack
 from .misc    import get_env_ns      as ru_get_env_ns
 from .host    import get_hostname    as ru_get_hostname
 from .host    import get_hostip      as ru_get_hostip
@@ -35,6 +45,25 @@ PROF_KEY_MAX = 8  # iteration helper: `for _ in range(PROF_KEY_MAX):`
 # Note that `ENTITY` is not written to the profile, but rather derived from the
 # UID when reading the profiles.
 
+# Profiles can alternatively be stored in a compact binary format (see
+# `Profiler`).  Binary profiles start with a magic string, followed by a
+# sequence of blocks.  Each block consists of a block header (flags, writer pid,
+# number of strings, number of events), the strings newly added to the writer's
+# string table (uint32 length + utf-8 data each), and fixed width event records
+# (float64 time + uint32 string ids for event, comp, thread, uid, state, msg).
+# String ids are assigned in order of appearance, per writer pid - a block with
+# the `PROF_BIN_RESET` flag starts a new string table for that pid.
+#
+PROF_FMT_CSV   = 'csv'
+PROF_FMT_BIN   = 'bin'
+
+PROF_BIN_MAGIC = b'#RUPROF1'
+PROF_BIN_RESET = 1
+
+_BIN_HEADER    = struct.Struct('<BIII')
+_BIN_STRLEN    = struct.Struct('<I')
+_BIN_RECORD    = struct.Struct('<dIIIIII')
+
 # A previous incarnation of this class stored CSVs with the following columns:
 #
 # TIME       = 0  # time of event (float, seconds since epoch)  mandatory
@@ -62,6 +91,26 @@ NTP_CACHE_TIMEOUT = 60  # disk cache is valid for 60 seconds
 # csv parser. We assume a 64bit C long.
 CSV_FIELD_SIZE_LIMIT = 9223372036854775807
 
+# in buffered mode, profile events are collected in memory and written to disk
+# in bulk once the buffer is full, or when an event is recorded more than the
+# given time (in seconds) after the last write.  There is no timer: events of
+# a component which stops recording events remain buffered until the profiler
+# is flushed or closed.
+PROF_BUFFER_SIZE     = 4096
+PROF_BUFFER_INTERVAL = 1.0
+
+# when streaming combined profiles, events of a profile are expected to be out
+# of order by at most this many events
+PROF_MERGE_WINDOW    = 4096
+
+# profile indexes (see `index_profile()`) map uids and entity types to chunks
+# of the profile of about this size (in bytes)
+PROF_INDEX_CHUNK     = 64 * 1024
+PROF_INDEX_VERSION   = 1
+
+# events used for time synchronization across profiles
+_SYNC_EVENTS = ['sync_abs', 'sync_rel']
+
 
 # ------------------------------------------------------------------------------
 #
@@ -122,22 +171,119 @@ def _sync_ntp():
 _profilers = list()
 
 
+# Buffered profilers are drained before fork, so that buffered events are
+# written exactly once (by the parent), and the profiler locks are held over the
+# fork so that the child does not inherit a locked lock.  Binary profilers in
+# the child start a new string table, as the parent's table will continue to
+# grow independently.
+#
 def _atfork_prepare():
-    pass
+    for prof, _ in _profilers:
+        prof._lock.acquire()
+        prof._drain()
 
 
 def _atfork_parent():
-    pass
+    for prof, _ in _profilers:
+        prof._lock.release()
 
 
 def _atfork_child():
     for prof, fname in _profilers:
-        prof._handle = ru_open(fname, 'a', buffering=1024)
+        prof._handle  = ru_open(fname, prof._fmode, buffering=1024)
+        prof._lock    = mt.Lock()
+        prof._bidx    = 0
+        prof._strings = dict()
+        prof._bflags  = PROF_BIN_RESET
 
 
 atfork(_atfork_prepare, _atfork_parent, _atfork_child)
 
 
+# buffered events of profilers which are not explicitly closed would be lost on
+# interpreter shutdown - drain them
+#
+def _atexit_drain():
+    for prof, _ in _profilers:
+        try:
+            prof._drain_locked()
+        except:
+            pass
+
+
+atexit.register(_atexit_drain)
+
+
+# ------------------------------------------------------------------------------
+#
+def _get_buffer_size(setting):
+    '''
+    Convert a buffer setting (constructor argument or env value) into a buffer
+    size (number of events).  `0` disables buffering.
+    '''
+
+    if setting is None or setting is False:
+        return 0
+
+    if setting is True:
+        return PROF_BUFFER_SIZE
+
+    setting = str(setting).strip().lower()
+
+    if setting in ['', '0', 'false', 'off', 'no']:
+        return 0
+
+    if setting in ['1', 'true', 'on', 'yes']:
+        return PROF_BUFFER_SIZE
+
+    return max(0, int(setting))
+
+
+# ------------------------------------------------------------------------------
+#
+def _get_event_limits(setting, conv):
+    '''
+    Convert a per-event limit setting (constructor argument, env value or
+    default config value) into a dict `{event: limit}`.  String settings are
+    of the form `event:limit[,event:limit...]`, `conv` is applied to the
+    limits.
+    '''
+
+    if not setting:
+        return dict()
+
+    if isinstance(setting, dict):
+        return {event: conv(limit) for event, limit in setting.items()}
+
+    ret = dict()
+    for elem in str(setting).split(','):
+
+        elem = elem.strip()
+        if not elem:
+            continue
+
+        if ':' not in elem:
+            raise ValueError('invalid profile limit %s' % elem)
+
+        event, limit = elem.rsplit(':', 1)
+        ret[event.strip()] = conv(limit)
+
+    return ret
+
+
+def _get_sample_stride(fraction):
+    '''
+    convert a sampling rate (fraction of events to record) into a stride: only
+    every n-th event is recorded.
+    '''
+
+    fraction = float(fraction)
+    if not 0.0 < fraction <= 1.0:
+        raise ValueError('invalid profile sampling rate %s' % fraction)
+
+    return max(1, int(round(1.0 / fraction)))
+
+
 # ------------------------------------------------------------------------------
 #
 class Profiler(object):
@@ -170,19 +316,74 @@ class Profiler(object):
 
     If either is present in the environemnt, the profile is enabled (the value
     of the setting is ignored).
+
+    By default, every event is written and flushed to the profile immediately,
+    which keeps profiles complete even if the process crashes.  For high event
+    rates, the profiler can instead collect events in a preallocated in-memory
+    buffer which is written in bulk once it is full, or when an event is
+    recorded more than `PROF_BUFFER_INTERVAL` seconds after the last write.
+    `flush()`, `close()`, `fork()` and the interpreter exit drain the buffer.
+    Buffering is enabled via the `buffer` argument or via the env variables
+
+        RADICAL_UTILS_PROFILE_BUFFER
+        RADICAL_PROFILE_BUFFER
+
+    where a value of `True` selects a buffer of `PROF_BUFFER_SIZE` events and
+    an integer value selects the buffer size (`0` disables buffering).
+
+    Profiles are written as CSV (`PROF_FMT_CSV`) by default.  The `fmt`
+    argument or the env variables
+
+        RADICAL_UTILS_PROFILE_FMT
+        RADICAL_PROFILE_FMT
+
+    can select a compact binary encoding (`PROF_FMT_BIN`) instead, which uses
+    fixed width records and a per-file string table.  `read_profiles()`
+    detects the format of each profile automatically.
+
+    If the `index` argument or the env variables
+
+        RADICAL_UTILS_PROFILE_INDEX
+        RADICAL_PROFILE_INDEX
+
+    are set, `close()` writes an index next to the profile (see
+    `index_profile()`).
+
+    High frequency events can be thinned out per event type.  The `sample`
+    argument or the env variables
+
+        RADICAL_UTILS_PROFILE_SAMPLE
+        RADICAL_PROFILE_SAMPLE
+
+    specify a sampling rate per event (`get:0.1,put:0.1` records every 10th
+    `get` and `put` event), the `rate` argument or the env variables
+
+        RADICAL_UTILS_PROFILE_RATE
+        RADICAL_PROFILE_RATE
+
+    cap the number of recorded events per second (`get:100`).  Both fall back
+    to the `profile_sample` and `profile_rate` settings of the `DefaultConfig`.
+    Events not listed are always recorded.  `close()` records the number of
+    dropped events as `prof_dropped` events, with `msg` set to
+    `<event>:<count>`.
     '''
 
     fields  = ['time', 'event', 'comp', 'thread', 'uid', 'state', 'msg']
 
     # --------------------------------------------------------------------------
     #
-    def __init__(self, name, ns=None, path=None):
+    def __init__(self, name, ns=None, path=None, buffer=None, fmt=None,
+                       index=None, sample=None, rate=None):
         '''
         Open the file handle, sync the clock, and write timestam_zero
         '''
 
         ru_def = DefaultConfig()
 
+        self._handle = None
+        self._bsize  = 0
+        self._fmt    = PROF_FMT_CSV
+
         if not ns:
             ns = name
 
@@ -201,10 +402,59 @@ class Profiler(object):
 
         # profiler is enabled - set properties, sync time, open handle
         self._enabled = True
-        self._handle  = None
         self._path    = path
         self._name    = name
 
+        # check if events should be buffered and written in bulk
+        if buffer is None:
+            buffer = ru_get_env_ns('profile_buffer', ns)
+
+        self._bsize   = _get_buffer_size(buffer)
+        self._lock    = mt.Lock()
+        self._buf     = [None] * self._bsize
+        self._bidx    = 0
+        self._t_drain = time.time()
+
+        # check what profile format to write
+        if fmt is None:
+            fmt = ru_get_env_ns('profile_fmt', ns, PROF_FMT_CSV)
+
+        self._fmt = fmt.lower()
+        if self._fmt not in [PROF_FMT_CSV, PROF_FMT_BIN]:
+            raise ValueError('invalid profile format %s' % fmt)
+
+        if self._fmt == PROF_FMT_BIN: self._fmode = 'ab'
+        else                        : self._fmode = 'a'
+
+        # string table for the binary format: string -> id
+        self._strings = dict()
+        self._bflags  = PROF_BIN_RESET
+
+        # check if an index should be written on close
+        if index is None:
+            index = ru_get_env_ns('profile_index', ns, 'false')
+
+        if isinstance(index, str):
+            index = index.lower() not in ['', '0', 'false', 'off', 'no']
+
+        self._index = bool(index)
+
+        # check if events should be sampled or rate limited
+        if sample is None:
+            sample = ru_get_env_ns('profile_sample', ns,
+                                   ru_def.get('profile_sample'))
+
+        if rate is None:
+            rate = ru_get_env_ns('profile_rate', ns,
+                                 ru_def.get('profile_rate'))
+
+        self._sample  = _get_event_limits(sample, _get_sample_stride)
+        self._rate    = _get_event_limits(rate,   int)
+        self._limited = set(self._sample).union(self._rate)
+        self._counts  = dict()   # event: number of events seen
+        self._windows = dict()   # event: [window start, events in window]
+        self._dropped = dict()   # event: number of dropped events
+
         if not self._path:
             self._path = ru_def['profile_dir']
 
@@ -232,21 +482,28 @@ class Profiler(object):
         # level buffering should still apply.  This is supposed to shield
         # against incomplete profiles.
         fname = '%s/%s.prof' % (self._path, self._name)
-        self._handle = ru_open(fname, 'a', buffering=1024)
+        self._handle = ru_open(fname, self._fmode, buffering=1024)
 
         # register for cleanup after fork
         _profilers.append([self, fname])
 
         # write header and time normalization info
-        self._handle.write('#%s\n' % (','.join(Profiler.fields)))
-        self._handle.write('%.7f,%s,%s,%s,%s,%s,%s\n' %
-                       (self.timestamp(), 'sync_abs', self._name,
-                        ru_get_thread_name(), '', '',
-                        '%s:%s:%s:%s:%s' % (ru_get_hostname(),
-                                            ru_get_hostip(),
-                                            self._ts_zero,
-                                            self._ts_abs,
-                                            self._ts_mode)))
+        sync = (self.timestamp(), 'sync_abs', self._name,
+                ru_get_thread_name(), '', '',
+                '%s:%s:%s:%s:%s' % (ru_get_hostname(),
+                                    ru_get_hostip(),
+                                    self._ts_zero,
+                                    self._ts_abs,
+                                    self._ts_mode))
+
+        if self._fmt == PROF_FMT_BIN:
+            if not self._handle.tell():
+                self._handle.write(PROF_BIN_MAGIC)
+        else:
+            self._handle.write('#%s\n' % (','.join(Profiler.fields)))
+
+        with self._lock:
+            self._handle.write(self._encode([sync]))
 
 
     # --------------------------------------------------------------------------
@@ -273,8 +530,16 @@ class Profiler(object):
 
     # --------------------------------------------------------------------------
     #
-    def enable(self):  self._enabled = True
-    def disable(self): self._enabled = False
+    def enable(self):
+
+        self._enabled = True
+
+
+    def disable(self):
+
+        # do not hold back events recorded while enabled
+        self._drain_locked()
+        self._enabled = False
 
 
     # --------------------------------------------------------------------------
@@ -286,12 +551,22 @@ class Profiler(object):
                 return
 
             if self._enabled:
+                for event, count in self._dropped.items():
+                    self.prof('prof_dropped', msg='%s:%d' % (event, count))
                 self.prof('END')
                 self.flush()
                 self._handle.close()
                 self._handle  = None
                 self._enabled = False
 
+                # no need to reopen the profile after fork
+                for entry in list(_profilers):
+                    if entry[0] is self:
+                        _profilers.remove(entry)
+
+                if self._index:
+                    index_profile('%s/%s.prof' % (self._path, self._name))
+
         except:
             pass
 
@@ -303,11 +578,82 @@ class Profiler(object):
         if not self._enabled:
             return
 
+        self._drain_locked()
+
         # see https://docs.python.org/2/library/stdtypes.html#file.flush
         self._handle.flush()
         os.fsync(self._handle.fileno())
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _drain(self):
+        '''
+        write all buffered events to the profile.  The caller must hold
+        `self._lock`.
+        '''
+
+        if self._bidx and self._handle:
+            self._handle.write(self._encode(self._buf[:self._bidx]))
+            self._handle.flush()
+
+        self._bidx    = 0
+        self._t_drain = time.time()
+
+
+    def _drain_locked(self):
+
+        if self._bsize:
+            with self._lock:
+                self._drain()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _encode(self, events):
+        '''
+        encode a list of event tuples in the profile format.  For the binary
+        format, the caller must hold `self._lock`.
+        '''
+
+        if self._fmt == PROF_FMT_CSV:
+            return ''.join(['%.7f,%s,%s,%s,%s,%s,%s\n' % ev for ev in events])
+
+        # binary format: intern all strings, and collect new ones for the
+        # string table
+        strings = self._strings
+        new     = list()
+        records = list()
+
+        for ev in events:
+
+            ids = list()
+            for val in ev[1:]:
+
+                if not isinstance(val, str):
+                    val = str(val)
+
+                sid = strings.get(val)
+                if sid is None:
+                    sid = strings[val] = len(strings)
+                    new.append(val)
+
+                ids.append(sid)
+
+            records.append(_BIN_RECORD.pack(ev[0], *ids))
+
+        data = [_BIN_HEADER.pack(self._bflags, os.getpid(),
+                                 len(new), len(records))]
+        for val in new:
+            val = val.encode('utf-8')
+            data.append(_BIN_STRLEN.pack(len(val)))
+            data.append(val)
+
+        self._bflags = 0
+
+        return b''.join(data + records)
+
+
     # --------------------------------------------------------------------------
     #
     # FIXME: reorder args to reflect tupleorder (breaks API)
@@ -319,6 +665,9 @@ class Profiler(object):
         if not self._enabled:
             return
 
+        if event in self._limited and not self._admit(event):
+            return
+
         self._open()
 
         if ts    is None: ts    = self.timestamp()
@@ -331,10 +680,62 @@ class Profiler(object):
         # if uid is a list, then recursively call self.prof for each uid given
         for _uid in as_list(uid):
 
-            data = '%.7f,%s,%s,%s,%s,%s,%s\n' \
-                    % (ts, event, comp, tid, _uid, state, msg)
-            self._handle.write(data)
-            self._handle.flush()
+            if not self._bsize:
+
+                if self._fmt == PROF_FMT_CSV:
+                    data = '%.7f,%s,%s,%s,%s,%s,%s\n' \
+                            % (ts, event, comp, tid, _uid, state, msg)
+                    self._handle.write(data)
+                    self._handle.flush()
+
+                else:
+                    with self._lock:
+                        data = (ts, event, comp, tid, _uid, state, msg)
+                        self._handle.write(self._encode([data]))
+                        self._handle.flush()
+
+                continue
+
+            with self._lock:
+                self._buf[self._bidx] = (ts, event, comp, tid, _uid,
+                                         state, msg)
+                self._bidx += 1
+
+                if self._bidx >= self._bsize or \
+                   time.time() - self._t_drain > PROF_BUFFER_INTERVAL:
+                    self._drain()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _admit(self, event):
+        '''
+        check if an event which is subject to sampling or rate limiting should
+        be recorded, and count it as dropped otherwise.  The counters are not
+        locked, so concurrent threads may record slightly more events than
+        configured.
+        '''
+
+        stride = self._sample.get(event)
+        if stride:
+            count = self._counts.get(event, 0)
+            self._counts[event] = count + 1
+            if count % stride:
+                self._dropped[event] = self._dropped.get(event, 0) + 1
+                return False
+
+        limit = self._rate.get(event)
+        if limit is not None:
+            now    = time.time()
+            window = self._windows.get(event)
+            if not window or now - window[0] >= 1.0:
+                window = self._windows[event] = [now, 0]
+            if window[1] >= limit:
+                self._dropped[event] = self._dropped.get(event, 0) + 1
+                return False
+            window[1] += 1
+
+        return True
 
 
     # --------------------------------------------------------------------------
@@ -376,10 +777,649 @@ def timestamp():
 
 # ------------------------------------------------------------------------------
 #
-def read_profiles(profiles, sid=None, efilter=None):
+def is_binary_profile(fname):
+    '''
+    Returns `True` if the given profile is stored in the binary format.
+    '''
+
+    with ru_open(fname, 'rb') as fin:
+        return fin.read(len(PROF_BIN_MAGIC)) == PROF_BIN_MAGIC
+
+
+# ------------------------------------------------------------------------------
+#
+def _iter_blocks_bin(data, off=None, tables=None, strict=False):
+    '''
+    Iterate over the blocks of a binary profile (given as `bytes` or `mmap`),
+    yielding tuples of `(block start, string table, records start, block end)`.
+    The string table is updated with the block's strings before the block is
+    yielded.  A truncated trailing block (from a writer which did not
+    terminate cleanly) is cut to its complete records - or, if `strict` is
+    set, is not yielded at all.
+
+    Parsing starts at offset `off` (default: after the magic string), and
+    `tables` (string tables per writer pid) can be passed to continue parsing
+    where a previous iteration stopped.
+    '''
+
+    size = len(data)
+
+    if off    is None: off    = len(PROF_BIN_MAGIC)
+    if tables is None: tables = dict()
+
+    while off + _BIN_HEADER.size <= size:
+
+        start = off
+        flags, pid, n_strings, n_events = _BIN_HEADER.unpack_from(data, off)
+        off += _BIN_HEADER.size
+
+        strings = list()
+        for _ in range(n_strings):
+
+            if off + _BIN_STRLEN.size > size:
+                return
+
+            slen = _BIN_STRLEN.unpack_from(data, off)[0]
+            off += _BIN_STRLEN.size
+
+            if off + slen > size:
+                return
+
+            strings.append(str(data[off:off + slen], 'utf-8'))
+            off += slen
+
+        end = off + n_events * _BIN_RECORD.size
+        if end > size:
+            if strict:
+                return
+            n_events = (size - off) // _BIN_RECORD.size
+            end      = off + n_events * _BIN_RECORD.size
+
+        if flags & PROF_BIN_RESET or pid not in tables:
+            tables[pid] = list()
+
+        table = tables[pid]
+        table.extend(strings)
+
+        yield start, table, off, end
+
+        off = end
+
+
+def _in_ranges(off, ranges):
+    '''
+    check if `off` is within any of the given `[start, end]` byte ranges
+    '''
+
+    for start, end in ranges:
+        if start <= off < end:
+            return True
+
+    return False
+
+
+def _iter_profile_bin(fname, ranges=None):
+    '''
+    Iterate over the events of a binary profile, yielding tuples of
+    `(time, event, comp, thread, uid, state, msg)`.  If `ranges` are given,
+    only the events of blocks starting in those byte ranges are decoded (the
+    string tables are still read from all blocks).
+    '''
+
+    with ru_open(fname, 'rb') as fin:
+        data = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        for start, table, off, end in _iter_blocks_bin(data):
+
+            if ranges and not _in_ranges(start, ranges):
+                continue
+
+            for ts, e, c, t, u, s, m in _BIN_RECORD.iter_unpack(data[off:end]):
+                yield (ts, table[e], table[c], table[t], table[u], table[s],
+                       table[m])
+    finally:
+        data.close()
+
+
+# ------------------------------------------------------------------------------
+#
+def index_profile(prof, chunk=PROF_INDEX_CHUNK):
+    '''
+    Create an index for the given profile and store it next to the profile as
+    `<prof>.idx` (msgpack encoded).  The profile is divided into chunks of about
+    `chunk` bytes (aligned to lines or binary blocks), and the index maps uids
+    and entity types to the chunks they occur in.  The index also records
+    the time range covered by each chunk, and the chunks containing sync
+    events.  `read_profiles()` uses the index to only read the chunks relevant
+    for the `uids`, `entities` and `t_range` arguments.
+
+    The index is returned as dict:
+
+        {'version' : PROF_INDEX_VERSION,
+         'size'    : <size of the indexed profile in bytes>,
+         'chunks'  : [[start, end, t_min, t_max], ...],
+         'uids'    : {uid   : [chunk_id, ...], ...},
+         'entities': {entity: [chunk_id, ...], ...},
+         'syncs'   : [chunk_id, ...]}
+
+    Events without uid are indexed under the uid `''` and the entity
+    `session`.
+    '''
+
+    chunks   = list()
+    uids     = dict()
+    entities = dict()
+    syncs    = set()
+    current  = [0, 0, None, None]  # start, end, t_min, t_max
+
+    def _add(ts, event, uid):
+
+        cid = len(chunks)
+
+        if current[2] is None or ts < current[2]: current[2] = ts
+        if current[3] is None or ts > current[3]: current[3] = ts
+
+        if uid: entity = uid.split('.', 1)[0]
+        else  : entity = 'session'
+
+        ids = uids.setdefault(uid, [])
+        if not ids or ids[-1] != cid:
+            ids.append(cid)
+
+        ids = entities.setdefault(entity, [])
+        if not ids or ids[-1] != cid:
+            ids.append(cid)
+
+        if event in _SYNC_EVENTS:
+            syncs.add(cid)
+
+    def _close(end, force=False):
+
+        current[1] = end
+        if end - current[0] >= chunk or (force and end > current[0]):
+            if current[2] is None:
+                current[2] = current[3] = 0.0
+            chunks.append(list(current))
+            current[:] = [end, end, None, None]
+
+    if is_binary_profile(prof):
+
+        with ru_open(prof, 'rb') as fin:
+            data = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            size = len(data)
+            current[0] = current[1] = len(PROF_BIN_MAGIC)
+
+            # chunks are aligned to block boundaries
+            for _, table, off, end in _iter_blocks_bin(data):
+
+                for rec in _BIN_RECORD.iter_unpack(data[off:end]):
+                    _add(rec[0], table[rec[1]], table[rec[4]])
+
+                _close(end)
+
+            _close(current[1], force=True)
+
+        finally:
+            data.close()
+
+    else:
+
+        off = 0
+        with ru_open(prof, 'rb') as fin:
+
+            for line in fin:
+
+                off += len(line)
+
+                if not line.startswith(b'#'):
+                    fields = line.split(b',', 5)
+                    try:
+                        ts    = float(fields[TIME])
+                        event = fields[EVENT].decode('utf-8')
+                        uid   = fields[UID].decode('utf-8')
+                    except (ValueError, IndexError):
+                        pass
+                    else:
+                        _add(ts, event, uid)
+
+                _close(off)
+
+        _close(off, force=True)
+        size = off
+
+    index = {'version' : PROF_INDEX_VERSION,
+             'size'    : size,
+             'chunks'  : chunks,
+             'uids'    : uids,
+             'entities': entities,
+             'syncs'   : sorted(syncs)}
+
+    # write the index atomically - but don't fail if we can't
+    try:
+        dirname = os.path.dirname(os.path.abspath(prof))
+        fd, tmp = tempfile.mkstemp(dir=dirname)
+        with os.fdopen(fd, 'wb') as fout:
+            fout.write(to_msgpack(index))
+        os.rename(tmp, '%s.idx' % prof)
+
+    except OSError:
+        pass
+
+    return index
+
+
+def _get_profile_index(prof):
+    '''
+    load the index of the given profile, and (re)create it if it is missing or
+    outdated.
+    '''
+
+    try:
+        with ru_open('%s.idx' % prof, 'rb') as fin:
+            index = from_msgpack(fin.read())
+
+        if  index.get('version') == PROF_INDEX_VERSION and \
+            index.get('size')    == os.path.getsize(prof):
+            return index
+
+    except Exception:
+        pass
+
+    return index_profile(prof)
+
+
+# ------------------------------------------------------------------------------
+#
+class _RowFilter(object):
+    '''
+    Compiled form of the `efilter`, `eselect`, `uids`, `entities` and
+    `t_range` arguments of `read_profiles()`.  Calling the instance on a row
+    returns `True` if the row is to be kept as per `efilter` and `eselect`.
+
+    An `efilter` pattern matches a field if the field value is a substring of
+    the pattern.  We precompute the set of all substrings of all patterns per
+    field, so that each field is checked by a single set lookup (patterns
+    longer than `_max_len` are checked directly).  `eselect` values are
+    matched exactly, and also by set lookup.
+
+    `uids`, `entities` and `t_range` are resolved via the profile index (see
+    `index_profile()`) and checked by `select()`.
+    '''
+
+    _max_len = 256
+
+    def __init__(self, efilter=None, eselect=None, uids=None, entities=None,
+                       t_range=None):
+
+        self.uids     = None if uids     is None else frozenset(as_list(uids))
+        self.entities = None if entities is None else frozenset(
+                                                            as_list(entities))
+        self.t_range  = t_range
+        self.indexed  = not (uids is None and entities is None and
+                             t_range is None)
+
+        self._skip = list()  # [field, substrings, long patterns]
+        self._keep = list()  # [field, values]
+
+        for field, pats in (efilter or dict()).items():
+
+            subs  = set()
+            longs = list()
+            for pat in pats:
+                if len(pat) > self._max_len:
+                    longs.append(pat)
+                    continue
+                for i in range(len(pat) + 1):
+                    for j in range(i, len(pat) + 1):
+                        subs.add(pat[i:j])
+
+            self._skip.append([field, frozenset(subs), longs])
+
+        for field, vals in (eselect or dict()).items():
+            self._keep.append([field, frozenset(vals)])
+
+        # fields which are present in the rows as stored in the profile can be
+        # checked before the rows are converted and completed
+        fields = set([f[0] for f in self._skip] + [f[0] for f in self._keep])
+        self.early = not fields.intersection([TIME, UID, ENTITY])
+
+
+    def __bool__(self):
+
+        return bool(self._skip or self._keep)
+
+
+    def select(self, row):
+        '''
+        Returns `True` if the row matches the `uids`, `entities` and `t_range`
+        criteria.  Sync events are always selected, so that the resulting
+        profiles can still be time corrected by `combine_profiles()`.
+        '''
+
+        if row[EVENT] in _SYNC_EVENTS:
+            return True
+
+        if self.uids is not None and row[UID] not in self.uids:
+            return False
+
+        if self.entities is not None and row[ENTITY] not in self.entities:
+            return False
+
+        if self.t_range is not None:
+            if not self.t_range[0] <= row[TIME] <= self.t_range[1]:
+                return False
+
+        return True
+
+
+    def get_ranges(self, prof, sid):
+        '''
+        Use the profile index to determine the byte ranges of the profile which
+        can contain selected rows.
+        '''
+
+        index  = _get_profile_index(prof)
+        chunks = index['chunks']
+        sel    = set(range(len(chunks)))
+
+        if self.uids is not None:
+            keys = set(self.uids)
+            if sid in keys:
+                keys.add('')  # session events have no uid in the profile
+            found = set()
+            for uid in keys:
+                found.update(index['uids'].get(uid, []))
+            sel &= found
+
+        if self.entities is not None:
+            found = set()
+            for entity in self.entities:
+                found.update(index['entities'].get(entity, []))
+            sel &= found
+
+        if self.t_range is not None:
+            t_start, t_stop = self.t_range
+            sel &= set([i for i, chunk in enumerate(chunks)
+                          if chunk[3] >= t_start and chunk[2] <= t_stop])
+
+        sel |= set(index['syncs'])
+
+        # merge adjacent chunks into ranges
+        ranges = list()
+        for i in sorted(sel):
+            start, end = chunks[i][:2]
+            if ranges and ranges[-1][1] == start:
+                ranges[-1][1] = end
+            else:
+                ranges.append([start, end])
+
+        return ranges
+
+
+    def __call__(self, row):
+
+        for field, subs, longs in self._skip:
+            val = row[field]
+            if val in subs:
+                return False
+            for pat in longs:
+                if val in pat:
+                    return False
+
+        for field, vals in self._keep:
+            if row[field] not in vals:
+                return False
+
+        return True
+
+
+# ------------------------------------------------------------------------------
+#
+def _iter_rows_bin(prof, sid, check, ranges=None, events=None):
+    '''
+    Iterate over the rows of a binary profile, see `read_profiles()`.  If
+    `events` are given, those are converted instead of the events stored in
+    `prof`.
+    '''
+
+    t_last   = None    # time of the last event (see rp issue 1117 below)
+    entities = dict()  # cache entity types per uid
+    early    = check and check.early
+
+    if events is None:
+        events = _iter_profile_bin(prof, ranges)
+
+    for ev in events:
+
+        # the raw event tuples use the same field indexes as the rows
+        if early and not check(ev):
+            if ev[TIME] != 1.0:
+                t_last = ev[TIME]
+            continue
+
+        ts, event, comp, tid, uid, state, msg = ev
+
+        if uid:
+            entity = entities.get(uid)
+            if entity is None:
+                entity = entities[uid] = uid.split('.', 1)[0]
+        else:
+            entity = 'session'
+            uid    = sid
+
+        row = [ts, event, comp, tid, uid, state, msg, entity]
+
+        skip = False
+        if check and not early:
+            skip = not check(row)
+
+        # fix rp issue 1117 (see FIXME in `read_profiles()`)
+        if ts == 1.0 and t_last is not None:
+            row[TIME] = t_last
+
+        if not skip:
+            yield row
+
+        t_last = row[TIME]
+
+
+# ------------------------------------------------------------------------------
+#
+def _iter_lines(prof, ranges=None):
+    '''
+    Iterate over the lines of a text profile, or over the lines in the given
+    byte ranges of the profile.
+    '''
+
+    if not ranges:
+        with ru_open(prof, 'r') as fin:
+            yield from fin
+        return
+
+    with ru_open(prof, 'rb') as fin:
+        for start, end in ranges:
+            fin.seek(start)
+            yield from fin.read(end - start).decode('utf-8') \
+                                            .splitlines(keepends=True)
+
+
+def _iter_rows_csv(prof, sid, check, legacy, ranges=None, lines=None):
+    '''
+    Iterate over the rows of a CSV profile, see `read_profiles()`.  If `lines`
+    are given, those are parsed instead of the lines stored in `prof`.
+    '''
+
+    t_last = None  # time of the last row (see rp issue 1117 below)
+    early  = check and check.early and not legacy
+
+    if lines is None:
+        lines = _iter_lines(prof, ranges)
+
+    reader = csv.reader(lines)
+
+    try:
+        for raw in reader:
+
+            # we keep the raw data around for error checks
+            row = list(raw)
+
+          # if 'bootstrap_1' in row:
+          #     print()
+          #     print(row)
+
+            # skip header
+            if row[TIME].startswith('#'):
+                continue
+
+            # reject filtered rows as early as possible (but keep their time
+            # for the rp issue 1117 fix below)
+            if early and len(row) > MSG and not check(row):
+                if float(row[TIME]) != 1.0:
+                    t_last = float(row[TIME])
+                continue
+
+            # make room in the row for entity type etc.
+            row.extend([None] * (PROF_KEY_MAX - len(row)))
+
+            row[TIME] = float(row[TIME])
+
+            # we derive entity type from the uid -- but funnel
+            # some cases into 'session' as a catch-all type
+            uid = row[UID]
+            if uid:
+                row[ENTITY] = uid.split('.',1)[0]
+            else:
+                row[ENTITY] = 'session'
+                row[UID]    = sid
+
+            # we should have no unset (ie. None) fields left - otherwise
+            # the profile was likely not correctly closed.
+            if None in row:
+                if legacy:
+                    comp, tid = row[1].split(':', 1)
+                    new_row = [None] * PROF_KEY_MAX
+                    new_row[TIME        ] = row[0]
+                    new_row[EVENT       ] = row[4]
+                    new_row[COMP        ] = comp
+                    new_row[TID         ] = tid
+                    new_row[UID         ] = row[2]
+                    new_row[STATE       ] = row[3]
+                    new_row[MSG         ] = row[5]
+
+                    uid = new_row[UID]
+                    if uid:
+                        new_row[ENTITY] = uid.split('.',1)[0]
+                    else:
+                        new_row[ENTITY] = 'session'
+                        new_row[UID]    = sid
+
+                    row = new_row
+
+            if None in row:
+                print('row invalid [%s]: %s' % (prof, raw))
+                continue
+              # raise ValueError('row invalid [%s]: %s' % (prof, row))
+
+            # apply the filter if that was not possible above.  We do that
+            # after adding the entity field, as the filter might also
+            # apply to that.
+            skip = False
+            if check and not early:
+                skip = not check(row)
+
+            # fix rp issue 1117 (see FIXME in `read_profiles()`)
+            if row[TIME] == 1.0 and t_last is not None:
+                row[TIME] = t_last
+
+            if not skip:
+                yield row
+
+            t_last = row[TIME]
+
+          # print(' --- %-30s -- %-30s ' % (row[STATE], row[MSG]))
+          # if 'bootstrap_1' in row:
+          #     print(row)
+          #     print()
+          #     print('TIME    : %s' % row[TIME  ])
+          #     print('EVENT   : %s' % row[EVENT ])
+          #     print('COMP    : %s' % row[COMP  ])
+          #     print('TID     : %s' % row[TID   ])
+          #     print('UID     : %s' % row[UID   ])
+          #     print('STATE   : %s' % row[STATE ])
+          #     print('ENTITY  : %s' % row[ENTITY])
+          #     print('MSG     : %s' % row[MSG   ])
+
+    except:
+        raise
+      # print('skip remainder of %s' % prof)
+      # continue
+
+
+# ------------------------------------------------------------------------------
+#
+def _iter_rows(prof, sid, check, legacy):
+
+    ranges = None
+    if check.indexed:
+        ranges = check.get_ranges(prof, sid)
+        if not ranges:
+            return iter([])
+
+    if is_binary_profile(prof):
+        rows = _iter_rows_bin(prof, sid, check, ranges)
+    else:
+        rows = _iter_rows_csv(prof, sid, check, legacy, ranges)
+
+    if check.indexed:
+        rows = filter(check.select, rows)
+
+    return rows
+
+
+def _get_legacy():
+
+    legacy = os.environ.get('RADICAL_ANALYTICS_LEGACY_PROFILES', False)
+
+    if legacy and legacy.lower() not in ['no', 'false']:
+        return True
+    else:
+        return False
+
+
+def _read_profile_worker(args):
+    '''
+    process pool helper for `read_profiles()`
+    '''
+
+    # the csv field size limit is per process
+    csv.field_size_limit(CSV_FIELD_SIZE_LIMIT)
+
+    prof, sid, check, legacy = args
+    rows = list(_iter_rows(prof, sid, check, legacy))
+
+    # deduplicate repeated strings: the rows are pickled for the transfer to
+    # the parent process, and pickle stores identical objects only once
+    cache = dict()
+    for row in rows:
+        for field in (EVENT, COMP, TID, STATE, MSG, ENTITY):
+            val        = row[field]
+            row[field] = cache.setdefault(val, val)
+
+    return rows
+
+
+# ------------------------------------------------------------------------------
+#
+def read_profiles(profiles, sid=None, efilter=None, eselect=None, nprocs=None,
+                  lazy=False, uids=None, entities=None, t_range=None):
     '''
     We read all profiles as CSV files and parse them.  For each profile,
     we back-calculate global time (epoch) from the synch timestamps.
+    Profiles stored in the binary format (see `Profiler`) are detected and
+    decoded directly.
 
     The caller can provide a filter of the following structure::
 
@@ -388,15 +1428,35 @@ def read_profiles(profiles, sid=None, efilter=None):
                   ...
                  }
 
-    Filters apply on *substring* matches!
-    '''
+    Filters apply on *substring* matches: events are skipped if a field value
+    is a substring of any of the patterns given for that field.
 
-    legacy = os.environ.get('RADICAL_ANALYTICS_LEGACY_PROFILES', False)
+    Conversely, `eselect` of the same structure selects the events to keep:
+    only events whose field values are exactly one of the values given for that
+    field (for all fields in `eselect`) are returned.
 
-    if legacy and legacy.lower() not in ['no', 'false']:
-        legacy = True
-    else:
-        legacy = False
+    Both are compiled once into set lookups per field.  Filters which do not
+    involve the `TIME`, `UID` or `ENTITY` fields are applied before the rows
+    are converted, so that rejected events are cheap to skip.
+
+    The result can further be limited to events of the given `uids` (list),
+    `entities` (list of entity types) and time range `t_range` (tuple of
+    `[start, stop]`, in uncorrected profile time).  For those, the profile
+    index (see `index_profile()`) is used to only read the relevant parts of
+    each profile.  Missing or outdated indexes are created on the fly.  Sync
+    events are always included in that case, so that the resulting profiles
+    can still be passed to `combine_profiles()`.
+
+    If `nprocs` is larger than `1`, the profiles are parsed concurrently by
+    a pool of `nprocs` processes.  The resulting dict retains the order of the
+    given `profiles`, and at most `nprocs` profiles are parsed at any time.
+
+    If `lazy` is set, the profiles are not parsed at all.  Instead, the values
+    of the returned dict are `ProfileStream` instances which parse the profile
+    whenever they are iterated over (see `combine_profiles(stream=True)`).
+    '''
+
+    legacy = _get_legacy()
 
     # set the maximum field size allowed by the csv parser
     csv.field_size_limit(CSV_FIELD_SIZE_LIMIT)
@@ -410,121 +1470,204 @@ def read_profiles(profiles, sid=None, efilter=None):
     #
     #    [1] https://github.com/radical-cybertools/radical.pilot/issues/1117
 
-    if not efilter:
-        efilter = dict()
+    ret   = dict()
+    check = _RowFilter(efilter, eselect, uids, entities, t_range)
+
+    if lazy:
+        for prof in profiles:
+            ret[prof] = ProfileStream(prof, sid=sid, check=check)
+        return ret
+
+    if nprocs and nprocs > 1:
+
+        profiles = list(profiles)
+        nprocs   = min(nprocs, len(profiles))
+        work     = [[prof, sid, check, legacy] for prof in profiles]
 
-    ret     = dict()
-    last    = list()
-    skipped = 0
+        with mp.Pool(nprocs) as pool:
+            for prof, rows in zip(profiles,
+                                  pool.imap(_read_profile_worker, work)):
+                ret[prof] = rows
+
+        return ret
 
     for prof in profiles:
+        ret[prof] = list(_iter_rows(prof, sid, check, legacy))
 
-        with ru_open(prof, 'r') as csvfile:
+    return ret
 
-            ret[prof] = list()
-            reader    = csv.reader(csvfile)
 
-            try:
-                for raw in reader:
+# ------------------------------------------------------------------------------
+#
+class ProfileStream(object):
+    '''
+    Lazy view on a single profile: every iteration parses the profile anew and
+    yields the rows `read_profiles()` would return for it.  Only the current
+    row is held in memory.
+    '''
 
-                    # we keep the raw data around for error checks
-                    row = list(raw)
+    def __init__(self, prof, sid=None, efilter=None, eselect=None,
+                       check=None):
 
-                  # if 'bootstrap_1' in row:
-                  #     print()
-                  #     print(row)
+        if check is None:
+            check = _RowFilter(efilter, eselect)
 
-                    # skip header
-                    if row[TIME].startswith('#'):
-                        skipped += 1
-                        continue
+        self._prof  = prof
+        self._sid   = sid
+        self._check = check
 
-                    # make room in the row for entity type etc.
-                    row.extend([None] * (PROF_KEY_MAX - len(row)))
 
-                    row[TIME] = float(row[TIME])
+    def __iter__(self):
 
-                    # we derive entity type from the uid -- but funnel
-                    # some cases into 'session' as a catch-all type
-                    uid = row[UID]
-                    if uid:
-                        row[ENTITY] = uid.split('.',1)[0]
-                    else:
-                        row[ENTITY] = 'session'
-                        row[UID]    = sid
-
-                    # we should have no unset (ie. None) fields left - otherwise
-                    # the profile was likely not correctly closed.
-                    if None in row:
-                        if legacy:
-                            comp, tid = row[1].split(':', 1)
-                            new_row = [None] * PROF_KEY_MAX
-                            new_row[TIME        ] = row[0]
-                            new_row[EVENT       ] = row[4]
-                            new_row[COMP        ] = comp
-                            new_row[TID         ] = tid
-                            new_row[UID         ] = row[2]
-                            new_row[STATE       ] = row[3]
-                            new_row[MSG         ] = row[5]
-
-                            uid = new_row[UID]
-                            if uid:
-                                new_row[ENTITY] = uid.split('.',1)[0]
-                            else:
-                                new_row[ENTITY] = 'session'
-                                new_row[UID]    = sid
-
-                            row = new_row
-
-                    if None in row:
-                        print('row invalid [%s]: %s' % (prof, raw))
-                        continue
-                      # raise ValueError('row invalid [%s]: %s' % (prof, row))
-
-                    # apply the filter.  We do that after adding the entity
-                    # field above, as the filter might also apply to that.
-                    skip = False
-                    for field, pats in efilter.items():
-                        for pattern in pats:
-                            if row[field] in pattern:
-                                skip = True
-                                break
-                        if skip:
-                            continue
-
-                    # fix rp issue 1117 (see FIXME above)
-                    if row[TIME] == 1.0 and last:
-                        row[TIME] = last[TIME]
-
-                    if not skip:
-                        ret[prof].append(row)
-
-                    last = row
-
-                  # print(' --- %-30s -- %-30s ' % (row[STATE], row[MSG]))
-                  # if 'bootstrap_1' in row:
-                  #     print(row)
-                  #     print()
-                  #     print('TIME    : %s' % row[TIME  ])
-                  #     print('EVENT   : %s' % row[EVENT ])
-                  #     print('COMP    : %s' % row[COMP  ])
-                  #     print('TID     : %s' % row[TID   ])
-                  #     print('UID     : %s' % row[UID   ])
-                  #     print('STATE   : %s' % row[STATE ])
-                  #     print('ENTITY  : %s' % row[ENTITY])
-                  #     print('MSG     : %s' % row[MSG   ])
-
-            except:
-                raise
-              # print('skip remainder of %s' % prof)
-              # continue
+        csv.field_size_limit(CSV_FIELD_SIZE_LIMIT)
 
-    return ret
+        return _iter_rows(self._prof, self._sid, self._check, _get_legacy())
+
+
+    @property
+    def prof(self):
+        return self._prof
+
+
+# ------------------------------------------------------------------------------
+#
+class _ProfileTail(object):
+    '''
+    Read state of a growing profile for `follow_profiles()`: the file offset
+    read so far, the incomplete trailing line (or binary block), and for binary
+    profiles the string tables.
+    '''
+
+    def __init__(self, prof, sid, check, legacy):
+
+        self.prof    = prof
+        self._sid    = sid
+        self._check  = check
+        self._legacy = legacy
+        self._reset()
+
+
+    def _reset(self):
+
+        self._offset  = 0
+        self._partial = b''
+        self._binary  = None
+        self._tables  = dict()
+
+
+    def poll(self):
+        '''
+        return the rows of all events appended since the last call
+        '''
+
+        try:
+            size = os.path.getsize(self.prof)
+        except OSError:
+            return []  # not (yet) created
+
+        if size < self._offset:
+            # truncated or replaced - start over
+            self._reset()
+
+        if size == self._offset:
+            return []
+
+        with ru_open(self.prof, 'rb') as fin:
+            fin.seek(self._offset)
+            data = fin.read()
+
+        self._offset += len(data)
+        data = self._partial + data
+
+        if self._binary is None:
+            if len(data) < len(PROF_BIN_MAGIC):
+                self._partial = data
+                return []
+            self._binary = data.startswith(PROF_BIN_MAGIC)
+            if self._binary:
+                data = data[len(PROF_BIN_MAGIC):]
+
+        if self._binary:
+
+            events = list()
+            off    = 0
+            for _, table, start, end in _iter_blocks_bin(data, 0, self._tables,
+                                                         strict=True):
+                for ts, e, c, t, u, s, m in _BIN_RECORD.iter_unpack(
+                                                             data[start:end]):
+                    events.append((ts, table[e], table[c], table[t],
+                                   table[u], table[s], table[m]))
+                off = end
+
+            self._partial = data[off:]
+            rows = _iter_rows_bin(self.prof, self._sid, self._check,
+                                  events=events)
+
+        else:
+
+            off = data.rfind(b'\n') + 1
+            self._partial = data[off:]
+            lines = data[:off].decode('utf-8').splitlines(keepends=True)
+            rows  = _iter_rows_csv(self.prof, self._sid, self._check,
+                                   self._legacy, lines=lines)
+
+        return list(rows)
+
+
+# ------------------------------------------------------------------------------
+#
+def follow_profiles(profiles, sid=None, efilter=None, eselect=None,
+                    interval=1.0, timeout=None):
+    '''
+    Follow a set of growing profiles (like `tail -f`), and yield tuples of
+    `(profile, row)` for all events as they are appended to the profiles.  The
+    rows are the same as returned by `read_profiles()` for the respective
+    arguments, including the `sync_abs` events from the profile headers.
+
+    `profiles` is a list of profile names, or a glob pattern (string) which
+    is re-evaluated on every poll so that new profiles are picked up.  Profiles
+    which do not exist yet are followed once they are created.  Only complete
+    lines (or binary blocks) are reported; incomplete trailing data are kept
+    until the writer completes them.
+
+    The profiles are polled every `interval` seconds.  The generator finishes
+    once no new events were found for `timeout` seconds (`None` follows the
+    profiles forever).
+    '''
+
+    check  = _RowFilter(efilter, eselect)
+    legacy = _get_legacy()
+    tails  = dict()
+    t_last = time.time()
+
+    while True:
+
+        if isinstance(profiles, str): names = sorted(glob.glob(profiles))
+        else                        : names = profiles
+
+        found = False
+        for prof in names:
+
+            if prof not in tails:
+                tails[prof] = _ProfileTail(prof, sid, check, legacy)
+
+            for row in tails[prof].poll():
+                found = True
+                yield prof, row
+
+        if found:
+            t_last = time.time()
+
+        elif timeout is not None and time.time() - t_last >= timeout:
+            return
+
+        else:
+            time.sleep(interval)
 
 
 # ------------------------------------------------------------------------------
 #
-def combine_profiles(profs):
+def combine_profiles(profs, stream=False):
     '''
     We merge all profiles and sort by time.
 
@@ -546,8 +1689,22 @@ def combine_profiles(profs):
     the exact same time).
 
     The method returnes the combined profile and accuracy, as tuple.
+
+    If `stream` is set, the profiles are not merged in memory.  Instead, the
+    returned tuple contains a generator which yields the time corrected events
+    of all profiles in global time order, using a heap based k-way merge of the
+    individual profiles.  The profiles are iterated twice (the first pass
+    collects the sync events), so they must be sequences or `ProfileStream`
+    instances (see `read_profiles(lazy=True)`).  Lists are sorted in place, all
+    other profiles are expected to be nearly time ordered and are reordered
+    within a sliding window of `PROF_MERGE_WINDOW` events.  In this mode,
+    `sync_abs` events are not transplanted into profiles which are synced via
+    `sync_rel` events.
     '''
 
+    if stream:
+        return _combine_profiles_stream(profs)
+
     syncs    = dict()  # profiles which have relative time refs
     t_host   = dict()  # time offset per host
     p_glob   = list()  # global profile
@@ -741,6 +1898,72 @@ def combine_profiles(profs):
     return p_glob, accuracy
 
 
+# ------------------------------------------------------------------------------
+#
+def _get_time_corrections(syncs):
+    '''
+    Given a dict of sync events per profile, return a dict of time corrections
+    per profile, and the sync accuracy.  We run `combine_profiles()` on copies
+    of the sync events plus one probe event at time zero per profile: the
+    probe then holds the total time correction for that profile.
+    '''
+
+    profs  = dict()
+    probes = dict()
+
+    for pname, rows in syncs.items():
+        probe         = [0.0, 'probe', '', '', '', '', '', '']
+        profs[pname]  = [list(row) for row in rows] + [probe]
+        probes[pname] = probe
+
+    _, accuracy = combine_profiles(profs)
+
+    return {pname: probe[TIME] for pname, probe in probes.items()}, accuracy
+
+
+def _correct_rows(rows, offset):
+
+    for row in rows:
+        row[TIME] += offset
+        yield row
+
+
+def _reorder_rows(rows, window):
+
+    # sliding window sort: a heap of `window` events emits the earliest one
+    # whenever a new event comes in
+    heap = list()
+    for idx, row in enumerate(rows):
+        if len(heap) < window:
+            heapq.heappush(heap, (row[TIME], idx, row))
+        else:
+            yield heapq.heappushpop(heap, (row[TIME], idx, row))[2]
+
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def _combine_profiles_stream(profs):
+
+    syncs = dict()
+    for pname, prof in profs.items():
+        syncs[pname] = [row for row in prof if row[EVENT] in _SYNC_EVENTS]
+
+    offsets, accuracy = _get_time_corrections(syncs)
+
+    streams = list()
+    for pname, prof in profs.items():
+
+        if isinstance(prof, list):
+            prof.sort(key=lambda k: k[TIME])
+        else:
+            prof = _reorder_rows(prof, PROF_MERGE_WINDOW)
+
+        streams.append(_correct_rows(prof, offsets[pname]))
+
+    return heapq.merge(*streams, key=lambda k: k[TIME]), accuracy
+
+
 # ------------------------------------------------------------------------------
 #
 def clean_profile(profile, sid, state_final=None, state_canceled=None):
@@ -0,0 +1,275 @@
+__author__    = 'Radical.Utils Development Team'
+__copyright__ = 'Copyright 2026, RADICAL@Rutgers'
+__license__   = 'MIT'
+
+
+# `numpy` is an optional dependency: only `ProfileColumns` requires it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .profile import TIME, EVENT, COMP, TID, UID, STATE, MSG, ENTITY
+from .profile import PROF_KEY_MAX
+from .profile import read_profiles, _get_time_corrections
+
+
+# all fields but `TIME` are stored as categorical codes
+_CATEGORICAL = [EVENT, COMP, TID, UID, STATE, MSG, ENTITY]
+
+
+# ------------------------------------------------------------------------------
+#
+class ProfileColumns(object):
+    '''
+    Columnar representation of a profile.  The event times are stored in
+    a `float64` numpy array, all other fields are stored as `int32` arrays of
+    codes into a per-field list of categories (unique values).  Compared to the
+    list-of-rows representation used by `read_profiles()` and
+    `combine_profiles()`, this requires about 40 bytes per event, and allows
+    vectorized time correction, filtering and sorting.
+
+    The fields are addressed by the usual profile field indexes (`ru.TIME`,
+    `ru.EVENT`, etc.):
+
+        cols  = ProfileColumns.from_rows(rows)
+        mask  = cols.mask(ru.EVENT, ['exec_start', 'exec_stop'])
+        times = cols.select(mask).sort().column(ru.TIME)
+        rows  = cols.to_rows()
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, time=None, codes=None, categories=None):
+
+        if np is None:
+            raise RuntimeError('ProfileColumns requires numpy')
+
+        if time is None:
+            time = np.zeros(0, dtype=np.float64)
+
+        if codes is None:
+            codes = {field: np.zeros(0, dtype=np.int32)
+                                            for field in _CATEGORICAL}
+
+        if categories is None:
+            categories = {field: list() for field in _CATEGORICAL}
+
+        self.time       = time
+        self.codes      = codes
+        self.categories = categories
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __len__(self):
+
+        return len(self.time)
+
+
+    # --------------------------------------------------------------------------
+    #
+    @classmethod
+    def from_rows(cls, rows):
+        '''
+        create a columnar profile from a list of profile rows (as returned by
+        `read_profiles()` and `combine_profiles()`)
+        '''
+
+        if np is None:
+            raise RuntimeError('ProfileColumns requires numpy')
+
+        n     = len(rows)
+        time  = np.fromiter((row[TIME] for row in rows),
+                            dtype=np.float64, count=n)
+        codes = dict()
+        cats  = dict()
+
+        for field in _CATEGORICAL:
+
+            # dicts keep insertion order, so the keys are the categories
+            cat          = dict()
+            codes[field] = np.fromiter((cat.setdefault(row[field], len(cat))
+                                        for row in rows),
+                                       dtype=np.int32, count=n)
+            cats[field]  = list(cat)
+
+        return cls(time, codes, cats)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def to_rows(self):
+        '''
+        convert into a list of profile rows
+        '''
+
+        cols = [None] * PROF_KEY_MAX
+        cols[TIME] = self.time.tolist()
+
+        for field in _CATEGORICAL:
+            cats        = self.categories[field]
+            cols[field] = [cats[code] for code in self.codes[field].tolist()]
+
+        return [list(row) for row in zip(*cols)]
+
+
+    # --------------------------------------------------------------------------
+    #
+    @classmethod
+    def read(cls, profiles, sid=None, efilter=None, eselect=None):
+        '''
+        Same as `read_profiles()`, but returns a dict of `ProfileColumns`.
+        The profiles are converted one at a time, so that only a single profile
+        is held in the list-of-rows representation at any point.
+        '''
+
+        ret = dict()
+        for prof in profiles:
+            rows      = read_profiles([prof], sid=sid, efilter=efilter,
+                                      eselect=eselect)[prof]
+            ret[prof] = cls.from_rows(rows)
+
+        return ret
+
+
+    # --------------------------------------------------------------------------
+    #
+    @classmethod
+    def concat(cls, parts):
+        '''
+        concatenate a list of columnar profiles into a new one
+        '''
+
+        parts = [part for part in parts if len(part)]
+
+        if not parts:
+            return cls()
+
+        time  = np.concatenate([part.time for part in parts])
+        codes = dict()
+        cats  = dict()
+
+        for field in _CATEGORICAL:
+
+            # map the categories of all parts into a common category list
+            cat  = dict()
+            recs = list()
+            for part in parts:
+                remap = np.fromiter((cat.setdefault(val, len(cat))
+                                     for val in part.categories[field]),
+                                    dtype=np.int32,
+                                    count=len(part.categories[field]))
+                recs.append(remap[part.codes[field]])
+
+            codes[field] = np.concatenate(recs)
+            cats[field]  = list(cat)
+
+        return cls(time, codes, cats)
+
+
+    # --------------------------------------------------------------------------
+    #
+    @classmethod
+    def combine(cls, profs):
+        '''
+        Same as `combine_profiles()`, but operates on a dict of
+        `ProfileColumns`.  Returns a tuple of the combined, time sorted
+        columnar profile and the sync accuracy.
+
+        The time corrections are derived from the sync events of each profile
+        only.  Unlike `combine_profiles()`, `sync_abs` events are not
+        transplanted into profiles which are synced via `sync_rel` events.
+        '''
+
+        syncs = dict()
+        for pname, prof in profs.items():
+            mask         = prof.mask(EVENT, ['sync_abs', 'sync_rel'])
+            syncs[pname] = prof.select(mask).to_rows()
+
+        offsets, accuracy = _get_time_corrections(syncs)
+
+        parts = list()
+        for pname, prof in profs.items():
+            part = prof.select(np.ones(len(prof), dtype=bool))
+            part.shift(offsets[pname])
+            parts.append(part)
+
+        return cls.concat(parts).sort(), accuracy
+
+
+    # --------------------------------------------------------------------------
+    #
+    def column(self, field):
+        '''
+        return the values of the given field as numpy array
+        '''
+
+        if field == TIME:
+            return self.time
+
+        cats = np.empty(len(self.categories[field]), dtype=object)
+        cats[:] = self.categories[field]
+
+        return cats[self.codes[field]]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def mask(self, field, values):
+        '''
+        return a boolean array which is `True` for all events where the given
+        field matches any of the given values exactly
+        '''
+
+        if field == TIME:
+            return np.isin(self.time, values)
+
+        values = set(values)
+        ids    = [i for i, val in enumerate(self.categories[field])
+                                if val in values]
+
+        return np.isin(self.codes[field], ids)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def select(self, mask):
+        '''
+        return a new columnar profile with the events selected by the given
+        boolean mask or index array (the categories are shared)
+        '''
+
+        return ProfileColumns(self.time[mask],
+                              {field: codes[mask]
+                                      for field, codes in self.codes.items()},
+                              self.categories)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def sort(self):
+        '''
+        return a new columnar profile with events sorted by time.  The sort is
+        stable, i.e., events with identical timestamps retain their order.
+        '''
+
+        return self.select(np.argsort(self.time, kind='stable'))
+
+
+    # --------------------------------------------------------------------------
+    #
+    def shift(self, offset, mask=None):
+        '''
+        add the given offset to the event times (in place), either to all events
+        or to those selected by the given boolean mask
+        '''
+
+        if mask is None:
+            self.time += offset
+        else:
+            self.time[mask] += offset
+
+
+# ------------------------------------------------------------------------------
+
@@ -2,6 +2,8 @@
 import json
 import msgpack
 
+import threading as mt
+
 from .typeddict import as_dict, TypedDict
 
 # ------------------------------------------------------------------------------
@@ -134,6 +136,15 @@ def from_json(data):
     return json.loads(data, object_hook=_json_decoder)
 
 
+# ------------------------------------------------------------------------------
+#
+# `msgpack.packb()` creates a new packer on every call.  We keep one packer per
+# thread instead.  The packer is taken out of the thread-local storage while in
+# use, so that recursive calls (from registered encoders) use a new one.
+#
+_msgpack_tls = mt.local()
+
+
 # ------------------------------------------------------------------------------
 #
 def to_msgpack(data):
@@ -146,7 +157,13 @@ def to_msgpack(data):
     Returns:
         bytes: msgpack serialized data
     '''
-    return msgpack.packb(data, default=_msgpack_encoder, use_bin_type=True)
+
+    packer = _msgpack_tls.__dict__.pop('packer', None) \
+          or msgpack.Packer(default=_msgpack_encoder, use_bin_type=True)
+    try:
+        return packer.pack(data)
+    finally:
+        _msgpack_tls.packer = packer
 
 
 # ------------------------------------------------------------------------------
@@ -157,7 +174,9 @@ def from_msgpack(data):
     deserialization
 
     Args:
-        data (bytes): msgpack data to be deserialized
+        data (bytes): msgpack data to be deserialized.  Any object supporting
+                      the buffer protocol (`bytearray`, `memoryview`, the
+                      buffer of a `zmq.Frame`) can be passed to avoid copies.
 
     Returns:
         object: deserialized data
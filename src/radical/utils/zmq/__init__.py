@@ -8,12 +8,15 @@ __license__   = "GPL"
 
 from .bridge   import Bridge
 from .queue    import Queue,  Putter,    Getter,     test_queue
+from .queue    import BACKLOG_BLOCK, BACKLOG_DROP, BACKLOG_SPILL
 from .pubsub   import PubSub, Publisher, Subscriber, test_pubsub
 from .pipe     import Pipe,   MODE_PUSH, MODE_PULL
-from .client   import Client
+from .client   import Client, AsyncClient
 from .server   import Server
 from .registry import Registry, RegistryClient
+from .registry import RegistryStore, RegistryLogStore
 from .message  import Message
+from .utils    import TRANSPORT_TCP, TRANSPORT_IPC, TRANSPORT_INPROC
 
 
 # ------------------------------------------------------------------------------
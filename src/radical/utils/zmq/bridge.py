@@ -10,7 +10,7 @@ from ..profile import Profiler
 from ..config  import Config
 from ..json_io import read_json, write_json
 
-from .utils import LOG_ENABLED
+from .utils import LOG_ENABLED, zmq_bind, zmq_unlink
 
 QUEUE   = 'QUEUE'
 PUBSUB  = 'PUBSUB'
@@ -24,6 +24,13 @@ class Bridge(object):
 
     A bridge can be configured to have a finite lifetime: when no messages are
     received in `timeout` seconds, the bridge process will terminate.
+
+    Bridges bind to `tcp` endpoints by default.  If all peers are located on
+    the same node (or in the same process), the `transport` config setting can
+    be set to `ipc` (or `inproc`) to avoid the TCP stack.  The endpoint URLs
+    reported by `addr_in` / `addr_out` and written by `write_config()` reflect
+    that transport.  `ipc` sockets are created in the bridge's `path` (or in
+    the system's temp directory) and are removed on `stop()`.
     '''
 
     # --------------------------------------------------------------------------
@@ -52,6 +59,7 @@ class Bridge(object):
         self._channel = self._cfg.channel
         self._uid     = self._cfg.uid
         self._pwd     = self._cfg.path
+        self._bound   = list()  # endpoint URLs bound by this bridge
 
         if not self._pwd:
             self._pwd = os.getcwd()
@@ -82,9 +90,12 @@ class Bridge(object):
         if not fname:
             fname = '%s/%s.cfg' % (self._pwd, self._cfg.uid)
 
-        write_json(fname, {'uid'        : self._cfg.uid,
-                           self.type_in : str(self.addr_in),
-                           self.type_out: str(self.addr_out)})
+        cfg = {'uid'        : self._cfg.uid,
+               self.type_in : str(self.addr_in),
+               self.type_out: str(self.addr_out)}
+        cfg.update(self._bridge_config())
+
+        write_json(fname, cfg)
 
 
     # --------------------------------------------------------------------------
@@ -124,6 +135,28 @@ class Bridge(object):
     def _bridge_work(self):
         raise NotImplementedError()
 
+    def _bridge_config(self):
+        # additional settings for the bridge clients
+        return dict()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _bridge_bind(self, sock, ep_type):
+        '''
+        bind the given socket to an endpoint of the transport configured for
+        this bridge (`tcp` (default), `ipc` or `inproc`), and return its URL.
+        `tcp` ports can be limited to a range via the `ports` config setting.
+        '''
+
+        url = zmq_bind(sock, transport=self._cfg.get('transport'),
+                             name='%s.%s' % (self._uid, ep_type),
+                             path=self._cfg.path,
+                             ports=self._cfg.get('ports'))
+        self._bound.append(url)
+
+        return url
+
 
     # --------------------------------------------------------------------------
     #
@@ -196,6 +229,10 @@ class Bridge(object):
     def stop(self):
 
         self._term.set()
+
+        for url in self._bound:
+            zmq_unlink(url)
+
       # self._bridge_thread.join(timeout=timeout)
         self._prof.prof('term', uid=self._uid)
 
@@ -1,15 +1,19 @@
 
 import zmq
+import asyncio
+import zmq.asyncio
 
-from typing import Any
+from typing import Any, Dict, List, Sequence
 
 import threading as mt
 
+from concurrent.futures import Future
+
 from ..json_io   import read_json
 from ..misc      import as_string
 from ..serialize import to_msgpack, from_msgpack
 from ..logger    import Logger
-from .utils      import no_intr, sock_connect
+from .utils      import no_intr, sock_connect, recv_msgpack, zmq_context
 
 
 # ------------------------------------------------------------------------------
@@ -17,6 +21,45 @@ from .utils      import no_intr, sock_connect
 _LINGER_TIMEOUT    = 1000  # ms to linger after close
 _HIGH_WATER_MARK   = 1024  # number of messages to buffer before dropping
 _DEFAULT_BULK_SIZE =    1  # number of messages to put in a bulk
+_MAX_IN_FLIGHT     =  512  # max number of pipelined requests per call
+
+
+# ------------------------------------------------------------------------------
+#
+def _pack_request(cmd: str, args: Sequence, kwargs: Dict[str, Any]) -> bytes:
+
+    return to_msgpack({'cmd'   : cmd,
+                       'args'  : args,
+                       'kwargs': kwargs})
+
+
+def _get_result(res: Dict[str, Any]) -> Any:
+
+    # FIXME: assert proper res structure
+
+    if res.get('err'):
+        err_msg = 'ERROR: %s' % res['err']
+        if res['exc']:
+            err_msg += '\n%s' % ''.join(res['exc'])
+        raise RuntimeError(err_msg)
+
+    return res['res']
+
+
+def _split_requests(reqs: Sequence) -> List:
+    '''
+    requests for `request_many()` are given as `(cmd, args, kwargs)` tuples,
+    where `args` and `kwargs` are optional
+    '''
+
+    ret = list()
+    for req in reqs:
+        cmd    = req[0]
+        args   = req[1] if len(req) > 1 else list()
+        kwargs = req[2] if len(req) > 2 else dict()
+        ret.append([cmd, args, kwargs])
+
+    return ret
 
 
 # ------------------------------------------------------------------------------
@@ -40,7 +83,7 @@ class Client(object):
 
         self._log  = log
         self._cb   = None
-        self._ctx  = zmq.Context()
+        self._ctx  = zmq_context(self._url)
         self._sock = self._ctx.socket(zmq.REQ)
 
         self._sock.linger = _LINGER_TIMEOUT
@@ -51,6 +94,19 @@ class Client(object):
         self._term   = mt.Event()
         self._active = False
 
+        # requests issued via `request_async()` are pipelined over a `DEALER`
+        # socket which is owned by an I/O thread (started on first use)
+        self._io_lock    = mt.Lock()
+        self._io_thread  = None
+        self._io_sock    = None
+        self._io_pending = dict()  # request id: future
+        self._io_cnt     = 0
+        self._io_slots   = mt.BoundedSemaphore(_MAX_IN_FLIGHT)
+
+        self._many_lock  = mt.Lock()
+        self._many_sock  = None
+        self._many_epoch = 0       # id of the current `request_many()` call
+
 
     # --------------------------------------------------------------------------
     #
@@ -63,35 +119,318 @@ class Client(object):
     #
     def request(self, cmd: str, *args: Any, **kwargs: Any) -> Any:
 
-        msg = {'cmd'   : cmd,
-               'args'  : args,
-               'kwargs': kwargs}
+        if self._log:
+            self._log.debug('request: %s %s %s', cmd, args, kwargs)
+
+        req = _pack_request(cmd, args, kwargs)
+
+        no_intr(self._sock.send, req, copy=False)
+
+        return _get_result(as_string(recv_msgpack(self._sock)))
+
+
+    # --------------------------------------------------------------------------
+    #
+    def request_async(self, cmd: str, *args: Any, **kwargs: Any) -> Future:
+        '''
+        Send a request without waiting for the reply.  The returned future
+        will hold the result (or the `RuntimeError` raised for a failed
+        request).  Up to `_MAX_IN_FLIGHT` requests can be in flight at the same
+        time (further calls block until replies arrive), the server may reply
+        to them in any order.
+        '''
+
+        if self._log:
+            self._log.debug('request async: %s %s %s', cmd, args, kwargs)
+
+        req = _pack_request(cmd, args, kwargs)
+        fut = Future()
+
+        self._io_slots.acquire()
+
+        with self._io_lock:
+
+            if not self._io_thread:
+                self._io_start()
+
+            self._io_cnt += 1
+            rid = b'%d' % self._io_cnt
+            self._io_pending[rid] = fut
+
+            # hand the request to the I/O thread
+            no_intr(self._io_push.send_multipart, [rid, req], copy=False)
+
+        return fut
+
+
+    # --------------------------------------------------------------------------
+    #
+    def request_many(self, reqs: Sequence) -> List[Any]:
+        '''
+        Send a list of requests (`(cmd, args, kwargs)` tuples, `args` and
+        `kwargs` are optional) without waiting for individual round trips, and
+        return the list of results (in the order of requests).  A
+        `RuntimeError` is raised if any of the requests failed.
+        '''
+
+        reqs = _split_requests(reqs)
+
+        if self._log:
+            self._log.debug('request many: %d', len(reqs))
+
+        # the calling thread owns a separate `DEALER` socket for the duration
+        # of the call: all requests are sent before the replies are collected.
+        # Requests are tagged with `<epoch>.<idx>`: replies left over from an
+        # interrupted earlier call are discarded.
+        with self._many_lock:
+
+            if not self._many_sock:
+                self._many_sock = self._ctx.socket(zmq.DEALER)
+                self._many_sock.linger = _LINGER_TIMEOUT
+                self._many_sock.hwm    = _HIGH_WATER_MARK
+                sock_connect(self._many_sock, self._url)
+
+            self._many_epoch += 1
+
+            sock  = self._many_sock
+            epoch = b'%d' % self._many_epoch
+            ress  = [None] * len(reqs)
+            recv  = 0
+
+            def _recv():
+                while True:
+                    msg      = no_intr(sock.recv_multipart, copy=False)
+                    tag, idx = msg[1].bytes.split(b'.')
+                    if tag == epoch:
+                        break
+                ress[int(idx)] = as_string(from_msgpack(msg[2].buffer))
+
+            # limit the number of requests in flight so that replies are not
+            # dropped by the server once our receive buffer is full
+            for idx, (cmd, args, kwargs) in enumerate(reqs):
+                if idx - recv >= _MAX_IN_FLIGHT:
+                    _recv()
+                    recv += 1
+                no_intr(sock.send_multipart,
+                        [b'', b'%s.%d' % (epoch, idx),
+                         _pack_request(cmd, args, kwargs)], copy=False)
+
+            while recv < len(reqs):
+                _recv()
+                recv += 1
+
+        return [_get_result(res) for res in ress]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _io_start(self) -> None:
+
+        url = 'inproc://client.%x.io' % id(self)
+
+        self._io_pull = self._ctx.socket(zmq.PULL)
+        self._io_pull.bind(url)
+
+        self._io_push = self._ctx.socket(zmq.PUSH)
+        self._io_push.linger = 0
+        self._io_push.connect(url)
+
+        self._io_sock = self._ctx.socket(zmq.DEALER)
+        self._io_sock.linger = _LINGER_TIMEOUT
+        self._io_sock.hwm    = _HIGH_WATER_MARK
+        sock_connect(self._io_sock, self._url)
+
+        self._io_thread = mt.Thread(target=self._io_work)
+        self._io_thread.daemon = True
+        self._io_thread.start()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _io_work(self) -> None:
+
+        poller = zmq.Poller()
+        poller.register(self._io_pull, zmq.POLLIN)
+        poller.register(self._io_sock, zmq.POLLIN)
+
+        while not self._term.is_set():
+
+            event = dict(no_intr(poller.poll, timeout=100))
+
+            if self._io_pull in event:
+                # forward requests as `[b'', rid, req]` - the server returns
+                # the request id with the reply
+                while True:
+                    try:
+                        rid, req = self._io_pull.recv_multipart(
+                                                 flags=zmq.NOBLOCK, copy=False)
+                    except zmq.Again:
+                        break
+                    no_intr(self._io_sock.send_multipart, [b'', rid, req],
+                            copy=False)
+
+            if self._io_sock in event:
+                while True:
+                    try:
+                        msg = self._io_sock.recv_multipart(flags=zmq.NOBLOCK,
+                                                           copy=False)
+                    except zmq.Again:
+                        break
+
+                    with self._io_lock:
+                        fut = self._io_pending.pop(msg[1].bytes, None)
+
+                    if not fut:
+                        continue
+
+                    self._io_slots.release()
+
+                    try:
+                        res = as_string(from_msgpack(msg[2].buffer))
+                        fut.set_result(_get_result(res))
+                    except Exception as e:
+                        fut.set_exception(e)
+
+        self._io_pull.close()
+        self._io_sock.close()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self) -> None:
+
+        self._sock.close()
+
+        with self._many_lock:
+            if self._many_sock:
+                self._many_sock.close()
+
+        if self._io_thread:
+            self._term.set()
+            self._io_thread.join()
+            self._io_push.close()
+
+        with self._io_lock:
+            for fut in self._io_pending.values():
+                self._io_slots.release()
+                fut.set_exception(RuntimeError('client closed'))
+            self._io_pending.clear()
+
+
+# ------------------------------------------------------------------------------
+#
+class AsyncClient(object):
+    '''
+    asyncio variant of the `Client` class: requests are coroutines, and any
+    number of requests can be in flight at the same time.  Replies are
+    received by a reader task which is started on the first request:
+
+        client = AsyncClient(url=url)
+        res    = await client.request('echo', 'foo')
+        ress   = await client.request_many([('put', ['foo', 1]),
+                                            ('get', ['foo'])])
+        client.close()
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, server: str    = None,
+                       url:    str    = None,
+                       log:    Logger = None) -> None:
+
+        if server:
+            self._url = read_json('%s.cfg' % server)['addr']
+
+        elif url:
+            self._url = url
+
+        else:
+            raise ValueError('need server name/cfg or Url')
+
+        self._log     = log
+        self._ctx     = zmq.asyncio.Context()
+        self._sock    = self._ctx.socket(zmq.DEALER)
+        self._pending = dict()  # request id: future
+        self._cnt     = 0
+        self._reader  = None
+        self._window  = None
+
+        self._sock.linger = _LINGER_TIMEOUT
+        self._sock.hwm    = _HIGH_WATER_MARK
+
+        sock_connect(self._sock, self._url)
+
+
+    # --------------------------------------------------------------------------
+    #
+    @property
+    def url(self) -> str:
+        return self._url
+
+
+    # --------------------------------------------------------------------------
+    #
+    async def request(self, cmd: str, *args: Any, **kwargs: Any) -> Any:
 
         if self._log:
-            self._log.debug('request: %s', msg)
+            self._log.debug('request: %s %s %s', cmd, args, kwargs)
+
+        if not self._reader:
+            self._reader = asyncio.ensure_future(self._read())
+            self._window = asyncio.Semaphore(_MAX_IN_FLIGHT)
+
+        self._cnt += 1
+        rid = b'%d' % self._cnt
+        fut = asyncio.get_running_loop().create_future()
+
+        # limit the number of requests in flight (see `Client.request_many()`)
+        async with self._window:
 
-        req = to_msgpack(msg)
+            self._pending[rid] = fut
 
-        no_intr(self._sock.send, req)
+            await self._sock.send_multipart([b'', rid,
+                                             _pack_request(cmd, args, kwargs)],
+                                            copy=False)
+            res = await fut
 
-        msg = no_intr(self._sock.recv)
-        res = as_string(from_msgpack(msg))
+        return _get_result(res)
 
-        # FIXME: assert proper res structure
 
-        if res.get('err'):
-            err_msg = 'ERROR: %s' % res['err']
-            if res['exc']:
-                err_msg += '\n%s' % ''.join(res['exc'])
-            raise RuntimeError(err_msg)
+    # --------------------------------------------------------------------------
+    #
+    async def request_many(self, reqs: Sequence) -> List[Any]:
+        '''
+        see `Client.request_many()`
+        '''
 
-        return res['res']
+        return await asyncio.gather(*[self.request(cmd, *args, **kwargs)
+                           for cmd, args, kwargs in _split_requests(reqs)])
+
+
+    # --------------------------------------------------------------------------
+    #
+    async def _read(self) -> None:
+
+        while True:
+
+            msg = await self._sock.recv_multipart(copy=False)
+            fut = self._pending.pop(msg[1].bytes, None)
+
+            if fut and not fut.done():
+                fut.set_result(as_string(from_msgpack(msg[2].buffer)))
 
 
     # --------------------------------------------------------------------------
     #
     def close(self) -> None:
 
+        if self._reader:
+            self._reader.cancel()
+
+        for fut in self._pending.values():
+            fut.cancel()
+        self._pending.clear()
+
         self._sock.close()
 
 
@@ -2,10 +2,10 @@
 import zmq
 import threading as mt
 
-from ..serialize import to_msgpack, from_msgpack
+from ..serialize import to_msgpack
 from ..logger    import Logger
 
-from .utils import zmq_bind
+from .utils import zmq_bind, zmq_unlink, recv_msgpack
 
 MODE_PUSH = 'push'
 MODE_PULL = 'pull'
@@ -34,7 +34,7 @@ class Pipe(object):
 
     # --------------------------------------------------------------------------
     #
-    def __init__(self, mode, url=None, log=None) -> None:
+    def __init__(self, mode, url=None, log=None, transport=None) -> None:
         '''
         Create a `Pipe` instance which can be used for either sending (`put()`)
         or receiving (`get()` / `get_nowait()`) data. according to the specified
@@ -43,11 +43,18 @@ class Pipe(object):
         An URL can be specified for one end of the pipe - that end will then be
         in listening mode.  The other end of the pipe MUST use the connection
         URL provided by the listening end (`Pipe.url`).
+
+        The listening end binds to a `tcp` endpoint unless a different
+        `transport` is specified: `ipc` can be used if all endpoints live on the
+        same node, `inproc` if they all live in the same process.  The `ipc`
+        socket file is removed on `stop()`.
         '''
 
         self._context = zmq.Context.instance()
         self._mode    = mode
+        self._trans   = transport
         self._url     = None
+        self._bound   = None
         self._log     = log
         self._sock    = None
         self._poller  = None
@@ -94,7 +101,8 @@ class Pipe(object):
             self._sock.connect(url)
             self._url = url
         else:
-            self._url = zmq_bind(self._sock)
+            self._url   = zmq_bind(self._sock, transport=self._trans)
+            self._bound = self._url
 
         self._url = self._sock.getsockopt(zmq.LAST_ENDPOINT)
 
@@ -117,7 +125,8 @@ class Pipe(object):
             self._sock.connect(url)
             self._url = url
         else:
-            self._url = zmq_bind(self._sock)
+            self._url   = zmq_bind(self._sock, transport=self._trans)
+            self._bound = self._url
 
         self._poller = zmq.Poller()
         self._poller.register(self._sock, zmq.POLLIN)
@@ -133,7 +142,7 @@ class Pipe(object):
         assert self._mode == MODE_PULL
         assert not self._cbs
 
-        return from_msgpack(self._sock.recv())
+        return recv_msgpack(self._sock)
 
 
     # --------------------------------------------------------------------------
@@ -152,7 +161,7 @@ class Pipe(object):
         socks = dict(self._poller.poll(timeout=int(timeout * 1000)))
 
         if self._sock in socks:
-            return from_msgpack(self._sock.recv())
+            return recv_msgpack(self._sock)
 
 
     # --------------------------------------------------------------------------
@@ -167,7 +176,7 @@ class Pipe(object):
             socks = dict(self._poller.poll(timeout=10))
 
             if self._sock in socks:
-                msg = from_msgpack(self._sock.recv())
+                msg = recv_msgpack(self._sock)
 
                 for cb in self._cbs:
                     try:
@@ -224,7 +233,7 @@ class Pipe(object):
         '''
 
         assert self._mode == MODE_PUSH
-        self._sock.send(to_msgpack(msg))
+        self._sock.send(to_msgpack(msg), copy=False)
 
 
     # --------------------------------------------------------------------------
@@ -244,6 +253,10 @@ class Pipe(object):
 
         self._stop_listener()
 
+        if self._bound:
+            zmq_unlink(self._bound)
+            self._bound = None
+
 
 
 # ------------------------------------------------------------------------------
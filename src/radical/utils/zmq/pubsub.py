@@ -16,7 +16,8 @@ from ..profile   import Profiler
 from ..serialize import to_msgpack, from_msgpack
 
 from .bridge     import Bridge
-from .utils      import zmq_bind, no_intr, log_bulk, LOG_ENABLED
+from .utils      import no_intr, log_bulk, LOG_ENABLED
+from .utils      import split_topic
 
 
 # ------------------------------------------------------------------------------
@@ -24,6 +25,8 @@ from .utils      import zmq_bind, no_intr, log_bulk, LOG_ENABLED
 _LINGER_TIMEOUT  =   250  # ms to linger after close
 _HIGH_WATER_MARK =     0  # number of messages to buffer before dropping
                           # 0:  infinite
+_DRAIN_MAX       =  1024  # max number of messages received per listener cycle
+_BULK            = b'\xc1' # marks bulk frames (byte is never used by msgpack)
 
 
 # ------------------------------------------------------------------------------
@@ -39,6 +42,15 @@ atfork(noop, noop, _atfork_child)
 # ------------------------------------------------------------------------------
 #
 class PubSub(Bridge):
+    '''
+    The PubSub bridge forwards published messages to all subscribers of the
+    respective topic.  By default, messages are forwarded by a Python loop
+    which allows to log and profile the message flow.  If the `proxy` config
+    setting is `True`, forwarding is instead performed by libzmq's native
+    proxy (`zmq.proxy_steerable`), which is much faster but does not log.  In
+    that mode, the `stats` config setting enables a capture socket on which
+    the bridge counts forwarded messages and bytes (see `stats`).
+    '''
 
     # --------------------------------------------------------------------------
     #
@@ -85,6 +97,16 @@ class PubSub(Bridge):
     def addr_sub(self):
         return self._addr_sub
 
+    @property
+    def stats(self):
+        '''
+        number of messages and bytes forwarded in proxy mode (only available
+        if the `stats` config setting is enabled, may miss messages under
+        high load).  A bulk sent by `Publisher.put_bulk()` counts as a single
+        message.
+        '''
+        return dict(self._stats)
+
 
     # --------------------------------------------------------------------------
     #
@@ -98,12 +120,12 @@ class PubSub(Bridge):
         self._xpub        = self._ctx.socket(zmq.XSUB)
         self._xpub.linger = _LINGER_TIMEOUT
         self._xpub.hwm    = _HIGH_WATER_MARK
-        self._addr_pub    = zmq_bind(self._xpub)
+        self._addr_pub    = self._bridge_bind(self._xpub, 'pub')
 
         self._xsub        = self._ctx.socket(zmq.XPUB)
         self._xsub.linger = _LINGER_TIMEOUT
         self._xsub.hwm    = _HIGH_WATER_MARK
-        self._addr_sub    = zmq_bind(self._xsub)
+        self._addr_sub    = self._bridge_bind(self._xsub, 'sub')
 
         self._log.info('bridge pub on  %s: %s', self._uid, self._addr_pub)
         self._log.info('       sub on  %s: %s', self._uid, self._addr_sub)
@@ -116,13 +138,44 @@ class PubSub(Bridge):
         self._poll.register(self._xpub, zmq.POLLIN)
         self._poll.register(self._xsub, zmq.POLLIN)
 
+        # native proxy mode: the control socket is used to terminate the
+        # proxy, the capture socket receives a copy of all messages.  The peer
+        # of the control socket is connected right away, so that the
+        # termination message cannot get lost on `stop()`.
+        self._proxy     = self._cfg.get('proxy', False)
+        self._ctrl      = None
+        self._ctrl_peer = None
+        self._capture   = None
+        self._stats     = {'msgs': 0, 'bytes': 0}
+
+        if self._proxy:
+
+            self._addr_ctrl = 'inproc://%s.ctrl' % self._uid
+            self._ctrl      = self._ctx.socket(zmq.PAIR)
+            self._ctrl.bind(self._addr_ctrl)
+
+            self._ctrl_peer = self._ctx.socket(zmq.PAIR)
+            self._ctrl_peer.connect(self._addr_ctrl)
+
+            if self._cfg.get('stats', False):
+                # use a PUB socket so that a slow stats thread cannot stall
+                # the proxy
+                self._addr_capture = 'inproc://%s.capture' % self._uid
+                self._capture      = self._ctx.socket(zmq.PUB)
+                self._capture.bind(self._addr_capture)
+
 
     # --------------------------------------------------------------------------
     #
     def _bridge_work(self):
 
-        # we could use a zmq proxy - but we rather code it directly to have
-        # proper logging, timing, etc.  But the code for the proxy would be:
+        if self._proxy:
+            self._proxy_work()
+            return
+
+        # by default we don't use a zmq proxy - but rather code it directly to
+        # have proper logging, timing, etc.  But the code for the proxy would
+        # be:
         #
         #     zmq.proxy(socket_pub, socket_sub)
         #
@@ -150,13 +203,75 @@ class PubSub(Bridge):
 
                 # if the pub socket signals a message, get the message
                 # and forward it to the sub channel, no questions asked.
-                msg = self._xpub.recv()
-                self._xsub.send(msg)
+                msg = self._xpub.recv(copy=False)
+                self._xsub.send(msg, copy=False)
 
               # self._prof.prof('msg_fwd', uid=self._uid, msg=msg)
                 log_bulk(self._log, '<> %s' % self.uid, [msg])
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _proxy_work(self):
+
+        if self._capture:
+            stats = mt.Thread(target=self._stats_work)
+            stats.daemon = True
+            stats.start()
+
+        self._log.info('start proxy %s', self._uid)
+
+        try:
+            zmq.proxy_steerable(self._xpub, self._xsub,
+                                self._capture, self._ctrl)
+
+        except zmq.ContextTerminated:
+            pass
+
+        except Exception:
+            self._log.exception('proxy failed')
+
+        self._log.info('proxy %s terminated', self._uid)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _stats_work(self):
+
+        sock = self._ctx.socket(zmq.SUB)
+        sock.setsockopt(zmq.SUBSCRIBE, b'')
+        sock.connect(self._addr_capture)
+
+        while not self._term.is_set():
+
+            if not sock.poll(flags=zmq.POLLIN, timeout=100):
+                continue
+
+            frame = sock.recv(copy=False)
+
+            # subscription messages start with `\x00` or `\x01`
+            if frame.buffer[:1].tobytes() in [b'\x00', b'\x01']:
+                continue
+
+            self._stats['msgs']  += 1
+            self._stats['bytes'] += len(frame)
+
+        sock.close()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def stop(self):
+
+        Bridge.stop(self)
+
+        if self._proxy and self._ctrl_peer:
+            self._ctrl_peer.send(b'TERMINATE')
+            self._bridge_thread.join()
+            self._ctrl_peer.close()
+            self._ctrl_peer = None
+
+
 # ------------------------------------------------------------------------------
 #
 class Publisher(object):
@@ -240,6 +355,29 @@ class Publisher(object):
         self._socket.send(data)
 
 
+    # --------------------------------------------------------------------------
+    #
+    def put_bulk(self, topic, msgs):
+        '''
+        publish a list of messages on the same topic.  The messages are
+        serialized and sent as a single frame, subscribers unpack that frame
+        and deliver the messages in their original order.
+        '''
+
+        assert isinstance(topic, str), 'invalid topic type'
+
+        if not msgs:
+            return
+
+        log_bulk(self._log, '-> %s' % topic, msgs)
+
+        btopic = as_bytes(topic.replace(' ', '_'))
+        bmsgs  = to_msgpack(msgs)
+        data   = btopic + b' ' + _BULK + bmsgs
+
+        self._socket.send(data)
+
+
 # ------------------------------------------------------------------------------
 #
 class Subscriber(object):
@@ -253,21 +391,71 @@ class Subscriber(object):
     # --------------------------------------------------------------------------
     #
     @staticmethod
-    def _get_nowait(socket, lock, timeout, log, prof):
+    def _unpack(data):
+        '''
+        unpack a received frame into a list of `[topic, msg]` pairs: frames
+        sent by `Publisher.put_bulk()` hold a list of messages, all other
+        frames a single message.
+        '''
+
+        btopic, bmsg = split_topic(data)
+        topic        = as_string(btopic)
+
+        if bmsg[:1] == _BULK:
+            return [[topic, as_string(msg)] for msg in from_msgpack(bmsg[1:])]
+
+        return [[topic, as_string(from_msgpack(bmsg))]]
+
+
+    # --------------------------------------------------------------------------
+    #
+    @staticmethod
+    def _get_all(socket, timeout, log):
+        '''
+        wait up to `timeout` ms for messages, then receive all available
+        messages (up to `_DRAIN_MAX`, but bulks are never split) without
+        blocking.  Returns a list of `[topic, msg]` pairs.
+        '''
+
+        ret = list()
 
-        # FIXME: add logging
+        if not socket.poll(flags=zmq.POLLIN, timeout=timeout):
+            return ret
 
-        if socket.poll(flags=zmq.POLLIN, timeout=timeout):
+        while len(ret) < _DRAIN_MAX:
 
-            data        = no_intr(socket.recv, flags=zmq.NOBLOCK)
-            topic, bmsg = data.split(b' ', 1)
-            msg         = from_msgpack(bmsg)
+            try:
+                data = socket.recv(flags=zmq.NOBLOCK, copy=False)
+            except zmq.Again:
+                break
 
-            log.debug_9(' <- %s: %s', topic, msg)
+            msgs = Subscriber._unpack(data)
 
-            return [as_string(topic), as_string(msg)]
+            log.debug_9(' <- %s', msgs)
+            ret.extend(msgs)
 
-        return None, None
+        return ret
+
+
+    # --------------------------------------------------------------------------
+    #
+    @staticmethod
+    def _call(cb, lock, topic, msg, term, log):
+
+        # a failing callback must not drop the remaining messages
+        try:
+            if lock:
+                with lock:
+                    cb(topic, msg)
+            else:
+                cb(topic, msg)
+
+        except SystemExit:
+            log.info('callback called sys.exit')
+            term.set()
+
+        except:
+            log.exception('callback error')
 
 
     # --------------------------------------------------------------------------
@@ -275,30 +463,53 @@ class Subscriber(object):
     @staticmethod
     def _listener(sock, lock, term, callbacks, log, prof):
 
+        # the listener drains all available messages on each cycle.  As for
+        # individually received messages, callbacks are invoked for each
+        # message in turn, in the order of registration.  Callbacks
+        # registered with `bulk=True` are then called once per topic with
+        # a list of those messages.
+
         try:
             while not term.is_set():
 
+                msgs = Subscriber._get_all(sock, 500, log)
+
+                if not msgs:
+                    continue
+
                 # this list is dynamic
-                topic, msg = Subscriber._get_nowait(sock, lock, 500, log, prof)
-
-                log.debug_9(' <- %s: %s', topic, msg)
-
-                if topic:
-                    for cb, _lock in callbacks:
-                      # prof.prof('call_cb', uid=uid, msg=cb.__name__)
-                        try:
-                            if _lock:
-                                with _lock:
-                                    cb(topic, msg)
-                            else:
-                                cb(topic, msg)
-                        except SystemExit:
-                            log.info('callback called sys.exit')
-                            term.set()
+                cbs = list(callbacks)
+
+                for topic, msg in msgs:
+                    for cb, _lock, bulk in cbs:
+                        if not bulk:
+                          # prof.prof('call_cb', uid=uid, msg=cb.__name__)
+                            Subscriber._call(cb, _lock, topic, msg, term, log)
+                        if term.is_set():
                             break
-
-                        except:
-                            log.exception('callback error')
+                    if term.is_set():
+                        break
+
+                if term.is_set():
+                    break
+
+                if not any(bulk for _, _, bulk in cbs):
+                    continue
+
+                bulks = dict()
+                for topic, msg in msgs:
+                    if topic not in bulks:
+                        bulks[topic] = list()
+                    bulks[topic].append(msg)
+
+                for cb, _lock, bulk in cbs:
+                    if bulk:
+                        for topic, tmsgs in bulks.items():
+                            Subscriber._call(cb, _lock, topic, tmsgs, term, log)
+                            if term.is_set():
+                                break
+                    if term.is_set():
+                        break
         except:
             log.exception('listener died')
 
@@ -329,6 +540,7 @@ class Subscriber(object):
         self._term      = mt.Event()
         self._callbacks = list()
         self._thread    = None
+        self._msgs      = list()    # messages of partially consumed bulks
         self._uid       = generate_id('%s.sub.%s' % (self._channel,
                                                     '%(counter)04d'), ID_CUSTOM)
 
@@ -429,7 +641,7 @@ class Subscriber(object):
 
     # --------------------------------------------------------------------------
     #
-    def subscribe(self, topic, cb=None, lock=None):
+    def subscribe(self, topic, cb=None, lock=None, bulk=False):
 
         # if we need to serve callbacks, then open a thread to watch the socket
         # and register the callbacks.  If a thread is already runnning on that
@@ -440,11 +652,15 @@ class Subscriber(object):
         # thread consuming the messages,
         #
         # The given lock (if any) is used to shield concurrent cb invokations.
+        #
+        # If `bulk` is set, the callback is invoked with a list of messages
+        # (all messages received on that topic since the last invocation)
+        # instead of once per message.
 
         if cb:
             self._interactive = False
             self._start_listener()
-            self._callbacks.append([cb, lock])
+            self._callbacks.append([cb, lock, bulk])
 
         topic = str(topic).replace(' ', '_')
         log_bulk(self._log, '~~2 %s' % topic, [topic])
@@ -461,9 +677,9 @@ class Subscriber(object):
     #
     def unsubscribe(self, cb):
 
-        for _cb, _lock in self._callbacks:
-            if cb == _cb:
-                self._callbacks.remove([_cb, _lock])
+        for entry in self._callbacks:
+            if cb == entry[0]:
+                self._callbacks.remove(entry)
                 break
 
         if not self._callbacks:
@@ -488,36 +704,40 @@ class Subscriber(object):
         # FIXME: add timeout to allow for graceful termination
         #
         with self._lock:
-            data = no_intr(self._sock.recv)
+            if not self._msgs:
+                data = no_intr(self._sock.recv, copy=False)
+                self._msgs.extend(Subscriber._unpack(data))
 
-        topic, bmsg = data.split(b' ', 1)
-        msg = from_msgpack(bmsg)
+            topic, msg = self._msgs.pop(0)
 
         log_bulk(self._log, '<- %s' % topic, [msg])
 
-        return [as_string(topic), as_string(msg)]
+        return [topic, msg]
 
 
     # --------------------------------------------------------------------------
     #
     def get_nowait(self, timeout=None):
 
-        # FIXME:  does this duplicate _get_nowait? why / why not?
+        # FIXME:  does this duplicate _get_all? why / why not?
 
         if not self._interactive:
             raise RuntimeError('invalid get_nowait(): callbacks are registered')
 
-        if no_intr(self._sock.poll, flags=zmq.POLLIN, timeout=timeout):
+        if self._msgs or \
+                no_intr(self._sock.poll, flags=zmq.POLLIN, timeout=timeout):
 
             with self._lock:
-                data = no_intr(self._sock.recv, flags=zmq.NOBLOCK)
+                if not self._msgs:
+                    data = no_intr(self._sock.recv, flags=zmq.NOBLOCK,
+                                   copy=False)
+                    self._msgs.extend(Subscriber._unpack(data))
 
-            topic, bmsg = data.split(b' ', 1)
-            msg = from_msgpack(bmsg)
+                topic, msg = self._msgs.pop(0)
 
             log_bulk(self._log, '<- %s' % topic, [msg])
 
-            return [as_string(topic), as_string(msg)]
+            return [topic, msg]
 
         else:
             return [None, None]
@@ -1,24 +1,31 @@
 # pylint: disable=protected-access, abstract-class-instantiated
 
+import os
 import sys
 import zmq
 import time
+import atexit
+import struct
+import weakref
+import msgpack
 
 import threading as mt
 
+from collections import deque
+
 from typing      import Optional
 
 from ..atfork    import atfork
 from ..config    import Config
 from ..ids       import generate_id, ID_CUSTOM
-from ..misc      import as_string, as_bytes, as_list, noop
+from ..misc      import as_string, as_bytes, as_list, noop, ru_open
 from ..logger    import Logger
 from ..profile   import Profiler
 from ..debug     import print_exception_trace
 from ..serialize import to_msgpack, from_msgpack
 
 from .bridge     import Bridge
-from .utils      import zmq_bind, no_intr
+from .utils      import zmq_context, no_intr
 from .utils      import log_bulk, LOG_ENABLED
 # from .utils    import prof_bulk
 
@@ -28,6 +35,57 @@ from .utils      import log_bulk, LOG_ENABLED
 _LINGER_TIMEOUT    =  250  # ms to linger after close
 _HIGH_WATER_MARK   =    0  # number of messages to buffer before dropping
 _DEFAULT_BULK_SIZE = 1024  # number of messages to put in a bulk
+_POLL_TIMEOUT      =  100  # ms to block in the bridge poll
+_DEFAULT_CREDITS   = 1024  # number of messages pushed ahead to a listener
+_DRAIN_TIMEOUT     =  100  # ms to wait for pushed messages on listener stop
+_BLOCK_HWM         =   16  # bulks buffered by zmq when blocking on backlog
+
+# policies for queues which exceed their backlog limit.  When blocking, zmq
+# buffers up to `_BLOCK_HWM` bulks in the bridge and in each putter on top of
+# the backlog, then `Putter.put()` blocks.
+BACKLOG_BLOCK = 'block'   # stop receiving messages until the backlog shrinks
+BACKLOG_DROP  = 'drop'    # discard messages exceeding the backlog limit
+BACKLOG_SPILL = 'spill'   # store messages exceeding the limit on disk
+
+_SPILL_LEN = struct.Struct('<I')
+
+
+# ------------------------------------------------------------------------------
+#
+def _split_bulk(data):
+    '''
+    Split a serialized bulk (a msgpack array) into a list of the serialized
+    messages, without deserializing them.  The messages are returned as
+    memoryviews into `data`.
+    '''
+
+    unpacker = msgpack.Unpacker(max_buffer_size=len(data))
+    unpacker.feed(data)
+
+    view = memoryview(data)
+    ret  = list()
+
+    for _ in range(unpacker.read_array_header()):
+        start = unpacker.tell()
+        unpacker.skip()
+        ret.append(view[start:unpacker.tell()])
+
+    return ret
+
+
+def _join_bulk(frames):
+    '''
+    inverse of `_split_bulk`: create a serialized bulk (msgpack array) from
+    a list of serialized messages
+    '''
+
+    n = len(frames)
+
+    if   n < 0x10   : head = bytes([0x90 | n])
+    elif n < 0x10000: head = b'\xdc' + struct.pack('>H', n)
+    else            : head = b'\xdd' + struct.pack('>I', n)
+
+    return b''.join([head] + frames)
 
 
 # ------------------------------------------------------------------------------
@@ -39,6 +97,205 @@ def _atfork_child():
 atfork(noop, noop, _atfork_child)
 
 
+# ------------------------------------------------------------------------------
+#
+# putters which coalesce messages - send pending messages on exit
+_putters = weakref.WeakSet()
+
+
+def _atexit_flush():
+    for putter in list(_putters):
+        try:
+            putter.flush()
+        except:
+            pass
+
+
+atexit.register(_atexit_flush)
+
+
+# ------------------------------------------------------------------------------
+#
+class _QueueBuffer(object):
+    '''
+    Message buffer for a single queue of the bridge.  Incoming bulks are kept
+    as chunks in a deque, and gets are served from the head chunk(s), so that
+    both operations are independent of the backlog size.
+
+    If `limit` is set, the buffer is considered `full` once it holds that many
+    messages.  Depending on `policy`, further messages are then either
+    accepted anyway (`BACKLOG_BLOCK`: the bridge stops receiving), dropped
+    (`BACKLOG_DROP`), or appended to the `spill` file (`BACKLOG_SPILL`) and
+    read back once the in-memory backlog shrinks.  Message order is
+    preserved in all cases.  `decode` is used to convert spilled bulks back
+    into lists of messages.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, limit=0, policy=BACKLOG_BLOCK, spill=None,
+                       decode=from_msgpack):
+
+        self._chunks  = deque()
+        self._off     = 0        # offset of first message in head chunk
+        self._len     = 0        # number of messages in memory
+        self._limit   = limit
+        self._policy  = policy
+        self._spill   = spill    # spill file name
+        self._sout    = None     # spill file handle for writing
+        self._sin     = None     # spill file handle for reading
+        self._nspill  = 0        # number of bulks on disk
+        self._decode  = decode
+        self.dropped  = 0
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __len__(self):
+
+        return self._len
+
+
+    @property
+    def full(self):
+
+        return bool(self._limit) and self._len >= self._limit
+
+
+    @property
+    def spilled(self):
+
+        return self._nspill
+
+
+    # --------------------------------------------------------------------------
+    #
+    def put(self, msgs, data=None):
+        '''
+        buffer a bulk of messages.  `data` is the serialized bulk (if
+        available), which is used when spilling the bulk to disk.
+        '''
+
+        if not msgs:
+            return
+
+        if self._limit and self._policy != BACKLOG_BLOCK:
+
+            if self._policy == BACKLOG_DROP:
+                space = self._limit - self._len
+                if space < len(msgs):
+                    self.dropped += len(msgs) - max(0, space)
+                    msgs = msgs[:max(0, space)]
+                    if not msgs:
+                        return
+
+            elif self._nspill or self._len >= self._limit:
+                # spill entire bulks, and keep spilling while older messages
+                # are on disk
+                if data is None:
+                    data = to_msgpack(msgs)
+                self._spill_out(data)
+                return
+
+        self._chunks.append(msgs)
+        self._len += len(msgs)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def get(self, n):
+        '''
+        remove and return up to `n` messages from the buffer
+        '''
+
+        ret = list()
+        while n and self._chunks:
+
+            head = self._chunks[0]
+            end  = self._off + n
+
+            if end < len(head):
+                ret.extend(head[self._off:end])
+                self._off = end
+                break
+
+            ret.extend(head[self._off:] if self._off else head)
+            self._chunks.popleft()
+            self._off = 0
+            n = end - len(head)
+
+        self._len -= len(ret)
+
+        # refill from disk while there is space
+        while self._nspill and not self.full:
+            msgs = self._spill_in()
+            self._chunks.append(msgs)
+            self._len += len(msgs)
+
+        return ret
+
+
+    # --------------------------------------------------------------------------
+    #
+    def unget(self, msgs):
+        '''
+        return messages obtained from `get()` to the head of the buffer
+        '''
+
+        if not msgs:
+            return
+
+        if self._off:
+            self._chunks[0] = self._chunks[0][self._off:]
+            self._off       = 0
+
+        self._chunks.appendleft(msgs)
+        self._len += len(msgs)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _spill_out(self, data):
+
+        if not self._sout:
+            self._sout = ru_open(self._spill, 'wb')
+            self._sin  = ru_open(self._spill, 'rb')
+
+        self._sout.write(_SPILL_LEN.pack(len(data)))
+        self._sout.write(data)
+        self._nspill += 1
+
+
+    def _spill_in(self):
+
+        if self._sout:
+            self._sout.flush()
+
+        size = _SPILL_LEN.unpack(self._sin.read(_SPILL_LEN.size))[0]
+        msgs = self._decode(self._sin.read(size))
+        self._nspill -= 1
+
+        # remove the spill file once it is consumed
+        if not self._nspill:
+            self.close()
+
+        return msgs
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self):
+
+        if self._sout:
+            self._sout.close()
+            self._sin.close()
+            self._sout = None
+            self._sin  = None
+            os.unlink(self._spill)
+
+        self._nspill = 0
+
+
 # ------------------------------------------------------------------------------
 #
 # Communication between components is done via queues.  Queues are
@@ -101,6 +358,38 @@ class Queue(Bridge):
         Addresses are of the form 'tcp://host:port'.  Both 'host' and 'port' can
         be wildcards for BRIDGE roles -- the bridge will report the in and out
         addresses as obj.addr_put and obj.addr_get.
+
+        The `backlog` config setting limits the number of messages buffered
+        per queue (default: `0`, unlimited).  The `backlog_policy` setting
+        determines what happens to messages exceeding that limit:
+
+            BACKLOG_BLOCK: the bridge stops receiving messages (for all
+                           queues) until the backlog shrinks
+            BACKLOG_DROP : messages are discarded
+            BACKLOG_SPILL: messages are stored in the bridge's working
+                           directory and are delivered once the backlog shrinks
+
+        The bridge does not need to inspect the messages: by default it splits
+        incoming bulks into the serialized messages and serves requests by
+        concatenating those, without deserializing them.  Set the
+        `passthrough` config setting to `False` to have the bridge operate on
+        deserialized messages instead (which allows to log them).
+
+        The bridge sends bulks of up to `bulk_size` messages.  If
+        `bulk_adaptive` is set, the bulk size is adapted to the backlog: it is
+        divided evenly over the waiting getters (but is at least `bulk_min`
+        messages), so that faster consumers (which request more often) receive
+        more messages, and small backlogs are spread over all consumers.
+
+        The `put_bulk_time` setting (in seconds) lets `Putter` instances which
+        use the bridge config coalesce messages for that long before sending
+        them in a single bulk, `put_bulk_size` limits the size of coalesced
+        bulks (see `Putter`).
+
+        Requests on an empty queue are answered once messages arrive.  The
+        `poll_timeout` config setting (in ms) determines how long the bridge
+        blocks while idle: `0` minimizes latency by busy polling, larger values
+        minimize CPU use (default: 100 ms).
         '''
 
         if cfg:
@@ -126,6 +415,9 @@ class Queue(Bridge):
         if self._bulk_size <= 0:
             self._bulk_size = _DEFAULT_BULK_SIZE
 
+        self._bulk_min      = max(1, self._cfg.get('bulk_min', 1))
+        self._bulk_adaptive = self._cfg.get('bulk_adaptive', False)
+
 
     # --------------------------------------------------------------------------
     #
@@ -157,6 +449,23 @@ class Queue(Bridge):
         return self._addr_get
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _bridge_config(self):
+
+        ret = dict()
+        for key in ['put_bulk_size', 'put_bulk_time']:
+            if self._cfg.get(key):
+                ret[key] = self._cfg[key]
+
+        # let putters block when the backlog is full
+        if self._cfg.get('backlog') and \
+           self._cfg.get('backlog_policy', BACKLOG_BLOCK) == BACKLOG_BLOCK:
+            ret['put_hwm'] = _BLOCK_HWM
+
+        return ret
+
+
     # --------------------------------------------------------------------------
     #
     def _bridge_initialize(self):
@@ -165,129 +474,249 @@ class Queue(Bridge):
 
         self._lock       = mt.Lock()
 
-        self._ctx        = zmq.Context()  # rely on GC for destruction
+        # optional limit of buffered messages per queue
+        self._backlog = self._cfg.get('backlog', 0)
+        self._policy  = self._cfg.get('backlog_policy', BACKLOG_BLOCK)
+
+        if self._policy not in [BACKLOG_BLOCK, BACKLOG_DROP, BACKLOG_SPILL]:
+            raise ValueError('invalid backlog policy %s' % self._policy)
+
+        # when blocking on a full backlog, zmq must not buffer an unlimited
+        # number of bulks in the meantime
+        if self._backlog and self._policy == BACKLOG_BLOCK:
+            put_hwm = _BLOCK_HWM
+        else:
+            put_hwm = _HIGH_WATER_MARK
+
+        self._ctx        = zmq_context(self._cfg.get('transport'))
         self._put        = self._ctx.socket(zmq.PULL)
         self._put.linger = _LINGER_TIMEOUT
-        self._put.hwm    = _HIGH_WATER_MARK
-        self._addr_put   = zmq_bind(self._put)
-
-        self._get        = self._ctx.socket(zmq.REP)
+        self._put.hwm    = put_hwm
+        self._addr_put   = self._bridge_bind(self._put, 'put')
+
+        # getters use `REQ` sockets.  We serve them via a `ROUTER` socket so
+        # that requests on empty queues can be held back until messages arrive
+        # (a `REP` socket would need to reply before the next request can be
+        # received).  `ROUTER_MANDATORY` lets us detect replies to getters
+        # which went away, so that their messages are not lost.
+        self._get        = self._ctx.socket(zmq.ROUTER)
         self._get.linger = _LINGER_TIMEOUT
         self._get.hwm    = _HIGH_WATER_MARK
-        self._addr_get   = zmq_bind(self._get)
+        self._get.setsockopt(zmq.ROUTER_MANDATORY, 1)
+        self._addr_get   = self._bridge_bind(self._get, 'get')
 
         self._log.info('bridge in  %s: %s', self._uid, self._addr_put)
         self._log.info('bridge out %s: %s', self._uid, self._addr_get)
 
-        # start polling senders
-        self._poll_put = zmq.Poller()
-        self._poll_put.register(self._put, zmq.POLLIN)
+        # poll senders and receivers in a single poller, so that the bridge
+        # blocks until either side becomes active.  The poll timeout only
+        # determines how quickly the bridge reacts on `stop()`: a timeout of
+        # `0` results in busy polling (lowest latency, but one core is kept
+        # busy), larger timeouts keep the CPU idle while no messages arrive.
+        self._poll_timeout = self._cfg.get('poll_timeout', _POLL_TIMEOUT)
 
-        # start polling receivers
-        self._poll_get = zmq.Poller()
-        self._poll_get.register(self._get, zmq.POLLIN)
+        self._poll = zmq.Poller()
+        self._poll.register(self._put, zmq.POLLIN)
+        self._poll.register(self._get, zmq.POLLIN)
+
+        # keep messages serialized
+        self._passthrough = self._cfg.get('passthrough', True)
+
+        if self._passthrough:
+            self._decode = _split_bulk
+            self._encode = _join_bulk
+        else:
+            self._decode = from_msgpack
+            self._encode = to_msgpack
 
 
     # --------------------------------------------------------------------------
     #
     def _bridge_work(self):
 
-        # TODO: *always* pull for messages and buffer them.  Serve requests from
-        #       that buffer.
-
         try:
 
             self.nin  = 0
             self.nout = 0
             self.last = 0
 
-            buf = dict()
+            buf     = dict()  # qname: _QueueBuffer
+            reqs    = dict()  # qname: deque of waiting requests
+            grants  = dict()  # qname: {identity: request} for listeners
+            full    = set()   # names of queues exceeding their backlog
+            blocked = False   # put socket removed from poller
+
             while not self._term.is_set():
 
-                active = False
+                events = dict(no_intr(self._poll.poll,
+                                      timeout=self._poll_timeout))
+                self._log.debug_9('polled: %s', events)
 
-                # check for incoming messages, and buffer them
-                ev_put = dict(no_intr(self._poll_put.poll, timeout=10))
-              # self._prof.prof('poll_put', msg=len(ev_put))
-                self._log.debug_9('polled put: %s', ev_put)
+                if self._put in events:
 
-                if self._put in ev_put:
+                    # drain all incoming bulks before serving requests
+                    while True:
 
-                    with self._lock:
-                        data = list(no_intr(self._put.recv_multipart))
-                    self._log.debug_9('recvd  put: %s', data)
+                        try:
+                            data = self._put.recv_multipart(flags=zmq.NOBLOCK,
+                                                            copy=False)
+                        except zmq.Again:
+                            break
 
-                    if len(data) != 2:
-                        raise RuntimeError('%d frames unsupported' % len(data))
+                        self._log.debug_9('recvd  put: %s', data)
 
-                    qname = as_string(from_msgpack(data[0]))
-                    msgs  = from_msgpack(data[1])
-                  # prof_bulk(self._prof, 'poll_put_recv', msgs)
-                    log_bulk(self._log, '<> %s' % qname, msgs)
-                    self._log.debug_9('put %s: %s ! ', qname, len(msgs))
+                        if len(data) != 2:
+                            raise RuntimeError('%d frames unsupported'
+                                              % len(data))
 
-                    if qname not in buf:
-                        buf[qname] = list()
-                    buf[qname] += msgs
-                    self.nin   += len(msgs)
+                        qname = as_string(from_msgpack(data[0].buffer))
+                        msgs  = self._decode(data[1].buffer)
+                        if not self._passthrough:
+                            log_bulk(self._log, '<> %s' % qname, msgs)
+                        self._log.debug_9('put %s: %s ! ', qname, len(msgs))
 
-                    active = True
+                        if qname not in buf:
+                            buf[qname] = self._create_buffer(qname)
+                        buf[qname].put(msgs, data[1].buffer)
+                        self.nin += len(msgs)
 
+                        if reqs.get(qname):
+                            self._serve(qname, buf, reqs, grants)
 
-                # check if somebody wants our messages
-                ev_get = dict(no_intr(self._poll_get.poll, timeout=10))
-              # self._prof.prof('poll_get', msg=len(ev_get))
-                self._log.debug_9('polled get: %s [%s]', ev_get, self._get)
+                        if buf[qname].full:
+                            full.add(qname)
 
-                if self._get in ev_get:
+                            if self._policy == BACKLOG_BLOCK:
+                                # leave remaining bulks in the socket
+                                self._log.debug('block on %s', qname)
+                                self._poll.unregister(self._put)
+                                blocked = True
+                                break
 
-                    # send up to `bulk_size` messages from the buffer
-                    # NOTE: this sends partial bulks on buffer underrun
-                    with self._lock:
-                        # the actual req message is ignored - we only care
-                        # about who sent it
-                        qname = as_string(no_intr(self._get.recv))
 
-                    if not qname:
-                        qname = 'default'
+                if self._get in events:
 
-                    if qname in buf:
-                        msgs = buf[qname][:self._bulk_size]
-                    else:
-                        self._log.debug_9('get: %s not in %s', qname,
-                                                             list(buf.keys()))
-                        msgs = list()
+                    # collect all pending requests.  Requests from `REQ`
+                    # sockets consist of the queue name and are answered by
+                    # a single bulk.  Listeners (`DEALER` sockets) add the
+                    # number of messages they are willing to receive
+                    # (credits), and are served until those are used up.
+                    while True:
 
-                    log_bulk(self._log, '>< %s' % qname, msgs)
+                        try:
+                            data = self._get.recv_multipart(flags=zmq.NOBLOCK)
+                        except zmq.Again:
+                            break
 
-                    data   = [to_msgpack(qname), to_msgpack(msgs)]
-                    active = True
+                        ident = data[0]
+                        qname = as_string(data[2])
+                        if not qname:
+                            qname = 'default'
 
-                  # self._log.debug_9('==== get %s: %s', qname, list(buf.keys()))
-                  # self._log.debug_9('==== get %s: %s', qname, list(buf.values()))
-                  # self._log.debug_9('==== get %s: %s ! [%s]', qname, len(msgs),
-                  #                        [[x, len(y)] for x,y in buf.items()])
-                    no_intr(self._get.send_multipart, data)
-                  # prof_bulk(self._prof, 'poll_get_send', msgs=msgs, msg=req)
+                        if qname not in reqs:
+                            reqs[qname]   = deque()
+                            grants[qname] = dict()
 
-                    self.nout += len(msgs)
-                    self.last  = time.time()
+                        if len(data) > 3:
+                            n_credits = int(data[3])
+                            req       = grants[qname].get(ident)
+                            if req:
+                                req[1] += n_credits
+                            else:
+                                req = [ident, n_credits, False]
+                                grants[qname][ident] = req
+                                reqs[qname].append(req)
+                        else:
+                            reqs[qname].append([ident, self._bulk_size, True])
 
-                    # remove sent messages from buffer
-                    if msgs:
-                        del buf[qname][:self._bulk_size]
+                        if qname in buf:
+                            self._serve(qname, buf, reqs, grants)
 
-                if not active:
-                  # self._prof.prof('sleep', msg=len(buf))
-                    # let CPU sleep a bit when there is nothing to do
-                    # We don't want to use poll timouts since we use two
-                    # competing polls and don't want the idle channel slow down
-                    # the busy one.
-                    time.sleep(0.01)
+
+                # check if queues fell below their backlog limit
+                if full:
+                    full = set([qname for qname in full if buf[qname].full])
+
+                    if blocked and not full:
+                        self._log.debug('unblock')
+                        self._poll.register(self._put, zmq.POLLIN)
+                        blocked = False
+
+            for qname, qbuf in buf.items():
+                if qbuf.dropped:
+                    self._log.warning('%s: dropped %d messages', qname,
+                                      qbuf.dropped)
+                qbuf.close()
 
         except Exception:
             self._log.exception('bridge failed')
 
+
+    # --------------------------------------------------------------------------
+    #
+    def _create_buffer(self, qname):
+
+        return _QueueBuffer(limit=self._backlog, policy=self._policy,
+                            spill='%s/%s.%s.spill' % (self._pwd, self._uid,
+                                                      qname),
+                            decode=self._decode)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _serve(self, qname, buf, reqs, grants):
+        '''
+        Serve the requests waiting on the given queue in round-robin order,
+        until either the buffer or the requests run out.  Each request is
+        a list `[identity, credits, oneshot]`, and receives a bulk of up to
+        `bulk_size` messages (limited by its credits).  Listeners with credits
+        left are moved to the end of the request queue, one-shot requests are
+        done after a single bulk.  Requests on an empty queue are held back.
+        NOTE: this sends partial bulks on buffer underrun
+        '''
+
+        qbuf = buf[qname]
+        ids  = reqs[qname]
+
+        while len(qbuf) and ids:
+
+            size = self._bulk_size
+            if self._bulk_adaptive:
+                share = -(-len(qbuf) // len(ids))
+                size  = max(self._bulk_min, min(size, share))
+
+            req   = ids.popleft()
+            ident = req[0]
+            bulk  = qbuf.get(min(req[1], size))
+
+            if not self._passthrough:
+                log_bulk(self._log, '>< %s' % qname, bulk)
+
+            try:
+                self._get.send_multipart([ident, b'', to_msgpack(qname),
+                                                      self._encode(bulk)],
+                                         copy=False)
+
+            except zmq.ZMQError as e:
+                if e.errno != zmq.EHOSTUNREACH:
+                    raise
+                # getter is gone - keep the messages for the next one
+                self._log.debug('getter gone on %s', qname)
+                qbuf.unget(bulk)
+                grants[qname].pop(ident, None)
+                continue
+
+            self.nout += len(bulk)
+            self.last  = time.time()
+
+            if not req[2]:
+                req[1] -= len(bulk)
+                if req[1] > 0: ids.append(req)
+                else         : del grants[qname][ident]
+
+
+    # --------------------------------------------------------------------------
+    #
     def stop(self):
         Bridge.stop(self)
 
@@ -295,10 +724,27 @@ class Queue(Bridge):
 # ------------------------------------------------------------------------------
 #
 class Putter(object):
+    '''
+    A `Putter` sends messages to a queue bridge.  By default, each `put()`
+    call is sent as a bulk right away.  Messages can instead be coalesced for
+    up to `bulk_time` seconds (or until `bulk_size` messages are pending for
+    a queue) and then sent as a single bulk, which reduces the per-message
+    overhead for producers which put messages one by one.  If not specified,
+    `bulk_time` and `bulk_size` are taken from the bridge config file (the
+    `put_bulk_time` and `put_bulk_size` settings of the bridge), if that
+    exists.  `flush()` sends all pending messages, `stop()` sends all pending
+    messages and closes the putter.  The thread which sends coalesced messages
+    only runs while messages are pending.
+
+    If the bridge blocks on a full backlog, the bridge config also limits the
+    number of bulks buffered by the putter, so that `put()` blocks once that
+    limit is reached.
+    '''
 
     # --------------------------------------------------------------------------
     #
-    def __init__(self, channel, url=None, log=None, prof=None, path=None):
+    def __init__(self, channel, url=None, log=None, prof=None, path=None,
+                       bulk_size=None, bulk_time=None):
 
         self._channel  = channel
         self._url      = as_string(url)
@@ -308,8 +754,26 @@ class Putter(object):
         self._uid      = generate_id('%s.put.%%(counter)04d' % self._channel,
                                      ID_CUSTOM)
 
-        if not self._url:
-            self._url = Bridge.get_config(channel, path).get('put')
+        hwm = _HIGH_WATER_MARK
+
+        if not self._url or bulk_size is None or bulk_time is None:
+            cfg = Bridge.get_config(channel, path)
+            hwm = cfg.get('put_hwm', _HIGH_WATER_MARK)
+
+            if not self._url:
+                self._url = cfg.get('put')
+
+            if bulk_size is None: bulk_size = cfg.get('put_bulk_size', 0)
+            if bulk_time is None: bulk_time = cfg.get('put_bulk_time', 0.0)
+
+        # coalesce messages?
+        self._bulk_size = bulk_size
+        self._bulk_time = bulk_time
+        self._pending   = dict()   # qname: list of pending messages
+        self._t_pending = None     # time of oldest pending message
+        self._cond      = mt.Condition(self._lock)
+        self._flusher   = None
+        self._term      = False
 
         if not self._url:
             raise ValueError('no contact url specified, no config found')
@@ -329,12 +793,15 @@ class Putter(object):
 
         self._log.info('connect put to %s: %s', self._channel, self._url)
 
-        self._ctx      = zmq.Context()  # rely on GC for destruction
+        self._ctx      = zmq_context(self._url)  # rely on GC for destruction
         self._q        = self._ctx.socket(zmq.PUSH)
         self._q.linger = _LINGER_TIMEOUT
-        self._q.hwm    = _HIGH_WATER_MARK
+        self._q.hwm    = hwm
         self._q.connect(self._url)
 
+        if self._bulk_time:
+            _putters.add(self)
+
 
     # --------------------------------------------------------------------------
     #
@@ -364,62 +831,133 @@ class Putter(object):
             qname = 'default'
 
         log_bulk(self._log, '-> %s[%s]' % (self._channel, qname), msgs)
-        data = [to_msgpack(qname), to_msgpack(msgs)]
+
+        if self._term:
+            raise RuntimeError('putter %s is stopped' % self._uid)
+
+        if not self._bulk_time:
+            with self._lock:
+                self._send(qname, msgs)
+            return
 
         with self._lock:
-            no_intr(self._q.send_multipart, data)
-      # prof_bulk(self._prof, 'put', msgs)
 
+            if qname not in self._pending:
+                self._pending[qname] = list()
 
-# ------------------------------------------------------------------------------
-#
-class Getter(object):
+            pending = self._pending[qname]
+            pending.extend(msgs)
 
-    # instead of creating a new listener thread for each endpoint which then, on
-    # incoming messages, calls a getter callback, we only create *one*
-    # listening thread per ZMQ endpoint address and call *all* registered
-    # callbacks in that thread.  We hold those endpoints in a class dict, so
-    # that all class instances share that information
-    _callbacks = dict()
+            if self._bulk_size and len(pending) >= self._bulk_size:
+                self._send(qname, self._pending.pop(qname))
+
+            elif self._t_pending is None:
+                # wake up the flusher for the new bulk
+                self._t_pending = time.time()
+                self._start_flusher()
+                self._cond.notify()
 
 
     # --------------------------------------------------------------------------
     #
-    @staticmethod
-    def _get_nowait(url, qname=None, timeout=None, uid=None):  # timeout in ms
+    def flush(self):
+        '''
+        send all pending messages
+        '''
 
-        info = Getter._callbacks[url]
+        with self._lock:
+            self._flush()
+            self._cond.notify()
 
-        if not qname:
-            qname = 'default'
 
-        with info['lock']:
+    # --------------------------------------------------------------------------
+    #
+    def stop(self):
+        '''
+        send all pending messages, end the flusher thread and close the putter
+        '''
 
-            if LOG_ENABLED: level = 'DEBUG_9'
-            else          : level = 'ERROR'
-            logger = Logger(name=qname, ns='radical.utils.zmq', level=level)
+        with self._lock:
 
-            if not info['requested']:
+            if self._term:
+                return
 
-                # send the request *once* per recieval (got lock above)
-                # FIXME: why is this sent repeatedly?
-                logger.debug_9('=> from %s[%s]', uid, qname)
-                no_intr(info['socket'].send, as_bytes(qname))
-                info['requested'] = True
+            self._flush()
+            self._term = True
+            self._cond.notify()
+            flusher    = self._flusher
 
+        if flusher:
+            flusher.join()
 
-            if no_intr(info['socket'].poll, flags=zmq.POLLIN, timeout=timeout):
+        _putters.discard(self)
+        self._q.close()
 
-                data = list(no_intr(info['socket'].recv_multipart))
-                info['requested'] = False
 
-                qname = as_string(from_msgpack(data[0]))
-                msgs  = as_string(from_msgpack(data[1]))
-                log_bulk(logger, '<-1 %s [%s]' % (uid, qname), msgs)
-                return msgs
+    # --------------------------------------------------------------------------
+    #
+    def _flush(self):
 
-            else:
-                return None
+        # caller must hold `self._lock`
+        for qname, msgs in self._pending.items():
+            self._send(qname, msgs)
+
+        self._pending   = dict()
+        self._t_pending = None
+
+
+    def _send(self, qname, msgs):
+
+        # caller must hold `self._lock`
+        if msgs:
+            data = [to_msgpack(qname), to_msgpack(msgs)]
+            no_intr(self._q.send_multipart, data, copy=False)
+      # prof_bulk(self._prof, 'put', msgs)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _start_flusher(self):
+
+        # caller must hold `self._lock`
+        if self._flusher:
+            return
+
+        self._flusher = mt.Thread(target=self._flush_work)
+        self._flusher.daemon = True
+        self._flusher.start()
+
+
+    def _flush_work(self):
+
+        # send pending messages once the oldest is `bulk_time` seconds old.
+        # The thread ends once no messages are pending (`put()` starts a new
+        # one), so that it does not keep an idle putter alive.
+        with self._lock:
+            while True:
+
+                if self._term or self._t_pending is None:
+                    self._flusher = None
+                    return
+
+                delay = self._t_pending + self._bulk_time - time.time()
+                if delay > 0:
+                    self._cond.wait(timeout=delay)
+                    continue
+
+                self._flush()
+
+
+# ------------------------------------------------------------------------------
+#
+class Getter(object):
+
+    # instead of creating a new listener thread for each endpoint which then, on
+    # incoming messages, calls a getter callback, we only create *one*
+    # listening thread per ZMQ endpoint address and call *all* registered
+    # callbacks in that thread.  We hold those endpoints in a class dict, so
+    # that all class instances share that information
+    _callbacks = dict()
 
 
     # --------------------------------------------------------------------------
@@ -430,54 +968,102 @@ class Getter(object):
         other than the pubsub listener, the queue listener will not deliver
         an incoming message to all subscribers, but only to exactly *one*
         subscriber.  We this perform a round-robin over all known callbacks
+
+        Messages are not requested bulk by bulk: the listener grants the bridge
+        a number of credits (messages), and the bridge pushes messages as they
+        become available until the credits are used up.  The listener returns
+        credits for each bulk once it is handed to the callbacks, so that no
+        more than `n_credits` messages are ever in flight to this listener.
+
+        When the listener is stopped, messages which were already pushed to it
+        are still handed to the callbacks, until no message arrived for
+        `_DRAIN_TIMEOUT` ms.  Messages arriving later than that (up to
+        `n_credits` messages in total) are lost.
         '''
 
         if not qname:
             qname = 'default'
 
         assert url in Getter._callbacks
-        time.sleep(0.01)
+
+        info      = Getter._callbacks[url]
+        n_credits = info['credits']
+
+        if LOG_ENABLED: level = 'DEBUG_9'
+        else          : level = 'ERROR'
+        logger = Logger(name=qname, ns='radical.utils.zmq', level=level)
+
+        # the socket is owned by the listener thread
+        ctx         = zmq_context(url)  # rely on GC for destruction
+        sock        = ctx.socket(zmq.DEALER)
+        sock.linger = _LINGER_TIMEOUT
+        sock.hwm    = _HIGH_WATER_MARK
+        sock.connect(url)
+
+        idx       = 0       # round-robin cb index
+        callbacks = list()  # callbacks to invoke
+
+        def deliver(data):
+
+            nonlocal idx
+
+            msgs = as_string(from_msgpack(data[-1].buffer))
+            log_bulk(logger, '<-1 %s [%s]' % (uid, qname), msgs)
+
+            if not msgs:
+                return msgs
+
+            idx += 1
+            if idx >= len(callbacks):
+                idx = 0
+            cb, _lock = callbacks[idx]
+            if _lock:
+                with _lock:
+                    cb(msgs)
+            else:
+                cb(msgs)
+
+            return msgs
 
         try:
-            term = Getter._callbacks.get(url, {}).get('term')
-            idx  = 0  # round-robin cb index
+            term    = info['term']
+            granted = False  # initial credits sent
             while not term.is_set():
 
                 # this list is dynamic
-                callbacks = Getter._callbacks[url]['callbacks']
+                callbacks = info['callbacks']
 
                 if not callbacks:
                     time.sleep(0.01)
                     continue
 
-                msgs = Getter._get_nowait(url, qname=qname, timeout=500, uid=uid)
-                BULK = True
-                if msgs:
-
-                    if BULK:
-                        idx += 1
-                        if idx >= len(callbacks):
-                            idx = 0
-                        cb, _lock = callbacks[idx]
-                        if _lock:
-                            with _lock:
-                                cb(as_string(msgs))
-                        else:
-                            cb(as_string(msgs))
+                if not granted:
+                    logger.debug_9('=> %d credits from %s[%s]', n_credits,
+                                   uid, qname)
+                    no_intr(sock.send_multipart, [b'', as_bytes(qname),
+                                                  b'%d' % n_credits])
+                    granted = True
 
-                    else:
-                        for m in as_list(msgs):
+                if not no_intr(sock.poll, flags=zmq.POLLIN, timeout=500):
+                    continue
 
-                            idx += 1
-                            if idx >= len(callbacks):
-                                idx = 0
+                data = no_intr(sock.recv_multipart, copy=False)
+                msgs = deliver(data)
 
-                            cb, _lock = callbacks[idx]
-                            if _lock:
-                                with _lock:
-                                    cb(as_string(m))
-                            else:
-                                cb(as_string(m))
+                if not msgs:
+                    continue
+
+                # return the credits for the delivered messages
+                no_intr(sock.send_multipart, [b'', as_bytes(qname),
+                                              b'%d' % len(msgs)])
+
+            # hand messages already pushed to this listener to the callbacks
+            # (no more credits are returned)
+            while granted and callbacks:
+                if not no_intr(sock.poll, flags=zmq.POLLIN,
+                               timeout=_DRAIN_TIMEOUT):
+                    break
+                deliver(no_intr(sock.recv_multipart, copy=False))
 
         except Exception as e:
             print_exception_trace()
@@ -485,6 +1071,9 @@ class Getter(object):
                             % (qname, url, repr(e)))
             sys.stderr.flush()
 
+        finally:
+            sock.close()
+
 
     # --------------------------------------------------------------------------
     #
@@ -513,19 +1102,23 @@ class Getter(object):
             if  Getter._callbacks[self._url]['thread']:
                 Getter._callbacks[self._url]['term'  ].set()
                 Getter._callbacks[self._url]['thread'].join()
-                Getter._callbacks[self._url]['term'  ].unset()
+                Getter._callbacks[self._url]['term'  ].clear()
                 Getter._callbacks[self._url]['thread'] = None
 
 
     # --------------------------------------------------------------------------
     #
     def __init__(self, channel, url=None, cb=None,
-                                log=None, prof=None, path=None):
+                                log=None, prof=None, path=None, n_credits=None):
         '''
         When a callback `cb` is specified, then the Getter c'tor will spawn
         a separate thread which continues to listen on the channel, and the
         cb is invoked on any incoming message.  The message will be the only
         argument to the cb.
+
+        `n_credits` limits the number of messages the bridge pushes to that
+        listener thread ahead of the callback invocations (default:
+        `_DEFAULT_CREDITS`).
         '''
 
         self._channel   = channel
@@ -535,6 +1128,7 @@ class Getter(object):
         self._prof      = prof
         self._uid       = generate_id('%s.get.%%(counter)04d' % self._channel,
                                       ID_CUSTOM)
+        self._credits   = n_credits or _DEFAULT_CREDITS
 
         if not self._url:
             self._url = Bridge.get_config(channel, path).get('get')
@@ -558,7 +1152,7 @@ class Getter(object):
         self._log.info('connect get to %s: %s', self._channel, self._url)
 
         self._requested = False          # send/recv sync
-        self._ctx       = zmq.Context()  # rely on GC for destruction
+        self._ctx       = zmq_context(self._url)  # rely on GC for destruction
         self._q         = self._ctx.socket(zmq.REQ)
         self._q.linger  = _LINGER_TIMEOUT
         self._q.hwm     = _HIGH_WATER_MARK
@@ -572,6 +1166,7 @@ class Getter(object):
                                       'lock'     : mt.Lock(),
                                       'term'     : mt.Event(),
                                       'requested': self._requested,
+                                      'credits'  : self._credits,
                                       'thread'   : None,
                                       'callbacks': list()}
         if cb:
@@ -622,6 +1217,7 @@ class Getter(object):
                                             'lock'     : mt.Lock(),
                                             'term'     : mt.Event(),
                                             'requested': self._requested,
+                                            'credits'  : self._credits,
                                             'thread'   : None,
                                             'callbacks': list()}
 
@@ -641,9 +1237,14 @@ class Getter(object):
     def unsubscribe(self, cb):
 
         if self._url in Getter._callbacks:
-            for _cb, _lock in Getter._callbacks[self._url]['callbacks']:
-                if cb == _cb:
-                    Getter._callbacks[self._url]['callbacks'].remove([_cb, _lock])
+            callbacks = Getter._callbacks[self._url]['callbacks']
+            for entry in callbacks:
+                if cb == entry[0]:
+                    # let the listener hand pending messages to the last
+                    # callback before it goes away
+                    if len(callbacks) == 1:
+                        self._stop_listener(force=True)
+                    callbacks.remove(entry)
                     break
 
         self._stop_listener()
@@ -679,11 +1280,11 @@ class Getter(object):
           # self._prof.prof('requested')
 
         with self._lock:
-            data = list(no_intr(self._q.recv_multipart))
+            data = no_intr(self._q.recv_multipart, copy=False)
             self._requested = False
 
-        qname = from_msgpack(data[0])
-        msgs  = from_msgpack(data[1])
+        qname = from_msgpack(data[0].buffer)
+        msgs  = from_msgpack(data[1].buffer)
 
         log_bulk(self._log, '<-2 %s [%s]' % (self._channel, qname), msgs)
 
@@ -714,11 +1315,11 @@ class Getter(object):
 
         if no_intr(self._q.poll, flags=zmq.POLLIN, timeout=timeout):
             with self._lock:
-                data = list(no_intr(self._q.recv_multipart))
+                data = no_intr(self._q.recv_multipart, copy=False)
                 self._requested = False
 
-            qname = from_msgpack(data[0])
-            msgs  = from_msgpack(data[1])
+            qname = from_msgpack(data[0].buffer)
+            msgs  = from_msgpack(data[1].buffer)
             log_bulk(self._log, '<-3 %s [%s]' % (self._channel, qname), msgs)
 
             return as_string(msgs)
@@ -1,14 +1,25 @@
 
+import os
+import dbm
+import zmq
+import copy
 import atexit
 import shelve
+import struct
 
-from typing import List, Optional, Any
+import threading as mt
+
+from typing import List, Dict, Optional, Any
 
 from ..json_io    import write_json
 from ..dict_mixin import DictMixin
+from ..misc       import as_bytes, as_string, ru_open
+from ..serialize  import to_msgpack, from_msgpack
 
 from .server import Server
 from .client import Client
+from .utils  import no_intr, sock_connect, zmq_bind, zmq_unlink
+from .utils  import TRANSPORT_IPC
 
 _registries = list()
 
@@ -23,56 +34,501 @@ def _flush_registries():
 atexit.register(_flush_registries)
 
 
+_LOG_LEN     = struct.Struct('<I')  # length prefix of log records
+_COMMIT_TIME = 0.1                  # seconds between group commits
+_COMPACT_MIN = 1024 * 1024          # min log size (bytes) before compaction
+
+
+# ------------------------------------------------------------------------------
+#
+def _dict_put(data: Dict[str, Any], key: str, val: Any) -> None:
+
+    this  = data
+    elems = key.split('.')
+    path  = elems[:-1]
+    leaf  = elems[-1]
+
+    for elem in path:
+
+        if elem not in this or this[elem] is None:
+            this[elem] = dict()
+
+        this = this[elem]
+
+    this[leaf] = val
+
+
+def _dict_del(data: Dict[str, Any], key: str) -> None:
+
+    this = data
+    path = key.split('.')
+
+    for elem in path[:-1]:
+        this = this.get(elem, {})
+        if not isinstance(this, dict):
+            return
+
+    this.pop(path[-1], None)
+
+
+# ------------------------------------------------------------------------------
+#
+class RegistryStore(object):
+    '''
+    Storage backend for a `Registry`.  The registry keeps all data in memory as
+    a nested dict, a store only needs to persist the changes to that data, and
+    to return the persisted data on startup.  This base class keeps nothing
+    and is used for non-persistent registries.  Stores are called under the
+    registry's lock.
+    '''
+
+    def load(self) -> Dict[str, Any]:
+        return dict()
+
+    def put(self, key: str, val: Any) -> None:
+        pass
+
+    def delete(self, key: str) -> None:
+        pass
+
+    def need_compaction(self) -> bool:
+        return False
+
+    def compact(self, data: Dict[str, Any]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+# ------------------------------------------------------------------------------
+#
+class RegistryLogStore(RegistryStore):
+    '''
+    Persist registry changes in an append-only log (`<fname>.log`), so that
+    the cost of a change does not depend on the size of the data.  Log records
+    are length prefixed msgpack lists `[op, key, val]`.  The first record of
+    a log holds its generation (`['gen', None, <gen>]`).
+
+    Changes are buffered, and written and synced to disk by a background
+    thread every `commit_time` seconds (group commit) - changes made within
+    that time before a crash are lost.  With `commit_time=0`, each change is
+    synced to disk immediately.
+
+    Once the log grows larger than `compact_min` bytes and larger than the last
+    snapshot, the data are serialized as snapshot of the next generation, and
+    new changes go to a new log of that generation.  The background thread
+    then completes the old log (`<fname>.log.old`), writes the snapshot
+    (`<fname>.snap`) and removes the old log, so that compaction does not
+    block the registry on disk I/O.  On startup, the snapshot is loaded and all
+    logs of the same or a later generation are replayed - an incomplete record
+    at the end of a log (from a crash while writing) is discarded.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, fname      : str,
+                       commit_time: float = _COMMIT_TIME,
+                       compact_min: int   = _COMPACT_MIN) -> None:
+
+        self._fname_log   = '%s.log'     % fname
+        self._fname_old   = '%s.log.old' % fname
+        self._fname_snap  = '%s.snap'    % fname
+        self._commit_time = commit_time
+        self._compact_min = compact_min
+
+        self._lock        = mt.Lock()
+        self._buf         = list()   # records not yet written
+        self._fout        = None
+        self._gen         = 0        # generation of the current log
+        self._old         = None     # log being compacted: [fout, buf]
+        self._snap        = None     # snapshot being written
+        self._size_log    = 0
+        self._size_snap   = 0
+        self._term        = mt.Event()
+        self._thread      = None
+
+
+    # --------------------------------------------------------------------------
+    #
+    def load(self) -> Dict[str, Any]:
+
+        data = dict()
+        gen  = 0
+
+        if os.path.exists(self._fname_snap):
+            with ru_open(self._fname_snap, 'rb') as fin:
+                blob = fin.read()
+            self._size_snap = len(blob)
+
+            # snapshots of earlier versions hold the plain data
+            snap = from_msgpack(blob)
+            if isinstance(snap, dict): data = snap
+            else                     : gen, data = snap
+
+        self._gen = gen
+        good      = 0
+
+        if os.path.exists(self._fname_old):
+            self._replay(self._fname_old, data, gen)
+
+        if os.path.exists(self._fname_log):
+            log_gen, good = self._replay(self._fname_log, data, gen)
+            self._gen     = max(gen, log_gen)
+
+        # append new records after the last complete one
+        self._fout = ru_open(self._fname_log, 'ab')
+        self._fout.truncate(good)
+        self._size_log = good
+
+        if not good:
+            self._append('gen', None, self._gen)
+            self._commit()
+
+        # complete an interrupted compaction
+        if os.path.exists(self._fname_old):
+            self._write_snapshot(to_msgpack([self._gen, data]))
+            os.unlink(self._fname_old)
+
+        if self._commit_time:
+            self._thread = mt.Thread(target=self._commit_work)
+            self._thread.daemon = True
+            self._thread.start()
+
+        return data
+
+
+    def _replay(self, fname: str, data: Dict[str, Any], gen: int):
+
+        # apply all complete records of the given log to `data`, unless the log
+        # is older than the snapshot.  Return the log generation and the size
+        # of the complete records.
+        with ru_open(fname, 'rb') as fin:
+            blob = fin.read()
+
+        view    = memoryview(blob)
+        good    = 0
+        log_gen = 0
+        while good + _LOG_LEN.size <= len(blob):
+
+            size, = _LOG_LEN.unpack_from(blob, good)
+            start = good  + _LOG_LEN.size
+            stop  = start + size
+
+            if stop > len(blob):
+                break
+
+            try:
+                op, key, val = from_msgpack(view[start:stop])
+            except Exception:
+                break
+
+            good = stop
+
+            if op == 'gen':
+                log_gen = val
+                continue
+
+            if log_gen < gen:
+                continue
+
+            if op == 'put': _dict_put(data, key, val)
+            else          : _dict_del(data, key)
+
+        return log_gen, good
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _append(self, op: str, key: str, val: Any) -> None:
+
+        # the caller must hold `self._lock` (or own the store exclusively)
+        rec = to_msgpack([op, key, val])
+
+        self._buf.append(_LOG_LEN.pack(len(rec)))
+        self._buf.append(rec)
+
+
+    def put(self, key: str, val: Any) -> None:
+
+        with self._lock:
+            self._append('put', key, val)
+            if not self._commit_time:
+                self._commit()
+
+
+    def delete(self, key: str) -> None:
+
+        with self._lock:
+            self._append('del', key, None)
+            if not self._commit_time:
+                self._commit()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _commit(self) -> None:
+
+        # the caller must hold `self._lock`
+        if not self._buf or not self._fout:
+            return
+
+        data = b''.join(self._buf)
+        self._buf.clear()
+
+        self._fout.write(data)
+        self._fout.flush()
+        os.fsync(self._fout.fileno())
+
+        self._size_log += len(data)
+
+
+    def _commit_work(self) -> None:
+
+        while not self._term.wait(timeout=self._commit_time):
+            with self._lock:
+                self._commit()
+            self._complete_compaction()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def need_compaction(self) -> bool:
+
+        return self._snap is None                and \
+               self._size_log > self._compact_min and \
+               self._size_log > self._size_snap
+
+
+    def compact(self, data: Dict[str, Any]) -> None:
+
+        # the snapshot includes all changes, including the buffered ones.  Only
+        # the serialization and the switch to a new log happen here, the
+        # snapshot is written by the commit thread (or right away if changes
+        # are committed immediately).
+        if self._snap is not None:
+            return
+
+        blob = to_msgpack([self._gen + 1, data])
+
+        with self._lock:
+
+            os.rename(self._fname_log, self._fname_old)
+            self._old  = [self._fout, self._buf]
+            self._snap = blob
+
+            self._gen     += 1
+            self._buf      = list()
+            self._fout     = ru_open(self._fname_log, 'ab')
+            self._size_log = 0
+            self._append('gen', None, self._gen)
+
+            if not self._commit_time:
+                self._commit()
+
+        if not self._commit_time:
+            self._complete_compaction()
+
+
+    def _complete_compaction(self) -> None:
+
+        # the old log and the snapshot are not used by other threads
+        if self._snap is None:
+            return
+
+        # the old log is complete before the snapshot replaces the previous
+        # one, so that a crash at any point leaves a consistent state
+        fout, buf = self._old
+        if buf:
+            fout.write(b''.join(buf))
+            fout.flush()
+            os.fsync(fout.fileno())
+        fout.close()
+
+        self._write_snapshot(self._snap)
+        os.unlink(self._fname_old)
+
+        with self._lock:
+            self._size_snap = len(self._snap)
+            self._snap      = None
+            self._old       = None
+
+
+    def _write_snapshot(self, blob: bytes) -> None:
+
+        tmp = '%s.tmp' % self._fname_snap
+
+        with ru_open(tmp, 'wb') as fout:
+            fout.write(blob)
+            fout.flush()
+            os.fsync(fout.fileno())
+
+        os.replace(tmp, self._fname_snap)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self) -> None:
+
+        self._term.set()
+
+        if self._thread:
+            self._thread.join()
+
+        with self._lock:
+            if self._fout:
+                self._commit()
+
+        self._complete_compaction()
+
+        with self._lock:
+            if self._fout:
+                self._fout.close()
+                self._fout = None
+
+
 # ------------------------------------------------------------------------------
 #
 class Registry(Server):
     '''
     The `ru.zmq.Registry` is a ZMQ service which provides a hierarchical
-    persistent data store.
+    persistent data store.  Like any `ru.zmq.Server`, the registry can be
+    bound to an `ipc://` or `inproc://` URL if all clients live on the same
+    node or in the same process.
+
+    All changed keys are announced on a `PUB` channel (`addr_pub`), so that
+    clients can cache values and invalidate them on change (see
+    `RegistryClient`).  Announcements are numbered, so that clients can detect
+    announcements which were dropped by ZMQ under load.
+
+    The data are kept in memory.  A `persistent` registry stores all changes
+    in an append-only log in its `path` (see `RegistryLogStore`).  Other
+    storage backends can be passed as `store` (see `RegistryStore`).
     '''
 
     # --------------------------------------------------------------------------
     #
-    def __init__(self, url       : Optional[str] = None,
-                       uid       : Optional[str] = None,
-                       path      : Optional[str] = None,
-                       persistent: bool          = False) -> None:
+    def __init__(self, url       : Optional[str]           = None,
+                       uid       : Optional[str]           = None,
+                       path      : Optional[str]           = None,
+                       persistent: bool                    = False,
+                       store     : Optional[RegistryStore] = None) -> None:
 
         super().__init__(url=url, uid=uid, path=path)
 
-        if persistent:
-            path = '%s/%s.db' % (self._path, self._uid)
-            self._log.debug('use shelve %s', path)
+        fname = '%s/%s' % (self._path, self._uid)
+
+        # data persisted via `shelve` by earlier versions are imported once,
+        # into a log store which does not exist yet
+        legacy = persistent and not store                  and \
+                 not os.path.exists('%s.log'  % fname) and \
+                 not os.path.exists('%s.snap' % fname) and \
+                 dbm.whichdb('%s.db' % fname)
 
-            self._data = shelve.open(path, writeback=True)
+        if store:
+            self._log.debug('use store %s', store)
+            self._store = store
+
+        elif persistent:
+            self._log.debug('use log store %s', fname)
+            self._store = RegistryLogStore(fname)
 
         else:
             self._log.debug('use in-memory dict')
-            self._data = dict()
+            self._store = RegistryStore()
+
+        self._data = self._store.load()
+
+        if legacy:
+            self._log.info('import shelve %s.db', fname)
+            with shelve.open('%s.db' % fname, flag='r') as old:
+                for key in old:
+                    self._data[key] = old[key]
+            self._store.compact(self._data)
+
+        # all requests but `dump` are cheap and handled inline, `dump` runs in
+        # a worker thread and is guarded against concurrent updates
+        self._lock = mt.Lock()
+
+        # changed keys are published under that lock, too, as `[seq, key]`.
+        # For an explicit `ipc` server endpoint, the `PUB` socket is created
+        # next to it.
+        pub_path = None
+        if self._proto == TRANSPORT_IPC:
+            ep = self._url.split('://', 1)[1]
+            if ep:
+                pub_path = os.path.dirname(os.path.abspath(ep))
+
+        self._seq        = 0
+        self._pub        = zmq.Context.instance().socket(zmq.PUB)
+        self._pub.linger = 0
+        self._addr_pub   = str(zmq_bind(self._pub, transport=self._proto,
+                                        name='%s.pub' % self._uid,
+                                        path=pub_path))
+
+        self.register_request('put',          self.put,          inline=True)
+        self.register_request('get',          self.get,          inline=True)
+        self.register_request('keys',         self.keys,         inline=True)
+        self.register_request('del',          self.delitem,      inline=True)
+        self.register_request('put_many',     self.put_many,     inline=True)
+        self.register_request('get_many',     self.get_many,     inline=True)
+        self.register_request('get_subtree',  self.get_subtree,  inline=True)
+        self.register_request('dump',         self.dump)
+        self.register_request('dump_subtree', self.dump_subtree)
+        self.register_request('addr_pub',     lambda: self._addr_pub,
+                                                                 inline=True)
+
+
+    # --------------------------------------------------------------------------
+    #
+    @property
+    def addr_pub(self) -> str:
 
-        self.register_request('put',  self.put)
-        self.register_request('get',  self.get)
-        self.register_request('keys', self.keys)
-        self.register_request('del',  self.delitem)
-        self.register_request('dump', self.dump)
+        return self._addr_pub
 
 
     # --------------------------------------------------------------------------
     #
-    def dump(self, name: str = None) -> None:
+    def _notify(self, key: str) -> None:
 
+        # the caller must hold `self._lock`
+        if self._pub:
+            self._seq += 1
+            no_intr(self._pub.send_multipart, [b'%d' % self._seq,
+                                               as_bytes(key)])
 
-        if not isinstance(self._data, dict):
-            self._log.debug('ignore dump for non-dict %s', name)
 
-        else:
-            if name: fname = '%s/%s.%s.json' % (self._path, self._uid, name)
-            else   : fname = '%s/%s.json'    % (self._path, self._uid)
+    # --------------------------------------------------------------------------
+    #
+    def dump(self, name: str = None) -> None:
+
+        if name: fname = '%s/%s.%s.json' % (self._path, self._uid, name)
+        else   : fname = '%s/%s.json'    % (self._path, self._uid)
 
-            self._log.debug('dumo to %s', fname)
+        self._log.debug('dumo to %s', fname)
+        with self._lock:
             write_json(self._data, fname)
 
 
+    # --------------------------------------------------------------------------
+    #
+    def dump_subtree(self, prefix: Optional[str] = None,
+                           name  : Optional[str] = None) -> None:
+        '''
+        dump the subtree under the given dotted key prefix into a json file
+        (`<path>/<uid>.<name>.json`, `name` defaults to the prefix)
+        '''
+
+        if not name:
+            name = prefix
+
+        if name: fname = '%s/%s.%s.json' % (self._path, self._uid, name)
+        else   : fname = '%s/%s.json'    % (self._path, self._uid)
+
+        self._log.debug('dump %s to %s', prefix, fname)
+        with self._lock:
+            write_json(self.get_subtree(prefix), fname)
+
 
     # --------------------------------------------------------------------------
     #
@@ -82,34 +538,71 @@ class Registry(Server):
 
         self._log.debug('stop')
 
-        if isinstance(self._data, shelve.Shelf):
-            self._data.close()
-
         super().stop()
 
+        # requests may still be in flight: a running server closes the store
+        # once its thread ends
+        if not self._thread:
+            self._close()
+
+
+    def _work(self) -> None:
+
+        try:
+            super()._work()
+        finally:
+            self._close()
+
+
+    def _close(self) -> None:
+
+        with self._lock:
+            self._store.close()
+            if self._pub:
+                self._pub.close()
+                self._pub = None
+                zmq_unlink(self._addr_pub)
+
 
     # --------------------------------------------------------------------------
     #
     def put(self, key: str, val: Any) -> None:
 
-        this  = self._data
-        elems = key.split('.')
-        path  = elems[:-1]
-        leaf  = elems[-1]
-
         self._log.debug_9('put %s: %s', str(key), str(val))
 
-        for elem in path:
+        with self._lock:
 
-            if elem not in this or this[elem] is None:
-                this[elem] = dict()
+            _dict_put(self._data, key, val)
+            self._store.put(key, val)
+            self._notify(key)
+            self._compact()
 
-            this = this[elem]
 
-        this[leaf] = val
+    def _compact(self) -> None:
 
-        if not isinstance(self._data, dict):
-            self._data.sync()
+        # the caller must hold `self._lock`
+        if self._store.need_compaction():
+            self._log.debug('compact store')
+            self._store.compact(self._data)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def put_many(self, items: Dict[str, Any]) -> None:
+        '''
+        store all given key / value pairs
+        '''
+
+        self._log.debug_9('put_many %s', list(items.keys()))
+
+        with self._lock:
+
+            for key, val in items.items():
+                _dict_put(self._data, key, val)
+                self._store.put(key, val)
+                self._notify(key)
+
+            self._compact()
 
 
     # --------------------------------------------------------------------------
@@ -135,6 +628,34 @@ class Registry(Server):
         return val
 
 
+    # --------------------------------------------------------------------------
+    #
+    def get_many(self, keys: List[str]) -> List[Any]:
+        '''
+        return the values for all given keys (in the same order)
+        '''
+
+        return [self.get(key) for key in keys]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def get_subtree(self, prefix: Optional[str] = None) -> Dict[str, Any]:
+        '''
+        return the (nested) dict stored under the given dotted key prefix, or
+        all data if no prefix is given.  An empty dict is returned if the
+        prefix does not exist or does not refer to a dict.
+        '''
+
+        if prefix: this = self.get(prefix)
+        else     : this = dict(self._data)
+
+        if not isinstance(this, dict):
+            return dict()
+
+        return this
+
+
     # --------------------------------------------------------------------------
     #
     def keys(self, pwd: Optional[str] = None) -> List[str]:
@@ -174,7 +695,11 @@ class Registry(Server):
                     break
 
             if this:
-                del this[path[-1]]
+                with self._lock:
+                    del this[path[-1]]
+                    self._store.delete(key)
+                    self._notify(key)
+                    self._compact()
 
 
 # ------------------------------------------------------------------------------
@@ -184,19 +709,84 @@ class RegistryClient(Client, DictMixin):
     The `ru.zmq.RegistryClient` class provides a simple dict-like interface to
     a remote `ru.zmq.Registry` service.  Note that only top-level dict-actions
     on the `RegistryClient` instance are synced with the remote service storage.
+
+    If `cache` is enabled, values fetched via `get()` are cached, and cache
+    entries are invalidated when the registry announces a change of the
+    respective key (or of a parent or child key).  Announcements are processed
+    on each `get()` call.  Changes which are in flight at that point may not be
+    seen yet, and changes made before the client subscribed to announcements
+    are missed - the cache should thus only be used for values which change
+    rarely, such as configuration data.  Cached values must not be modified.
+
+    ZMQ drops announcements when a client falls behind by more than the high
+    water mark (e.g., after a large `put_many()`).  The client detects such
+    gaps in the announcement sequence numbers and then clears its whole cache.
     '''
 
 
     # --------------------------------------------------------------------------
     #
-    def __init__(self, url: str,
-                       pwd: Optional[str] = None) -> None:
+    def __init__(self, url  : str,
+                       pwd  : Optional[str] = None,
+                       cache: bool          = False) -> None:
 
-        self._url = url
-        self._pwd = pwd
+        self._url   = url
+        self._pwd   = pwd
+        self._cache = None
+        self._sub   = None
+        self._seq   = None  # sequence number of the last announcement
 
         super().__init__(url=url)
 
+        if cache:
+            self._cache = dict()
+            self._sub   = self._ctx.socket(zmq.SUB)
+            self._sub.linger = 0
+            self._sub.setsockopt(zmq.SUBSCRIBE, b'')
+            sock_connect(self._sub, self.request(cmd='addr_pub'))
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _invalidate(self) -> None:
+
+        # drop cache entries for all keys announced as changed, and for their
+        # parent and child keys.  If announcements were dropped, drop all
+        # entries.
+        while True:
+
+            try:
+                seq, key = self._sub.recv_multipart(flags=zmq.NOBLOCK)
+            except zmq.Again:
+                break
+
+            seq = int(seq)
+            if self._seq is not None and seq != self._seq + 1:
+                self._cache.clear()
+            self._seq = seq
+
+            self._uncache(as_string(key))
+
+
+    def _uncache(self, key: str) -> None:
+
+        for ckey in list(self._cache.keys()):
+            if ckey == key                  or \
+               ckey.startswith(key + '.')   or \
+               key.startswith(ckey + '.')   :
+                del self._cache[ckey]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self) -> None:
+
+        if self._sub:
+            self._sub.close()
+            self._sub = None
+
+        super().close()
+
 
     # --------------------------------------------------------------------------
     #
@@ -213,23 +803,95 @@ class RegistryClient(Client, DictMixin):
         if self._pwd:
             key = self._pwd + '.' + key
 
+        if self._cache is not None:
+
+            self._invalidate()
+
+            if key in self._cache:
+                return copy.deepcopy(self._cache[key])
+
         try:
-            return self.request(cmd='get', key=key)
+            val = self.request(cmd='get', key=key)
         except:
             return default
 
+        if self._cache is not None:
+            self._cache[key] = copy.deepcopy(val)
+
+        return val
+
 
     def put(self, key: str,
                   val: Any) -> None:
 
         if self._pwd:
             key = self._pwd + '.' + key
+
+        if self._cache is not None:
+            self._uncache(key)
+
         ret = self.request(cmd='put', key=key, val=val)
 
         assert ret is None
         return ret
 
 
+    def put_many(self, items: Dict[str, Any]) -> None:
+        '''
+        store all given key / value pairs in a single request
+        '''
+
+        if self._pwd:
+            items = {self._pwd + '.' + key: val for key, val in items.items()}
+
+        if self._cache is not None:
+            for key in items:
+                self._uncache(key)
+
+        ret = self.request(cmd='put_many', items=items)
+
+        assert ret is None
+        return ret
+
+
+    def get_many(self, keys   : List[str],
+                       default: Optional[Any] = None) -> List[Any]:
+        '''
+        fetch the values for all given keys in a single request, `default` is
+        returned for keys which do not exist
+        '''
+
+        if self._pwd:
+            keys = [self._pwd + '.' + key for key in keys]
+
+        vals = self.request(cmd='get_many', keys=keys)
+
+        return [default if val is None else val for val in vals]
+
+
+    def get_subtree(self, prefix: Optional[str] = None) -> Dict[str, Any]:
+        '''
+        fetch the (nested) dict stored under the given dotted key prefix (or
+        under `pwd`) in a single request
+        '''
+
+        if self._pwd:
+            if prefix: prefix = self._pwd + '.' + prefix
+            else     : prefix = self._pwd
+
+        return self.request(cmd='get_subtree', prefix=prefix)
+
+
+    def dump_subtree(self, prefix: Optional[str] = None,
+                           name  : Optional[str] = None) -> None:
+
+        if self._pwd:
+            if prefix: prefix = self._pwd + '.' + prefix
+            else     : prefix = self._pwd
+
+        return self.request(cmd='dump_subtree', prefix=prefix, name=name)
+
+
     # --------------------------------------------------------------------------
     # dict mixin API
     def __getitem__(self, key: str) -> Optional[Any]:
@@ -246,6 +908,10 @@ class RegistryClient(Client, DictMixin):
 
         if self._pwd:
             key = self._pwd + '.' + key
+
+        if self._cache is not None:
+            self._uncache(key)
+
         ret = self.request(cmd='del', key=key)
         assert ret is None
 
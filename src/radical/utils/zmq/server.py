@@ -1,5 +1,6 @@
 
 import zmq
+import queue
 
 import threading as mt
 
@@ -14,7 +15,9 @@ from ..profile   import Profiler
 from ..debug     import get_exception_trace
 from ..serialize import to_msgpack, from_msgpack
 
-from .utils      import no_intr
+from .utils      import no_intr, zmq_bind, zmq_bind_url, zmq_context
+from .utils      import zmq_unlink
+from .utils      import TRANSPORT_IPC, TRANSPORT_INPROC
 
 
 # --------------------------------------------------------------------------
@@ -22,6 +25,7 @@ from .utils      import no_intr
 _LINGER_TIMEOUT    =         250  # ms to linger after close
 _HIGH_WATER_MARK   = 1024 * 1024  # number of messages to buffer before dropping
 _DEFAULT_BULK_SIZE =        1024  # number of messages to put in a bulk
+_DEFAULT_WORKERS   =           1  # number of worker threads
 
 
 # ------------------------------------------------------------------------------
@@ -30,16 +34,27 @@ class Server(object):
 
     # --------------------------------------------------------------------------
     #
-    def __init__(self, url:  Optional[str] = None,
-                       uid:  Optional[str] = None,
-                       path: Optional[str] = None) -> None:
-
-        # this server offers only synchronous communication: a request will be
-        # worked upon and answered before the next request is received.
-
-        self._url  = url
-        self._cbs  = dict()
-        self._path = path
+    def __init__(self, url    : Optional[str] = None,
+                       uid    : Optional[str] = None,
+                       path   : Optional[str] = None,
+                       workers: Optional[int] = None) -> None:
+
+        # requests are received on a `ROUTER` socket and are handed to a pool
+        # of `workers` threads, so that a slow request does not block requests
+        # from other clients.  The replies are routed back to the requesting
+        # client.  Requests registered as `inline` (cheap calls) are handled
+        # directly in the server thread, as are all requests if `workers` is
+        # set to `0`.  Note that requests from one client are always served
+        # one at a time (clients use `REQ` sockets).
+
+        if workers is None:
+            workers = _DEFAULT_WORKERS
+
+        self._url     = url
+        self._cbs     = dict()
+        self._inline  = set()
+        self._path    = path
+        self._workers = workers
 
         if not self._path:
             self._path = './'
@@ -55,7 +70,9 @@ class Server(object):
         self._up     = mt.Event()
         self._term   = mt.Event()
 
-        self.register_request('echo', self._request_echo)
+        self._bind_error: Optional[Exception] = None
+
+        self.register_request('echo', self._request_echo, inline=True)
         self.register_request('fail', self._request_fail)
 
         if not self._url:
@@ -78,6 +95,26 @@ class Server(object):
         #   '100+'   : any port equal or larger than 100
         #   '100-'   : any port equal or larger than 100
         #   '100-110': any port equal or larger than 100, up to 110
+        #
+        # For peers on the same node or in the same process, the URL can
+        # alternatively specify an `ipc` or `inproc` endpoint:
+        #
+        #   ipc://<path>      bind to the Unix socket at <path>
+        #   inproc://<name>   bind to the in-process endpoint <name>
+        #
+        # If the path or name are omitted (`ipc://`, `inproc://`), an endpoint
+        # named after the server uid is created (`ipc` sockets in the system's
+        # temp directory, see `zmq_bind()`).  Binding fails if an `ipc` socket
+        # file exists, and socket files are removed when the server
+        # terminates.
+        self._proto = self._url.split(':', 1)[0]
+
+        if self._proto in [TRANSPORT_IPC, TRANSPORT_INPROC]:
+            self._port_this  = None
+            self._port_start = None
+            self._port_stop  = None
+            return
+
         tmp = self._url.split(':', 2)
         assert len(tmp) == 3
         self._proto = tmp[0]
@@ -174,6 +211,10 @@ class Server(object):
 
         self._up.wait()
 
+        # the endpoint could not be bound
+        if self._bind_error:
+            raise self._bind_error
+
 
     # --------------------------------------------------------------------------
     #
@@ -197,11 +238,19 @@ class Server(object):
 
     # --------------------------------------------------------------------------
     #
-    def register_request(self, req, cb) -> None:
+    def register_request(self, req, cb, inline: bool = False) -> None:
+        '''
+        register a callback for the given request type.  `inline` requests are
+        handled directly by the server thread and should be cheap, all other
+        requests are handled by the worker threads.
+        '''
 
         self._log.info('add handler: %s: %s', req, cb)
         self._cbs[req] = cb
 
+        if inline: self._inline.add(req)
+        else     : self._inline.discard(req)
+
 
     # --------------------------------------------------------------------------
     #
@@ -241,13 +290,7 @@ class Server(object):
 
     # --------------------------------------------------------------------------
     #
-    def _work(self) -> None:
-
-        self._ctx  = zmq.Context()
-        self._sock = self._ctx.socket(zmq.REP)
-
-        self._sock.linger = _LINGER_TIMEOUT
-        self._sock.hwm    = _HIGH_WATER_MARK
+    def _bind_tcp(self) -> None:
 
         for url in self._iterate_urls():
             try:
@@ -265,56 +308,188 @@ class Server(object):
         addr.host  = get_hostip()
         self._addr = str(addr)
 
-        self._up.set()
+
+    # --------------------------------------------------------------------------
+    #
+    def _handle(self, req: Any) -> Dict[str, Optional[str]]:
+
+        rep = None
+
+        try:
+            self._log.debug('req: %s', str(req)[:128])
+
+            if not isinstance(req, dict):
+                rep = self._error(err='invalid message type')
+
+            else:
+                cmd    = req['cmd']
+                args   = req['args']
+                kwargs = req['kwargs']
+
+                if not cmd:
+                    rep = self._error(err='no command in request')
+
+                elif cmd not in self._cbs:
+                    rep = self._error(err='command [%s] unknown' % cmd)
+
+                else:
+                    rep = self._success(self._cbs[cmd](*args, **kwargs))
+
+        except Exception as e:
+            self._log.exception('command failed: %s', req)
+            rep = self._error(err='command failed: %s' % str(e),
+                              exc='\n'.join(get_exception_trace()))
+
+        if not rep:
+            rep = self._error('server error')
+
+        self._log.debug('rep: %s', str(rep)[:128])
+
+        return rep
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _worker(self, work: queue.Queue, url: str) -> None:
+
+        # replies are pushed back to the server thread which owns the `ROUTER`
+        # socket
+        sock = self._ctx.socket(zmq.PUSH)
+        sock.linger = _LINGER_TIMEOUT
+        sock.connect(url)
+
+        try:
+            while True:
+
+                item = work.get()
+                if item is None:
+                    break
+
+                envelope, req = item
+                rep = to_msgpack(self._handle(req))
+                no_intr(sock.send_multipart, envelope + [rep], copy=False)
+
+        finally:
+            sock.close()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _work(self) -> None:
+
+        self._ctx  = zmq_context(self._proto)
+        self._sock = self._ctx.socket(zmq.ROUTER)
+
+        self._sock.linger = _LINGER_TIMEOUT
+        self._sock.hwm    = _HIGH_WATER_MARK
+
+        try:
+            if self._proto in [TRANSPORT_IPC, TRANSPORT_INPROC]:
+
+                if self._url.split('://', 1)[1]:
+                    zmq_bind_url(self._sock, self._url)
+                else:
+                    zmq_bind(self._sock, transport=self._proto,
+                                         name=self._uid)
+
+                self._addr = as_string(
+                                 self._sock.getsockopt(zmq.LAST_ENDPOINT))
+
+            else:
+                self._bind_tcp()
+
+        except Exception as e:
+            self._log.exception('bind failed')
+            self._sock.close()
+            self._bind_error = e
+            self._up.set()
+            return
 
         self._poll = zmq.Poller()
         self._poll.register(self._sock, zmq.POLLIN)
 
+        # worker threads get requests from a shared queue (so that idle
+        # workers pick up the next request), and push replies to the `done`
+        # socket
+        work    = queue.Queue()
+        workers = list()
+        done    = None
+
+        if self._workers:
+
+            done = self._ctx.socket(zmq.PULL)
+            url  = 'inproc://%s.%x.done' % (self._uid, id(self))
+            done.bind(url)
+            self._poll.register(done, zmq.POLLIN)
+
+            for _ in range(self._workers):
+                worker = mt.Thread(target=self._worker, args=[work, url])
+                worker.daemon = True
+                worker.start()
+                workers.append(worker)
+
+        self._up.set()
+
         while not self._term.is_set():
 
             event = dict(no_intr(self._poll.poll, timeout=100))
 
+            if done in event:
+                # forward replies from the workers
+                while True:
+                    try:
+                        msg = done.recv_multipart(flags=zmq.NOBLOCK,
+                                                  copy=False)
+                    except zmq.Again:
+                        break
+                    no_intr(self._sock.send_multipart, msg, copy=False)
+
             if self._sock not in event:
                 continue
 
-            # default response
-            rep = None
-            req = None
+            # `REQ` clients send `[identity, b'', request]`
+            msg      = no_intr(self._sock.recv_multipart, copy=False)
+            envelope = [frame.bytes for frame in msg[:-1]]
 
             try:
-                data = no_intr(self._sock.recv)
-                req  = as_string(from_msgpack(data))
-                self._log.debug('req: %s', str(req)[:128])
+                req = as_string(from_msgpack(msg[-1].buffer))
+            except Exception as e:
+                self._log.exception('invalid request')
+                rep = self._error(err='invalid request: %s' % str(e))
+                no_intr(self._sock.send_multipart,
+                        envelope + [to_msgpack(rep)], copy=False)
+                continue
 
-                if not isinstance(req, dict):
-                    rep = self._error(err='invalid message type')
+            cmd = req.get('cmd') if isinstance(req, dict) else None
 
-                else:
-                    cmd    = req['cmd']
-                    args   = req['args']
-                    kwargs = req['kwargs']
+            if workers and cmd not in self._inline:
+                work.put((envelope, req))
 
-                    if not cmd:
-                        rep = self._error(err='no command in request')
+            else:
+                rep = to_msgpack(self._handle(req))
+                no_intr(self._sock.send_multipart, envelope + [rep],
+                        copy=False)
 
-                    elif cmd not in self._cbs:
-                        rep = self._error(err='command [%s] unknown' % cmd)
+        # workers terminate once all queued requests are done - wait for them
+        # and forward their last replies before closing the sockets
+        for _ in workers:
+            work.put(None)
 
-                    else:
-                        rep = self._success(self._cbs[cmd](*args, **kwargs))
+        for worker in workers:
+            worker.join()
 
-            except Exception as e:
-                self._log.exception('command failed: %s', req)
-                rep = self._error(err='command failed: %s' % str(e),
-                                  exc='\n'.join(get_exception_trace()))
+        if done:
+            while True:
+                try:
+                    msg = done.recv_multipart(flags=zmq.NOBLOCK, copy=False)
+                except zmq.Again:
+                    break
+                no_intr(self._sock.send_multipart, msg, copy=False)
 
-            finally:
-                if not rep:
-                    rep = self._error('server error')
-                no_intr(self._sock.send, to_msgpack(rep))
-                self._log.debug('rep: %s', str(rep)[:128])
+            done.close()
 
         self._sock.close()
+        zmq_unlink(self._addr)
         self._log.debug('term')
 
 
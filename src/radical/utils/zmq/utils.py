@@ -1,16 +1,36 @@
 
 import os
 import zmq
+import uuid
 import errno
+import tempfile
 
-from ..url  import Url
-from ..host import get_hostip
-from ..misc import as_list, as_string, find_port, ru_open
+from ..url       import Url
+from ..host      import get_hostip
+from ..misc      import as_list, as_string, ru_open
+from ..json_io   import read_json
+from ..serialize import from_msgpack
 
 
 # NOTE: this is ignoring `RADICAL_LOG_LVL` on purpose
 LOG_ENABLED = os.environ.get('RADICAL_ZMQ_LOG', '0').lower() in ['1', 'true']
 
+# transports supported by `zmq_bind()`
+TRANSPORT_TCP    = 'tcp'
+TRANSPORT_IPC    = 'ipc'
+TRANSPORT_INPROC = 'inproc'
+
+_IPC_PATH_MAX    = 100  # `sun_path` is limited to 108 bytes (Linux)
+
+# ipc socket files created by `zmq_bind_url()`, mapped to the creating pid
+_ipc_owned       = dict()
+
+# `tcp` endpoints are bound to a port chosen by the OS, unless a port range is
+# configured (`<min>-<max>`, e.g., for firewalled nodes).  Ports in that range
+# are then tried randomly, up to `RADICAL_ZMQ_BIND_TRIES` times.
+_PORTS           = os.environ.get('RADICAL_ZMQ_PORTS')
+_BIND_TRIES      = int(os.environ.get('RADICAL_ZMQ_BIND_TRIES', 100))
+
 
 # --------------------------------------------------------------------------
 #
@@ -45,6 +65,41 @@ def no_intr(f, *args, **kwargs):
             raise          # some other error condition, raise it
 
 
+# ------------------------------------------------------------------------------
+#
+# Messages are received as `zmq.Frame` instances (`copy=False`), and are
+# deserialized straight from the frame buffers.  For small messages, zmq copies
+# anyway, for large messages this avoids copying the payload into a `bytes`
+# object before deserialization.
+#
+def recv_msgpack(sock, flags=0):
+    '''
+    receive a single frame and deserialize it without copying
+    '''
+
+    frame = no_intr(sock.recv, flags=flags, copy=False)
+
+    if frame is None:
+        return None
+
+    return from_msgpack(frame.buffer)
+
+
+def split_topic(frame):
+    '''
+    split a pubsub frame (`<topic> <msgpack data>`) into the topic (bytes) and
+    a memoryview of the message data
+    '''
+
+    buf = frame.buffer
+    idx = buf[:256].tobytes().find(b' ')
+
+    if idx < 0:
+        idx = buf.tobytes().index(b' ')
+
+    return buf[:idx].tobytes(), buf[idx + 1:]
+
+
 # ------------------------------------------------------------------------------
 #
 def get_uids(msgs):
@@ -81,7 +136,9 @@ def get_channel_url(ep_type, channel=None, url=None):
     exists, and if it has a top level entry named `<ep_type>` (lower case).
 
     Before returning the given or derived channel and url, the method will check
-    if both data match (i.e. if the channel name is reflected in the URL)
+    if both data match (i.e. if the channel name is reflected in the URL).  For
+    `ipc://` and `inproc://` URLs (see `zmq_bind()`), the endpoint name is
+    expected to start with the channel name.
     '''
 
     if not channel and not url:
@@ -92,7 +149,9 @@ def get_channel_url(ep_type, channel=None, url=None):
         # example:
         #   channel `foo`
         #   url     `pubsub://localhost:1234/foo`
-        channel = os.path.basename(str(Url(url.path)))
+        name = _get_url_name(url)
+        if name is None: channel = os.path.basename(str(Url(url).path))
+        else           : channel = name.split('.')[0]
 
     elif not url:
         # get url from environment (`FOO_PUB_URL`) or config file (`foo.cfg`)
@@ -104,12 +163,19 @@ def get_channel_url(ep_type, channel=None, url=None):
             url = os.environ[env_name]
 
         elif os.path.exists(cfg_name):
-            with ru_open(cfg_name, 'r') as fin:
-                for line in fin.readlines():
-                    _ep_type, _url = line.split(':')
-                    if _ep_type.strip().upper() == ep_type.upper():
-                        url = _url
-                        break
+            # bridges write their config as json (`Bridge.write_config()`),
+            # older configs use `<ep_type>: <url>` lines
+            try:
+                cfg = read_json(cfg_name)
+                url = cfg.get(ep_type.lower())
+
+            except Exception:
+                with ru_open(cfg_name, 'r') as fin:
+                    for line in fin.readlines():
+                        _ep_type, _url = line.split(':', 1)
+                        if _ep_type.strip().upper() == ep_type.upper():
+                            url = _url.strip()
+                            break
 
     # sanity checks
     if not url:
@@ -118,13 +184,40 @@ def get_channel_url(ep_type, channel=None, url=None):
     if not channel:
         raise ValueError('no %s channel for URL %s' % (ep_type, url))
 
-    if channel.lower() != Url(url).path.lstrip('/').lower():
+    name = _get_url_name(url)
+    if name is None:
+        name = Url(url).path.lstrip('/')
+
+    elif name.lower().startswith('%s.' % channel.lower()):
+        name = channel
+
+    if channel.lower() != name.lower():
         raise ValueError('%s channel (%s) / url (%s) mismatch'
                         % (ep_type, channel, url))
 
     return channel, url
 
 
+def _get_url_name(url):
+    '''
+    return the endpoint name of `inproc://<name>` and `ipc://<path>/<name>.ipc`
+    URLs, `None` for all other URLs
+    '''
+
+    url = Url(url)
+
+    if url.schema == TRANSPORT_INPROC:
+        return url.host
+
+    if url.schema == TRANSPORT_IPC:
+        name = os.path.basename(url.path)
+        if name.endswith('.ipc'):
+            name = name[:-4]
+        return name
+
+    return None
+
+
 # ------------------------------------------------------------------------------
 #
 def log_bulk(log, token, msgs):
@@ -162,19 +255,145 @@ def sock_connect(sock, url, hop=None):
 
 # ------------------------------------------------------------------------------
 #
-def zmq_bind(sock):
+def zmq_context(url=None):
+    '''
+    `inproc://` endpoints can only be reached from sockets which live in the
+    same zmq context: use the process wide context for those, and a private
+    context for all other transports.  The given `url` can also be a plain
+    transport name.
+    '''
+
+    if str(url or '').split(':')[0] == TRANSPORT_INPROC:
+        return zmq.Context.instance()
+
+    return zmq.Context()
+
+
+# ------------------------------------------------------------------------------
+#
+def zmq_bind(sock, transport=None, name=None, path=None, ports=None,
+                    tries=None):
+    '''
+    Bind the given socket to a free endpoint and return the endpoint URL.  The
+    transport defaults to `tcp` (the URL will then contain the host IP), and
+    the port is chosen by the OS unless a port range is specified (`ports`,
+    formatted as `<min>-<max>`, defaults to `$RADICAL_ZMQ_PORTS`) - random
+    ports in that range are then tried up to `tries` times.  For
+    peers on the same node, `ipc` binds to a Unix socket named
+    `<name>.<pid>.<uuid>.ipc` in `path` (default: the system's temp directory),
+    so that processes sharing `path` do not take over each other's endpoints.
+    For peers in the same process, `inproc` binds to `inproc://<name>` - the
+    peers will then need to use the process wide zmq context (see
+    `zmq_context()`).  The Unix socket file is not removed when the socket is
+    closed, use `zmq_unlink()` for that.
+    '''
+
+    if not transport:
+        transport = TRANSPORT_TCP
+
+    if transport == TRANSPORT_TCP:
+
+        if not ports: ports = _PORTS
+        if not tries: tries = _BIND_TRIES
 
-    while True:
-        port = find_port()
         try:
-            sock.bind('tcp://*:%s' % port)
-            addr      = Url(as_string(sock.getsockopt(zmq.LAST_ENDPOINT)))
-            addr.host = get_hostip()
-            return addr
-        except:
-            pass
-
-    raise RuntimeError('could not bind to any port')
+            if ports:
+                port_min, port_max = [int(p) for p in ports.split('-')]
+                # `bind_to_random_port` excludes `max_port`
+                sock.bind_to_random_port('tcp://*', min_port=port_min,
+                                                    max_port=port_max + 1,
+                                                    max_tries=tries)
+            else:
+                sock.bind('tcp://*:*')
+
+        except zmq.ZMQBindError as e:
+            raise RuntimeError('could not bind to any port in %s' % ports) \
+                from e
+
+        addr      = Url(as_string(sock.getsockopt(zmq.LAST_ENDPOINT)))
+        addr.host = get_hostip()
+        return addr
+
+    if transport == TRANSPORT_IPC:
+
+        if not name:
+            name = 'zmq'
+
+        if not path:
+            path = tempfile.gettempdir()
+
+        name = '%s.%d.%s' % (name, os.getpid(), uuid.uuid4().hex[:8])
+
+        # Unix socket paths are limited in length - fall back to the temp dir
+        fname = '%s/%s.ipc' % (os.path.abspath(path), name)
+        if len(fname) > _IPC_PATH_MAX:
+            fname = '%s/%s.ipc' % (tempfile.gettempdir(), name)
+
+        return zmq_bind_url(sock, 'ipc://%s' % fname)
+
+    if transport == TRANSPORT_INPROC:
+
+        if not name:
+            name = 'zmq.%d.%x' % (os.getpid(), id(sock))
+
+        return zmq_bind_url(sock, 'inproc://%s' % name)
+
+    raise ValueError('unsupported transport %s' % transport)
+
+
+# ------------------------------------------------------------------------------
+#
+def zmq_bind_url(sock, url):
+    '''
+    Bind the given socket to the given endpoint URL and return that URL.
+    Binding to an `ipc://` endpoint fails if its socket file exists, as zmq
+    would silently take over the endpoint of another socket.  Socket files
+    created here are removed by `zmq_unlink()`.
+    '''
+
+    url    = str(url)
+    prefix = '%s://' % TRANSPORT_IPC
+
+    if url.startswith(prefix):
+
+        fname = os.path.abspath(url[len(prefix):])
+        if os.path.exists(fname):
+            raise RuntimeError('ipc endpoint exists: %s' % fname)
+
+        sock.bind(prefix + fname)
+        _ipc_owned[fname] = os.getpid()
+
+    else:
+        sock.bind(url)
+
+    return Url(as_string(sock.getsockopt(zmq.LAST_ENDPOINT)))
+
+
+# ------------------------------------------------------------------------------
+#
+def zmq_unlink(url):
+    '''
+    Remove the Unix socket file of the given `ipc://` endpoint URL (as returned
+    by `zmq_bind()`).  This is a no-op for all other transports, and for socket
+    files which were not created by this process.
+    '''
+
+    url    = str(url or '')
+    prefix = '%s://' % TRANSPORT_IPC
+
+    if not url.startswith(prefix):
+        return
+
+    fname = os.path.abspath(url[len(prefix):])
+    if _ipc_owned.get(fname) != os.getpid():
+        return
+
+    del _ipc_owned[fname]
+
+    try:
+        os.unlink(fname)
+    except FileNotFoundError:
+        pass
 
 
 # ------------------------------------------------------------------------------
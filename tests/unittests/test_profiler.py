@@ -9,6 +9,8 @@ import os
 import copy
 import time
 
+import pytest
+
 import radical.utils as ru
 
 # create a virgin env
@@ -57,6 +59,8 @@ def test_profiler():
         assert _grep('^[0-9\\.]*,bar,%s,MainThread,baz,,$' %       pname )
         assert _grep('^%.7f,buz,%s,MainThread,,,$'         % (now, pname))
 
+        prof.close()
+
     finally:
         try   : del os.environ['RADICAL_PROFILE']
         except: pass
@@ -91,11 +95,491 @@ def test_enable():
         assert not _grep('bar')
         assert     _grep('buz')
 
+        prof.close()
+
+    finally:
+        try   : del os.environ['RADICAL_PROFILE']
+        except: pass
+        try   : os.unlink(fname)
+        except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_buffered():
+
+    pname = 'ru.%d'        % os.getpid()
+    fname = '/tmp/%s.prof' % pname
+
+    def _count(pat):
+        with ru.ru_open(fname, 'r') as fin:
+            return len([line for line in fin if pat in line])
+
+    try:
+        os.environ['RADICAL_PROFILE'] = 'True'
+        prof = ru.Profiler(name=pname, ns='radical.utils', path='/tmp/',
+                           buffer=10)
+
+        for i in range(5):
+            prof.prof('foo', uid='task.%d' % i)
+
+        # events are held back until the buffer fills up
+        assert _count(',foo,') == 0
+
+        for i in range(5, 12):
+            prof.prof('foo', uid='task.%d' % i)
+        assert _count(',foo,') == 10
+
+        prof.flush()
+        assert _count(',foo,') == 12
+
+        prof.prof('bar')
+        prof.close()
+        assert _count(',bar,') == 1
+        assert _count(',END,') == 1
+
+    finally:
+        try   : del os.environ['RADICAL_PROFILE']
+        except: pass
+        try   : os.unlink(fname)
+        except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_binary():
+
+    pname = 'ru.%d'        % os.getpid()
+    fname = '/tmp/%s.prof' % pname
+    now   = time.time()
+
+    try:
+        os.environ['RADICAL_PROFILE'] = 'True'
+
+        for buffer in [None, 2]:
+
+            prof = ru.Profiler(name=pname, ns='radical.utils', path='/tmp/',
+                               buffer=buffer, fmt=ru.PROF_FMT_BIN)
+            prof.prof('foo')
+            prof.prof('bar', uid=['task.0', 'task.1'], state='NEW', msg='a,b')
+            prof.prof('buz', ts=now)
+            prof.close()
+
+            assert ru.is_binary_profile(fname)
+
+            rows = ru.read_profiles([fname], sid='sid.0')[fname]
+            assert [r[ru.EVENT] for r in rows] == ['sync_abs', 'foo', 'bar',
+                                                   'bar', 'buz', 'END']
+
+            assert rows[0][ru.MSG].count(':') == 4
+            assert rows[1][ru.UID]    == 'sid.0'
+            assert rows[1][ru.ENTITY] == 'session'
+            assert rows[1][ru.TID]    == 'MainThread'
+            assert rows[2][1:] == ['bar', pname, 'MainThread', 'task.0',
+                                   'NEW', 'a,b', 'task']
+            assert rows[3][ru.UID] == 'task.1'
+            assert rows[4][ru.TIME] == now
+
+            os.unlink(fname)
+
+    finally:
+        try   : del os.environ['RADICAL_PROFILE']
+        except: pass
+        try   : os.unlink(fname)
+        except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_read_parallel():
+
+    pnames = ['ru.%d.%d' % (os.getpid(), i) for i in range(3)]
+    fnames = ['/tmp/%s.prof' % pname for pname in pnames]
+
+    try:
+        os.environ['RADICAL_PROFILE'] = 'True'
+
+        for i, pname in enumerate(pnames):
+            if i == 1: fmt = ru.PROF_FMT_BIN
+            else     : fmt = ru.PROF_FMT_CSV
+            prof = ru.Profiler(name=pname, ns='radical.utils', path='/tmp/',
+                               fmt=fmt)
+            for j in range(10):
+                prof.prof('foo', uid='task.%d' % j, state='S%d' % i)
+            prof.close()
+
+        serial   = ru.read_profiles(fnames, sid='sid.0')
+        parallel = ru.read_profiles(fnames, sid='sid.0', nprocs=2)
+
+        assert list(parallel.keys()) == fnames
+        assert parallel == serial
+
+    finally:
+        try   : del os.environ['RADICAL_PROFILE']
+        except: pass
+        for fname in fnames:
+            try   : os.unlink(fname)
+            except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_read_filter():
+
+    pname = 'ru.%d'        % os.getpid()
+    fname = '/tmp/%s.prof' % pname
+
+    try:
+        os.environ['RADICAL_PROFILE'] = 'True'
+
+        for fmt in [ru.PROF_FMT_CSV, ru.PROF_FMT_BIN]:
+
+            prof = ru.Profiler(name=pname, ns='radical.utils', path='/tmp/',
+                               fmt=fmt)
+            prof.prof('exec_start', uid='task.0')
+            prof.prof('exec_stop',  uid='task.0')
+            prof.prof('get',        uid='task.1')
+            prof.prof('put',        uid='pilot.0')
+            prof.close()
+
+            def _events(**kwargs):
+                rows = ru.read_profiles([fname], sid='sid.0', **kwargs)[fname]
+                return [row[ru.EVENT] for row in rows]
+
+            # efilter skips events which are substrings of the patterns
+            assert _events(efilter={ru.EVENT: ['exec_start_stop', 'sync_abs']}) \
+                == ['exec_stop', 'get', 'put', 'END']
+            assert _events(efilter={ru.ENTITY: ['task']}) \
+                == ['sync_abs', 'put', 'END']
+
+            # eselect keeps exact matches only
+            assert _events(eselect={ru.EVENT: ['get', 'put', 'exec']}) \
+                == ['get', 'put']
+            assert _events(eselect={ru.EVENT : ['get', 'put'],
+                                    ru.ENTITY: ['pilot']}) == ['put']
+            assert _events(efilter={ru.EVENT : ['get']},
+                           eselect={ru.ENTITY: ['task']}) \
+                == ['exec_start', 'exec_stop']
+
+            os.unlink(fname)
+
+            # events with a timestamp of `1.0` get the time of the previous
+            # event, whether that one is filtered or not (rp issue 1117)
+            prof = ru.Profiler(name=pname, ns='radical.utils', path='/tmp/',
+                               fmt=fmt)
+            prof.prof('exec_start', uid='task.0', ts=10.0)
+            prof.prof('get',        uid='task.1', ts=20.0)
+            prof.prof('exec_stop',  uid='task.0', ts=1.0)
+            prof.close()
+
+            def _times(**kwargs):
+                rows = ru.read_profiles([fname], sid='sid.0', **kwargs)[fname]
+                return {row[ru.EVENT]: row[ru.TIME] for row in rows}
+
+            assert _times()['exec_stop']                          == 20.0
+            assert _times(efilter={ru.EVENT: ['get']})['exec_stop'] == 20.0
+
+            os.unlink(fname)
+
+    finally:
+        try   : del os.environ['RADICAL_PROFILE']
+        except: pass
+        try   : os.unlink(fname)
+        except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_index():
+
+    pname = 'ru.%d'        % os.getpid()
+    fname = '/tmp/%s.prof' % pname
+
+    try:
+        os.environ['RADICAL_PROFILE'] = 'True'
+
+        for fmt in [ru.PROF_FMT_CSV, ru.PROF_FMT_BIN]:
+
+            prof = ru.Profiler(name=pname, ns='radical.utils', path='/tmp/',
+                               fmt=fmt, index=True, buffer=100)
+            for i in range(1000):
+                prof.prof('exec', uid='task.%d' % i,   ts=1000.0 + i)
+                prof.prof('exec', uid='pilot.%d' % i,  ts=1000.0 + i)
+            prof.close()
+
+            assert os.path.isfile('%s.idx' % fname)
+            index = ru.index_profile(fname, chunk=1024)
+            assert len(index['chunks']) > 10
+
+            def _check(**kwargs):
+                rows = ru.read_profiles([fname], sid='sid.0', **kwargs)[fname]
+                return [row[ru.UID] for row in rows
+                                    if row[ru.EVENT] == 'exec']
+
+            assert _check(uids=['task.7', 'task.500']) == ['task.7', 'task.500']
+            assert _check(entities='pilot') == ['pilot.%d' % i
+                                                for i in range(1000)]
+            assert _check(t_range=[1010.0, 1011.0]) == ['task.10', 'pilot.10',
+                                                        'task.11', 'pilot.11']
+            assert _check(uids=['task.7'], t_range=[1010.0, 1011.0]) == []
+
+            # sync events are retained
+            rows = ru.read_profiles([fname], sid='sid.0',
+                                    uids=['task.3'])[fname]
+            assert rows[0][ru.EVENT] == 'sync_abs'
+
+            # outdated indexes are recreated
+            prof = ru.Profiler(name=pname, ns='radical.utils', path='/tmp/',
+                               fmt=fmt)
+            prof.prof('exec', uid='task.1000', ts=2000.0)
+            prof.close()
+            assert _check(uids=['task.1000']) == ['task.1000']
+
+            os.unlink(fname)
+            os.unlink('%s.idx' % fname)
+
     finally:
         try   : del os.environ['RADICAL_PROFILE']
         except: pass
         try   : os.unlink(fname)
         except: pass
+        try   : os.unlink('%s.idx' % fname)
+        except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_follow():
+
+    pname = 'ru.%d'        % os.getpid()
+    fname = '/tmp/%s.prof' % pname
+
+    try:
+        os.environ['RADICAL_PROFILE'] = 'True'
+
+        for fmt in [ru.PROF_FMT_CSV, ru.PROF_FMT_BIN]:
+
+            # the profile is picked up once it gets created
+            events = ru.follow_profiles('/tmp/%s.*' % pname, sid='sid.0',
+                                        interval=0.01, timeout=0.1)
+
+            prof = ru.Profiler(name=pname, ns='radical.utils', path='/tmp/',
+                               fmt=fmt)
+            prof.prof('foo', uid='task.0')
+
+            assert next(events)[1][ru.EVENT] == 'sync_abs'
+            assert next(events) == (fname, ru.read_profiles(
+                                               [fname], sid='sid.0')[fname][1])
+
+            prof.prof('bar', uid='task.1')
+            prof.close()
+
+            assert [row[ru.EVENT] for _, row in events] == ['bar', 'END']
+
+            os.unlink(fname)
+
+        # incomplete lines are held back until completed
+        events = ru.follow_profiles([fname], sid='sid.0', interval=0.01,
+                                    timeout=0.1)
+        with ru.ru_open(fname, 'w') as fout:
+            fout.write('1.0,foo,comp,thread,task.0,,\n2.0,bar,co')
+            fout.flush()
+
+            assert next(events)[1][ru.EVENT] == 'foo'
+
+            fout.write('mp,thread,task.0,,\n')
+            fout.flush()
+
+            assert next(events)[1][:3] == [2.0, 'bar', 'comp']
+            assert list(events) == []
+
+    finally:
+        try   : del os.environ['RADICAL_PROFILE']
+        except: pass
+        try   : os.unlink(fname)
+        except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_combine_stream():
+
+    pnames = ['ru.%d.%d' % (os.getpid(), i) for i in range(2)]
+    fnames = ['/tmp/%s.prof' % pname for pname in pnames]
+
+    try:
+        os.environ['RADICAL_PROFILE'] = 'True'
+
+        now = time.time()
+        for i, pname in enumerate(pnames):
+            prof = ru.Profiler(name=pname, ns='radical.utils', path='/tmp/')
+            for j in range(10):
+                # slightly out of order timestamps
+                prof.prof('foo', uid='task.%d' % j, ts=now + j + 0.5 * i)
+                prof.prof('bar', uid='task.%d' % j, ts=now + j - 0.1)
+            prof.close()
+
+        ref, acc = ru.combine_profiles(ru.read_profiles(fnames, sid='sid.0'))
+
+        events, acc_lists = ru.combine_profiles(
+                ru.read_profiles(fnames, sid='sid.0'), stream=True)
+        assert list(events) == ref
+        assert acc_lists    == acc
+
+        events, acc_lazy = ru.combine_profiles(
+                ru.read_profiles(fnames, sid='sid.0', lazy=True), stream=True)
+        assert list(events) == ref
+        assert acc_lazy     == acc
+
+    finally:
+        try   : del os.environ['RADICAL_PROFILE']
+        except: pass
+        for fname in fnames:
+            try   : os.unlink(fname)
+            except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_columns():
+
+    np = pytest.importorskip('numpy')
+
+    host = 'localhost:127.0.0.1'
+    p_1  = [[10.0, 'sync_abs', 'c1', 't', '',       '',  host + ':1:1:sys',
+                                                                     'session'],
+            [12.0, 'foo',      'c1', 't', 'task.0', 'A', '',          'task'],
+            [11.0, 'bar',      'c1', 't', 'task.1', 'B', '',          'task']]
+    p_2  = [[15.0, 'sync_abs', 'c2', 't', '',       '',  host + ':1:1:sys',
+                                                                     'session'],
+            [16.0, 'foo',      'c2', 't', 'task.1', 'A', '',          'task']]
+
+    cols = ru.ProfileColumns.from_rows(p_1)
+    assert len(cols) == 3
+    assert cols.to_rows() == p_1
+
+    mask = cols.mask(ru.EVENT, ['foo', 'bar'])
+    assert list(mask) == [False, True, True]
+
+    sel = cols.select(mask).sort()
+    assert list(sel.column(ru.UID))  == ['task.1', 'task.0']
+    assert list(sel.column(ru.TIME)) == [11.0, 12.0]
+
+    sel.shift(-1.0, sel.mask(ru.STATE, ['A']))
+    assert list(sel.column(ru.TIME)) == [11.0, 11.0]
+
+    both = ru.ProfileColumns.concat([cols, ru.ProfileColumns.from_rows(p_2)])
+    assert both.to_rows() == p_1 + p_2
+
+    # combining columns must yield the same as combining rows
+    rows, acc_rows = ru.combine_profiles({'p_1': copy.deepcopy(p_1),
+                                          'p_2': copy.deepcopy(p_2)})
+    comb, acc_cols = ru.ProfileColumns.combine(
+                                    {'p_1': ru.ProfileColumns.from_rows(p_1),
+                                     'p_2': ru.ProfileColumns.from_rows(p_2)})
+    assert acc_rows == acc_cols
+    assert comb.to_rows() == rows
+    assert np.all(np.diff(comb.column(ru.TIME)) >= 0)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_thread_info():
+
+    import threading as mt
+
+    pname = 'ru.%d.ti'     % os.getpid()
+    fname = '/tmp/%s.prof' % pname
+
+    name, tid = ru.get_thread_info()
+    assert name == mt.current_thread().name
+    assert tid  == mt.get_native_id()
+    assert ru.get_thread_info() is ru.get_thread_info()
+
+    # the cache is reset in forked children (new native thread ID)
+    rfd, wfd = os.pipe()
+    pid = os.fork()
+    if not pid:
+        os.close(rfd)
+        os.write(wfd, str(ru.get_thread_info()[1]).encode())
+        os._exit(0)
+
+    os.close(wfd)
+    child_tid = int(os.read(rfd, 64))
+    os.close(rfd)
+    os.waitpid(pid, 0)
+    assert child_tid == pid
+
+    try:
+        os.environ['RADICAL_PROFILE'] = 'True'
+        prof = ru.Profiler(name=pname, ns='radical.utils', path='/tmp/')
+
+        infos = list()
+
+        def _work():
+            infos.append(ru.get_thread_info())
+            prof.prof('work')
+
+        thr = mt.Thread(target=_work, name='worker')
+        thr.start()
+        thr.join()
+        prof.close()
+
+        assert infos[0][0] == 'worker'
+        assert infos[0][1] != tid
+
+        events = ru.read_profiles([fname], sid=pname)[fname]
+        assert [e[ru.TID] for e in events if e[ru.EVENT] == 'work'] \
+            == ['worker']
+
+    finally:
+        try   : del os.environ['RADICAL_PROFILE']
+        except: pass
+        try   : os.unlink(fname)
+        except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_limits():
+
+    pname = 'ru.%d.lim'    % os.getpid()
+    fname = '/tmp/%s.prof' % pname
+
+    try:
+        os.environ['RADICAL_PROFILE']        = 'True'
+        os.environ['RADICAL_PROFILE_SAMPLE'] = 'get:0.1'
+        prof = ru.Profiler(name=pname, ns='radical.utils', path='/tmp/',
+                           rate={'put': 5})
+
+        for _ in range(100):
+            prof.prof('get')
+            prof.prof('put')
+            prof.prof('other')
+        prof.close()
+
+        events = ru.read_profiles([fname], sid=pname)[fname]
+        names  = [e[ru.EVENT] for e in events]
+
+        assert names.count('get')   == 10
+        assert names.count('put')   == 5
+        assert names.count('other') == 100
+
+        dropped = sorted(e[ru.MSG] for e in events
+                                   if e[ru.EVENT] == 'prof_dropped')
+        assert dropped == ['get:90', 'put:95']
+
+        with pytest.raises(ValueError):
+            ru.Profiler(name=pname, ns='radical.utils', path='/tmp/',
+                        sample='get:2')
+
+    finally:
+        try   : del os.environ['RADICAL_PROFILE']
+        except: pass
+        try   : del os.environ['RADICAL_PROFILE_SAMPLE']
+        except: pass
+        try   : os.unlink(fname)
+        except: pass
 
 
 # ------------------------------------------------------------------------------
@@ -170,6 +654,16 @@ if __name__ == '__main__':
     test_profiler()
     test_env()
     test_enable()
+    test_buffered()
+    test_binary()
+    test_read_parallel()
+    test_read_filter()
+    test_index()
+    test_follow()
+    test_combine_stream()
+    test_columns()
+    test_thread_info()
+    test_limits()
 
 
 # ------------------------------------------------------------------------------
@@ -59,12 +59,47 @@ def test_serialization_typed_dict():
     assert isinstance(old['a'], A) and isinstance(new['a'], A)
 
 
+# ------------------------------------------------------------------------------
+#
+def test_serialization_msgpack():
+
+    class Packed(object):
+
+        def __init__(self, data):
+            self.data = data
+
+        def __eq__(self, other):
+            return self.data == other.data
+
+        # the encoder uses msgpack recursively
+        def serialize(self):
+            return ru.to_msgpack(self.data)
+
+        @classmethod
+        def deserialize(cls, data):
+            return cls(ru.from_msgpack(data))
+
+
+    ru.register_serializable(Packed, encode=Packed.serialize,
+                                     decode=Packed.deserialize)
+
+    old  = {'foo': [Packed({'bar': [1, 2]}), Packed('buz')]}
+    data = ru.to_msgpack(old)
+
+    assert ru.from_msgpack(data) == old
+    assert ru.to_msgpack(old)    == data
+
+    # deserialize from buffers without copying
+    assert ru.from_msgpack(memoryview(b'xx' + data)[2:]) == old
+
+
 # ------------------------------------------------------------------------------
 #
 if __name__ == '__main__':
 
     test_serialization()
     test_serialization_typed_dict()
+    test_serialization_msgpack()
 
 
 # ------------------------------------------------------------------------------
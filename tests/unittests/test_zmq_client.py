@@ -2,13 +2,18 @@
 
 # pylint: disable=no-value-for-parameter
 
-import os
+import shutil
+import asyncio
+import tempfile
+
+import threading as mt
 
 from unittest import mock, TestCase
 
 from radical.utils.json_io import write_json
 
-from radical.utils.zmq import Client, Server
+from radical.utils.zmq        import Client, AsyncClient, Server
+from radical.utils.zmq.client import _pack_request
 
 
 # ------------------------------------------------------------------------------
@@ -28,11 +33,12 @@ class TestZMQClient(TestCase):
         s = Server()
         s.start()
 
-        write_json({'addr': s.addr}, 'server_local.cfg')
-        c = Client(server='server_local')
+        path = tempfile.mkdtemp()
+        write_json({'addr': s.addr}, '%s/server_local.cfg' % path)
+        c = Client(server='%s/server_local' % path)
         self.assertEqual(c.url, s.addr)
         c.close()
-        os.unlink('server_local.cfg')
+        shutil.rmtree(path)
 
         c = Client(url=s.addr)
         self.assertEqual(c.url, s.addr)
@@ -61,12 +67,134 @@ class TestZMQClient(TestCase):
         s.wait()
 
 
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch('radical.utils.zmq.server.Logger')
+    @mock.patch('radical.utils.zmq.server.Profiler')
+    def test_client_pipelined(self, mocked_profiler, mocked_logger):
+
+        s = Server(workers=2)
+        s.register_request('add', lambda a, b=0: a + b)
+        s.start()
+
+        c = Client(url=s.addr)
+
+        try:
+            fut = c.request_async('echo', 'foo')
+            self.assertEqual(fut.result(timeout=10), 'foo')
+
+            fut = c.request_async('no_registered_cmd')
+            with self.assertRaises(RuntimeError):
+                fut.result(timeout=10)
+
+            # results are returned in request order
+            reqs = [('add', [i], {'b': 1}) for i in range(1000)]
+            self.assertEqual(c.request_many(reqs), list(range(1, 1001)))
+            self.assertEqual(c.request_many([('echo', ['foo']), ('add', [1])]),
+                             ['foo', 1])
+
+            with self.assertRaises(RuntimeError):
+                c.request_many([('echo', ['foo']), ('fail', [None])])
+
+            # replies left over from an interrupted call are discarded
+            c._many_sock.send_multipart([b'', b'%d.0' % c._many_epoch,
+                                         _pack_request('echo', ['old'], {})])
+            self.assertEqual(c.request_many([('echo', ['a']), ('echo', ['b'])]),
+                             ['a', 'b'])
+
+            # synchronous requests are still available
+            self.assertEqual(c.request('echo', 'bar'), 'bar')
+
+        finally:
+            c.close()
+            s.stop()
+            s.wait()
+
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch('radical.utils.zmq.client._MAX_IN_FLIGHT', 2)
+    @mock.patch('radical.utils.zmq.server.Logger')
+    @mock.patch('radical.utils.zmq.server.Profiler')
+    def test_client_async_in_flight(self, mocked_profiler, mocked_logger):
+
+        release = mt.Event()
+
+        s = Server(workers=2)
+        s.register_request('wait', lambda: release.wait(timeout=10))
+        s.start()
+
+        c    = Client(url=s.addr)
+        futs = list()
+
+        def request():
+            futs.append(c.request_async('echo', 'foo'))
+
+        try:
+            futs.append(c.request_async('wait'))
+            futs.append(c.request_async('wait'))
+
+            # a third request waits for a reply to the first two
+            thread = mt.Thread(target=request)
+            thread.start()
+            thread.join(timeout=0.5)
+            self.assertTrue(thread.is_alive())
+
+            release.set()
+            thread.join(timeout=10)
+            self.assertFalse(thread.is_alive())
+            self.assertEqual([fut.result(timeout=10) for fut in futs],
+                             [True, True, 'foo'])
+
+        finally:
+            release.set()
+            c.close()
+            s.stop()
+            s.wait()
+
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch('radical.utils.zmq.server.Logger')
+    @mock.patch('radical.utils.zmq.server.Profiler')
+    def test_client_asyncio(self, mocked_profiler, mocked_logger):
+
+        s = Server()
+        s.register_request('add', lambda a, b=0: a + b)
+        s.start()
+
+        async def run():
+
+            c = AsyncClient(url=s.addr)
+            try:
+                self.assertEqual(await c.request('echo', 'foo'), 'foo')
+
+                with self.assertRaises(RuntimeError):
+                    await c.request('fail', None)
+
+                reqs = [('add', [i], {'b': 1}) for i in range(100)]
+                self.assertEqual(await c.request_many(reqs),
+                                 list(range(1, 101)))
+            finally:
+                c.close()
+
+        try:
+            asyncio.run(run())
+
+        finally:
+            s.stop()
+            s.wait()
+
+
 # ------------------------------------------------------------------------------
 #
 if __name__ == '__main__':
 
     tc = TestZMQClient()
     tc.test_client()
+    tc.test_client_pipelined()
+    tc.test_client_async_in_flight()
+    tc.test_client_asyncio()
 
 # ------------------------------------------------------------------------------
 
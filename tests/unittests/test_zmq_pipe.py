@@ -5,6 +5,7 @@ __copyright__ = 'Copyright 2021, RADICAL@Rutgers'
 __license__   = 'MIT'
 
 
+import os
 import time
 import radical.utils as ru
 
@@ -67,12 +68,39 @@ def test_zmq_pipe_cb():
     assert len(results) == n, results
 
 
+# ------------------------------------------------------------------------------
+#
+def test_zmq_pipe_transports():
+
+    for transport, schema in [(ru.zmq.TRANSPORT_IPC,    'ipc://'),
+                              (ru.zmq.TRANSPORT_INPROC, 'inproc://')]:
+
+        pipe_1 = ru.zmq.Pipe(ru.zmq.MODE_PULL, transport=transport)
+        pipe_2 = ru.zmq.Pipe(ru.zmq.MODE_PUSH, str(pipe_1.url))
+
+        assert str(pipe_1.url).startswith(schema), pipe_1.url
+
+        time.sleep(0.01)
+
+        for i in range(10):
+            pipe_2.put('foo %d' % i)
+
+        for i in range(10):
+            assert pipe_1.get() == 'foo %d' % i
+
+        pipe_1.stop()
+
+        # ipc socket files are removed on stop
+        assert not os.path.exists(str(pipe_1.url).split('://', 1)[1])
+
+
 # ------------------------------------------------------------------------------
 # run tests if called directly
 if __name__ == '__main__':
 
     test_zmq_pipe()
     test_zmq_pipe_cb()
+    test_zmq_pipe_transports()
 
 
 # ------------------------------------------------------------------------------
@@ -113,11 +113,144 @@ def test_zmq_pubsub():
     pprint.pprint(data)
 
 
+# ------------------------------------------------------------------------------
+#
+def test_zmq_pubsub_bulk():
+    '''
+    publish bulks, and receive them with bulk and non-bulk callbacks
+    '''
+
+    cfg = ru.Config(cfg={'uid'      : 'test_pubsub_bulk',
+                         'channel'  : 'test',
+                         'kind'     : 'pubsub',
+                         'log_level': 'error',
+                         'path'     : '/tmp/'})
+
+    b = ru.zmq.PubSub('test', cfg)
+    b.start()
+
+    n     = 1000
+    bulks = list()
+    msgs  = list()
+    calls = list()
+    done  = mt.Event()
+
+    def cb_bulk(topic, msgs):
+        assert topic == 'topic'
+        bulks.append(msgs)
+        if sum([len(bulk) for bulk in bulks]) >= n:
+            done.set()
+
+    def cb_msg(topic, msg):
+        msgs.append(msg)
+        calls.append(['msg', msg['idx']])
+        # failing callbacks do not lose the remaining messages
+        if msg['idx'] % 100 == 0:
+            raise RuntimeError('oops')
+
+    def cb_other(topic, msg):
+        calls.append(['other', msg['idx']])
+
+    try:
+        log = ru.Logger(name='test_pubsub_bulk', level='OFF')
+        sub = ru.zmq.Subscriber(channel='test', url=str(b.addr_sub), log=log)
+        sub.subscribe('topic', cb=cb_bulk, bulk=True)
+        sub.subscribe('topic', cb=cb_msg)
+        sub.subscribe('topic', cb=cb_other)
+        time.sleep(0.1)
+
+        pub = ru.zmq.Publisher(channel='test', url=str(b.addr_pub))
+        time.sleep(0.1)
+        pub.put_bulk('topic', [{'idx': i} for i in range(n)])
+
+        assert done.wait(timeout=10)
+        time.sleep(0.1)
+
+        assert [m['idx'] for bulk in bulks for m in bulk] == list(range(n))
+        assert [m['idx'] for m in msgs]                   == list(range(n))
+
+        # each message is passed to all non-bulk callbacks before the next
+        # message is delivered
+        assert calls == [[name, i] for i in range(n)
+                                   for name in ['msg', 'other']]
+
+        # the bulk is sent as a single frame and delivered in one call
+        assert len(bulks) == 1
+
+        sub.unsubscribe(cb_bulk)
+        sub.unsubscribe(cb_msg)
+        sub.unsubscribe(cb_other)
+
+        # interactive subscribers get bulk messages one by one
+        sub = ru.zmq.Subscriber(channel='test', url=str(b.addr_sub),
+                                topic='topic', log=log)
+        time.sleep(0.1)
+
+        pub.put_bulk('topic', [1, 2])
+        pub.put('topic', 3)
+
+        assert sub.get()                    == ['topic', 1]
+        assert sub.get_nowait(timeout=1000) == ['topic', 2]
+        assert sub.get_nowait(timeout=1000) == ['topic', 3]
+        assert sub.get_nowait(timeout=10)   == [None, None]
+
+    finally:
+        b.stop()
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_pubsub_proxy():
+
+    cfg = ru.Config(cfg={'uid'      : 'test_pubsub_proxy',
+                         'channel'  : 'test',
+                         'kind'     : 'pubsub',
+                         'log_level': 'error',
+                         'path'     : '/tmp/',
+                         'proxy'    : True,
+                         'stats'    : True})
+
+    b = ru.zmq.PubSub('test', cfg)
+    b.start()
+
+    n    = 100
+    msgs = list()
+    done = mt.Event()
+
+    def cb(topic, msg):
+        msgs.append(msg)
+        if len(msgs) >= n:
+            done.set()
+
+    try:
+        ru.zmq.Subscriber(channel='test', url=str(b.addr_sub),
+                          topic='topic', cb=cb)
+        time.sleep(0.1)
+
+        pub = ru.zmq.Publisher(channel='test', url=str(b.addr_pub))
+        time.sleep(0.1)
+        pub.put_bulk('topic', list(range(n)))
+
+        assert done.wait(timeout=10)
+        assert msgs == list(range(n))
+
+        time.sleep(0.1)
+        assert b.stats['msgs'] == 1
+
+    finally:
+        b.stop()
+
+    # the control socket terminates the proxy before `stop()` returns
+    assert not b.alive
+
+
 # ------------------------------------------------------------------------------
 # run tests if called directly
 if __name__ == '__main__':
 
     test_zmq_pubsub()
+    test_zmq_pubsub_bulk()
+    test_zmq_pubsub_proxy()
 
 
 # ------------------------------------------------------------------------------
@@ -5,6 +5,8 @@ __copyright__ = 'Copyright 2019, RADICAL@Rutgers'
 __license__   = 'MIT'
 
 
+import os
+import zmq
 import time
 import pytest
 import threading     as mt
@@ -318,12 +320,439 @@ def test_zmq_queue_cb():
     assert data['get']['A'].count('A') + data['get']['B'].count('B') == c_a + c_b
 
 
+# ------------------------------------------------------------------------------
+#
+def test_zmq_queue_idle():
+    '''
+    requests on an empty queue are held back by the bridge and are served as
+    soon as messages arrive
+    '''
+
+    cfg = ru.Config(cfg={'uid'         : 'test_queue_idle',
+                         'channel'     : 'test',
+                         'kind'        : 'queue',
+                         'log_level'   : 'error',
+                         'path'        : '/tmp/',
+                         'poll_timeout': 1000})
+
+    b = ru.zmq.Queue('test', cfg)
+    b.start()
+
+    try:
+        put = ru.zmq.Putter(channel='test', url=str(b.addr_put))
+        get = ru.zmq.Getter(channel='test', url=str(b.addr_get))
+
+        # nothing queued: the request is held back
+        assert get.get_nowait(timeout=100) is None
+
+        start = time.time()
+        put.put('foo')
+        assert get.get_nowait(timeout=1000) == ['foo']
+
+        # much faster than the poll timeout
+        assert time.time() - start < 0.5
+
+        put.put(['bar', 'buz'], qname='other')
+        put.put('biz')
+        assert get.get(qname='other') == ['bar', 'buz']
+        assert get.get()              == ['biz']
+
+    finally:
+        b.stop()
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_queue_buffer():
+
+    from radical.utils.zmq.queue import _QueueBuffer
+
+    # chunked get / unget
+    qbuf = _QueueBuffer()
+    qbuf.put([1, 2, 3])
+    qbuf.put([4, 5])
+    assert len(qbuf)   == 5
+    assert qbuf.get(2) == [1, 2]
+    assert qbuf.get(2) == [3, 4]
+    qbuf.unget([3, 4])
+    assert qbuf.get(9) == [3, 4, 5]
+    assert qbuf.get(9) == []
+    assert not qbuf.full
+
+    # drop policy
+    qbuf = _QueueBuffer(limit=3, policy=ru.zmq.BACKLOG_DROP)
+    qbuf.put([1, 2])
+    qbuf.put([3, 4, 5])
+    assert qbuf.full
+    assert qbuf.dropped == 2
+    assert qbuf.get(9)  == [1, 2, 3]
+
+    # spill policy: order is preserved across memory and disk
+    fname = '/tmp/test_queue.%d.spill' % os.getpid()
+    qbuf  = _QueueBuffer(limit=3, policy=ru.zmq.BACKLOG_SPILL, spill=fname)
+    for i in range(5):
+        qbuf.put([2 * i, 2 * i + 1])
+
+    assert len(qbuf)     == 4
+    assert qbuf.spilled  == 3
+    assert os.path.isfile(fname)
+
+    out = list()
+    while len(qbuf):
+        out += qbuf.get(3)
+
+    assert out == list(range(10))
+    assert not qbuf.spilled
+    assert not os.path.isfile(fname)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_queue_backlog():
+
+    cfg = ru.Config(cfg={'uid'           : 'test_queue_backlog',
+                         'channel'       : 'test',
+                         'kind'          : 'queue',
+                         'log_level'     : 'error',
+                         'path'          : '/tmp/',
+                         'bulk_size'     : 4,
+                         'backlog'       : 8,
+                         'backlog_policy': ru.zmq.BACKLOG_BLOCK})
+
+    b = ru.zmq.Queue('test', cfg)
+    b.start()
+
+    try:
+        put = ru.zmq.Putter(channel='test', url=str(b.addr_put))
+        get = ru.zmq.Getter(channel='test', url=str(b.addr_get))
+
+        for i in range(32):
+            put.put(i)
+
+        out = list()
+        while len(out) < 32:
+            out += get.get()
+
+        assert out == list(range(32))
+
+        # zmq buffers are limited so that putters block on a full backlog
+        b.write_config()
+        put = ru.zmq.Putter(channel='test_queue_backlog', path='/tmp/')
+        assert b._put.hwm == put._q.hwm
+        assert 0 < put._q.hwm < 32
+
+    finally:
+        b.stop()
+        try   : os.unlink('/tmp/test_queue_backlog.cfg')
+        except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_queue_passthrough():
+
+    from radical.utils.zmq.queue import _split_bulk, _join_bulk
+
+    for n in [0, 1, 15, 16, 1024, 70000]:
+        msgs   = [{'uid': 'task.%06d' % i, 'idx': i} for i in range(n)]
+        data   = ru.to_msgpack(msgs)
+        frames = _split_bulk(data)
+
+        assert len(frames)                == n
+        assert _join_bulk(frames)         == data
+        assert ru.from_msgpack(_join_bulk(frames[3:7])) == msgs[3:7]
+
+    for passthrough in [True, False]:
+
+        cfg = ru.Config(cfg={'uid'        : 'test_queue_pt',
+                             'channel'    : 'test',
+                             'kind'       : 'queue',
+                             'log_level'  : 'error',
+                             'path'       : '/tmp/',
+                             'bulk_size'  : 3,
+                             'passthrough': passthrough})
+
+        b = ru.zmq.Queue('test', cfg)
+        b.start()
+
+        try:
+            put = ru.zmq.Putter(channel='test', url=str(b.addr_put))
+            get = ru.zmq.Getter(channel='test', url=str(b.addr_get))
+
+            put.put([{'idx': 0}, {'idx': 1}])
+            put.put([{'idx': 2}, {'idx': 3}])
+
+            # ensure both bulks are buffered before requesting
+            while getattr(b, 'nin', 0) < 4:
+                time.sleep(0.01)
+
+            assert get.get() == [{'idx': 0}, {'idx': 1}, {'idx': 2}]
+            assert get.get() == [{'idx': 3}]
+
+        finally:
+            b.stop()
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_queue_credits():
+    '''
+    callback getters receive pushed bulks limited by their credits, and share
+    the queue with interactive getters
+    '''
+
+    cfg = ru.Config(cfg={'uid'      : 'test_queue_credits',
+                         'channel'  : 'test',
+                         'kind'     : 'queue',
+                         'log_level': 'error',
+                         'path'     : '/tmp/',
+                         'bulk_size': 16})
+
+    b = ru.zmq.Queue('test', cfg)
+    b.start()
+
+    bulks = list()
+    done  = mt.Event()
+
+    def cb(msgs):
+        bulks.append(msgs)
+        if sum([len(bulk) for bulk in bulks]) >= 10:
+            done.set()
+
+    try:
+        put = ru.zmq.Putter(channel='test', url=str(b.addr_put))
+        ru.zmq.Getter(channel='test', url=str(b.addr_get), cb=cb,
+                      n_credits=3)
+
+        put.put(list(range(10)))
+        assert done.wait(timeout=10)
+
+        assert [m for bulk in bulks for m in bulk] == list(range(10))
+        assert max([len(bulk) for bulk in bulks])  <= 3
+
+        # an interactive getter is served in turn with the listener
+        get = ru.zmq.Getter(channel='test', url=str(b.addr_get))
+        put.put(list(range(10, 40)))
+        msgs = get.get_nowait(timeout=5000)
+        assert msgs and len(msgs) <= 16
+
+    finally:
+        b.stop()
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_queue_credits_drain():
+    '''
+    messages pushed ahead to a listener are not lost when it is unsubscribed
+    '''
+
+    cfg = ru.Config(cfg={'uid'      : 'test_queue_credits_drain',
+                         'channel'  : 'test',
+                         'kind'     : 'queue',
+                         'log_level': 'error',
+                         'path'     : '/tmp/',
+                         'bulk_size': 2})
+
+    b = ru.zmq.Queue('test', cfg)
+    b.start()
+
+    msgs    = list()
+    first   = mt.Event()
+    release = mt.Event()
+
+    def cb(bulk):
+        msgs.extend(bulk)
+        first.set()
+        release.wait(timeout=10)
+
+    try:
+        put = ru.zmq.Putter(channel='test', url=str(b.addr_put))
+        get = ru.zmq.Getter(channel='test', url=str(b.addr_get), cb=cb,
+                            n_credits=10)
+
+        put.put(list(range(10)))
+        assert first.wait(timeout=10)
+
+        # let the bridge push the remaining bulks while the callback blocks
+        time.sleep(0.5)
+        mt.Timer(0.5, release.set).start()
+        get.unsubscribe(cb)
+
+        assert sorted(msgs) == list(range(10))
+
+    finally:
+        release.set()
+        b.stop()
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_queue_bulks():
+
+    cfg = ru.Config(cfg={'uid'          : 'test_queue_bulks',
+                         'channel'      : 'test_queue_bulks',
+                         'kind'         : 'queue',
+                         'log_level'    : 'error',
+                         'path'         : '/tmp/',
+                         'bulk_size'    : 8,
+                         'bulk_adaptive': True,
+                         'put_bulk_time': 0.5})
+
+    b = ru.zmq.Queue('test_queue_bulks', cfg)
+    b.start()
+    b.write_config()
+
+    try:
+        # the putter picks up the coalescing settings from the bridge config
+        put = ru.zmq.Putter(channel='test_queue_bulks', path='/tmp/')
+        g_1 = ru.zmq.Getter(channel='test_queue_bulks', url=str(b.addr_get))
+        g_2 = ru.zmq.Getter(channel='test_queue_bulks', url=str(b.addr_get))
+
+        # both getters wait for messages
+        assert g_1.get_nowait(timeout=0) is None
+        assert g_2.get_nowait(timeout=0) is None
+        time.sleep(0.1)
+
+        for i in range(10):
+            put.put(i)
+
+        # messages are held back by the putter
+        time.sleep(0.1)
+        assert getattr(b, 'nin', 0) == 0
+
+        # the backlog is split evenly over the waiting getters
+        assert g_1.get_nowait(timeout=5000) == [0, 1, 2, 3, 4]
+        assert g_2.get_nowait(timeout=5000) == [5, 6, 7, 8, 9]
+
+        # bulk size limit on coalescing
+        put = ru.zmq.Putter(channel='test_queue_bulks', url=str(b.addr_put),
+                            bulk_size=3, bulk_time=60)
+        for i in range(4):
+            put.put(i)
+        assert g_1.get_nowait(timeout=5000) == [0, 1, 2]
+        put.flush()
+        assert g_1.get_nowait(timeout=5000) == [3]
+
+        # the flusher thread only runs while messages are pending, and
+        # stopping the putter sends all pending messages
+        time.sleep(0.1)
+        assert put._flusher is None
+        put.put(4)
+        assert put._flusher is not None
+        put.stop()
+        assert put._flusher is None
+        assert g_1.get_nowait(timeout=5000) == [4]
+        with pytest.raises(RuntimeError):
+            put.put(5)
+
+    finally:
+        b.stop()
+        try   : os.unlink('/tmp/test_queue_bulks.cfg')
+        except: pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_queue_transports():
+
+    for transport in [ru.zmq.TRANSPORT_IPC, ru.zmq.TRANSPORT_INPROC]:
+
+        uid = 'test_queue_%s' % transport
+        cfg = ru.Config(cfg={'uid'      : uid,
+                             'channel'  : uid,
+                             'kind'     : 'queue',
+                             'log_level': 'error',
+                             'path'     : '/tmp/',
+                             'transport': transport})
+
+        b = ru.zmq.Queue(uid, cfg)
+        b.start()
+        b.write_config()
+
+        try:
+            assert str(b.addr_put).startswith('%s://' % transport)
+            assert str(b.addr_get).startswith('%s://' % transport)
+
+            # the config file carries the transport specific URLs
+            bcfg = ru.read_json('/tmp/%s.cfg' % uid)
+            assert bcfg['put'] == str(b.addr_put)
+            assert bcfg['get'] == str(b.addr_get)
+
+            # the channel name is reflected in the endpoint URLs
+            assert ru.zmq.utils.get_channel_url('get', url=str(b.addr_get)) \
+                == (uid, str(b.addr_get))
+            assert ru.zmq.utils.get_channel_url('put', channel=uid,
+                                                url=str(b.addr_put)) \
+                == (uid, str(b.addr_put))
+
+            put = ru.zmq.Putter(channel=uid, path='/tmp/')
+            get = ru.zmq.Getter(channel=uid, path='/tmp/')
+
+            put.put({'foo': 1})
+            assert get.get_nowait(timeout=5000) == [{'foo': 1}]
+
+        finally:
+            b.stop()
+            try   : os.unlink('/tmp/%s.cfg' % uid)
+            except: pass
+
+        # ipc socket files are removed on stop
+        for addr in [b.addr_put, b.addr_get]:
+            assert not os.path.exists(str(addr).split('://', 1)[1])
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_queue_ports():
+
+    cfg = ru.Config(cfg={'uid'      : 'test_queue_ports',
+                         'channel'  : 'test_queue_ports',
+                         'kind'     : 'queue',
+                         'log_level': 'error',
+                         'path'     : '/tmp/',
+                         'ports'    : '23000-23010'})
+
+    b = ru.zmq.Queue('test_queue_ports', cfg)
+    b.start()
+
+    try:
+        port_put = int(ru.Url(b.addr_put).port)
+        port_get = int(ru.Url(b.addr_get).port)
+
+        assert 23000 <= port_put <= 23010
+        assert 23000 <= port_get <= 23010
+        assert port_put != port_get
+
+        # no free port left in the range
+        sock = zmq.Context.instance().socket(zmq.PULL)
+        try:
+            with pytest.raises(RuntimeError):
+                ru.zmq.utils.zmq_bind(sock, ports='%d-%d' % (port_put,
+                                                             port_put),
+                                      tries=3)
+        finally:
+            sock.close()
+
+    finally:
+        b.stop()
+
+
 # ------------------------------------------------------------------------------
 # run tests if called directly
 if __name__ == '__main__':
 
     test_zmq_queue()
     test_zmq_queue_cb()
+    test_zmq_queue_idle()
+    test_zmq_queue_buffer()
+    test_zmq_queue_backlog()
+    test_zmq_queue_passthrough()
+    test_zmq_queue_credits()
+    test_zmq_queue_credits_drain()
+    test_zmq_queue_bulks()
+    test_zmq_queue_transports()
+    test_zmq_queue_ports()
 
 
 # ------------------------------------------------------------------------------
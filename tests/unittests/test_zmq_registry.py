@@ -2,6 +2,13 @@
 
 # pylint: disable=no-value-for-parameter,unused-argument,unsubscriptable-object
 
+import os
+import time
+import shelve
+import shutil
+import tempfile
+import threading     as mt
+
 import radical.utils as ru
 
 from unittest import mock
@@ -12,8 +19,9 @@ from unittest import mock
 @mock.patch('radical.utils.zmq.server.Profiler')
 def test_zmq_registry(mocked_prof):
 
-    c = None
-    r = ru.zmq.Registry()
+    c    = None
+    path = tempfile.mkdtemp()
+    r    = ru.zmq.Registry(path=path)
     r.start()
 
     try:
@@ -51,8 +59,347 @@ def test_zmq_registry(mocked_prof):
             c.close()
 
         r.dump()
+        assert os.path.isfile('%s/%s.json' % (path, r.uid))
+
+        r.stop()
+        r.wait()
+        shutil.rmtree(path)
+
+
+# ------------------------------------------------------------------------------
+#
+@mock.patch('radical.utils.zmq.server.Profiler')
+def test_zmq_registry_ipc(mocked_prof):
+
+    c    = None
+    path = tempfile.mkdtemp()
+    r    = ru.zmq.Registry(url='ipc://', path=path)
+    r.start()
+
+    try:
+        assert r.addr.startswith('ipc://')
+        assert r.addr_pub.startswith('ipc://')
+
+        c = ru.zmq.RegistryClient(url=r.addr, cache=True)
+        c.put('foo', 1)
+        assert c.get('foo') == 1
+
+    finally:
+        if c:
+            c.close()
+
+        r.stop()
+        r.wait()
+
+    # the socket files are removed once the registry terminates
+    assert not os.path.exists(r.addr.split('://', 1)[1])
+    assert not os.path.exists(r.addr_pub.split('://', 1)[1])
+
+    # the `PUB` socket is created next to an explicit server endpoint
+    r = ru.zmq.Registry(url='ipc://%s/registry.ipc' % path, path=path)
+    r.start()
+
+    try:
+        assert r.addr     == 'ipc://%s/registry.ipc' % path
+        assert r.addr_pub.startswith('ipc://%s/' % path)
+
+    finally:
+        r.stop()
+        r.wait()
+        shutil.rmtree(path)
+
+
+# ------------------------------------------------------------------------------
+#
+@mock.patch('radical.utils.zmq.server.Profiler')
+def test_zmq_registry_bulk(mocked_prof):
+
+    c    = None
+    path = tempfile.mkdtemp()
+    r    = ru.zmq.Registry(path=path)
+    r.start()
+
+    try:
+        c = ru.zmq.RegistryClient(url=r.addr, pwd='comp')
+
+        c.put_many({'cfg.a'  : 1,
+                    'cfg.b.c': 2,
+                    'cfg.b.d': [3],
+                    'state'  : 'NEW'})
+
+        assert c.get_many(['cfg.a', 'cfg.b.c', 'cfg.x'])  == [1, 2, None]
+        assert c.get_many(['cfg.x'], default=0)           == [0]
+        assert c.get_subtree('cfg')   == {'a': 1, 'b': {'c': 2, 'd': [3]}}
+        assert c.get_subtree('cfg.b') == {'c': 2, 'd': [3]}
+        assert c.get_subtree('cfg.a') == {}
+        assert c.get_subtree('oops')  == {}
+        assert c.get_subtree()['state'] == 'NEW'
+
+        c.dump_subtree('cfg.b', name='test_bulk')
+        fname = '%s/%s.test_bulk.json' % (path, r.uid)
+        assert ru.read_json(fname) == {'c': 2, 'd': [3]}
+
+        c.close()
+
+        c = ru.zmq.RegistryClient(url=r.addr)
+        assert list(c.get_subtree().keys()) == ['comp']
+        assert c.get_many(['comp.cfg.a', 'comp.state']) == [1, 'NEW']
+
+    finally:
+        if c:
+            c.close()
+
+        r.stop()
+        r.wait()
+        shutil.rmtree(path)
+
+
+# ------------------------------------------------------------------------------
+#
+@mock.patch('radical.utils.zmq.server.Profiler')
+def test_zmq_registry_cache(mocked_prof):
+
+    c1   = None
+    c2   = None
+    path = tempfile.mkdtemp()
+    r    = ru.zmq.Registry(path=path)
+    r.start()
+
+    try:
+        assert r.addr_pub
+
+        c1 = ru.zmq.RegistryClient(url=r.addr, cache=True)
+        c2 = ru.zmq.RegistryClient(url=r.addr)
+
+        # let the subscription settle
+        time.sleep(0.1)
+
+        c2.put('cfg.a', 1)
+        c2.put('cfg.b', {'c': 2})
+        c2.put('other', 3)
+
+        assert c1.get('cfg.a')   == 1
+        assert c1.get('cfg.b.c') == 2
+        assert c1.get('other')   == 3
+        assert c1.get('oops')    is None
+        assert set(c1._cache.keys()) == {'cfg.a', 'cfg.b.c', 'other', 'oops'}
+
+        # cache hits do not go to the server
+        with mock.patch.object(c1, 'request') as mocked_request:
+            assert c1.get('cfg.a') == 1
+            assert not mocked_request.called
+
+        # changes by other clients invalidate affected entries only: the key
+        # itself, its children and its parents
+        c2.put('cfg.b', {'c': 4})
+        c2.put('oops', 5)
+        time.sleep(0.1)
+
+        assert c1.get('cfg.b.c') == 4
+        assert c1.get('oops')    == 5
+        assert 'other' in c1._cache
+        assert 'cfg.a' in c1._cache
+
+        c2.put('cfg', {'a': 6})
+        del c2['other']
+        time.sleep(0.1)
+
+        assert c1.get('cfg.a') == 6
+        assert c1.get('other') is None
+
+        # own changes are visible right away
+        c1.put('cfg.a', 7)
+        assert c1.get('cfg.a') == 7
+
+        # dropped announcements clear the whole cache
+        assert c1.get('oops') == 5
+        assert 'oops' in c1._cache
+        with r._lock:
+            r._seq += 3
+        c2.put('unrelated', 8)
+        time.sleep(0.1)
+
+        c1._invalidate()
+        assert not c1._cache
+        assert c1.get('cfg.a') == 7
+
+    finally:
+        if c1: c1.close()
+        if c2: c2.close()
+
         r.stop()
         r.wait()
+        shutil.rmtree(path)
+
+
+# ------------------------------------------------------------------------------
+#
+@mock.patch('radical.utils.zmq.server.Profiler')
+def test_zmq_registry_persistent(mocked_prof):
+
+    path  = tempfile.mkdtemp()
+    uid   = 'test.registry'
+    fname = '%s/%s' % (path, uid)
+
+    try:
+        # group commit, flushed on stop
+        r = ru.zmq.Registry(uid=uid, path=path, persistent=True)
+        r.start()
+        for i in range(100):
+            r.put('keys.k%d' % i, i)
+        r.put_many({'cfg.a': 1, 'cfg.b': [2]})
+        r.delitem('keys.k0')
+        r.stop()
+        r.wait()
+
+        # restart and recover from the log, ignoring an incomplete record
+        with open('%s.log' % fname, 'ab') as fout:
+            fout.write(b'\x20\x00\x00\x00garbage')
+
+        r = ru.zmq.Registry(uid=uid, path=path, persistent=True)
+        assert r.get('cfg')       == {'a': 1, 'b': [2]}
+        assert r.get('keys.k0')   is None
+        assert r.get('keys.k99')  == 99
+        assert len(r.keys('keys')) == 99
+        r.put('cfg.c', 3)
+        r.stop()
+
+        # compaction into a snapshot
+        store = ru.zmq.RegistryLogStore(fname, commit_time=0, compact_min=256)
+        r     = ru.zmq.Registry(uid=uid, path=path, store=store)
+        assert r.get('cfg.c') == 3
+        for i in range(100):
+            r.put('more.k%d' % i, 'x' * 16)
+        assert os.path.getsize('%s.log' % fname) < 1024
+        r.stop()
+
+        r = ru.zmq.Registry(uid=uid, path=path, persistent=True)
+        assert r.get('cfg.c')     == 3
+        assert r.get('keys.k1')   == 1
+        assert r.get('more.k99')  == 'x' * 16
+        r.stop()
+
+        # data from shelve based registries are imported
+        with shelve.open('%s/old.db' % path) as old:
+            old['foo'] = {'bar': 42}
+
+        r = ru.zmq.Registry(uid='old', path=path, persistent=True)
+        assert r.get('foo.bar') == 42
+        r.stop()
+
+        # ... only once: deleted data do not come back
+        r = ru.zmq.Registry(uid='old', path=path, persistent=True)
+        assert r.get('foo.bar') == 42
+        r.delitem('foo')
+        r.stop()
+
+        r = ru.zmq.Registry(uid='old', path=path, persistent=True)
+        assert r.get('foo') is None
+        r.stop()
+
+        # the store is closed only after the server thread ends, so that
+        # requests which are still in flight are persisted
+        started = mt.Event()
+        release = mt.Event()
+
+        def late_put():
+            started.set()
+            release.wait(timeout=10)
+            r.put('late', 1)
+
+        r = ru.zmq.Registry(uid=uid, path=path, persistent=True)
+        r.register_request('late_put', late_put, inline=True)
+        r.start()
+
+        c   = ru.zmq.RegistryClient(url=r.addr)
+        fut = c.request_async('late_put')
+        assert started.wait(timeout=10)
+
+        r.stop()
+        release.set()
+        fut.result(timeout=10)
+        r.wait()
+        c.close()
+
+        r = ru.zmq.Registry(uid=uid, path=path, persistent=True)
+        assert r.get('late') == 1
+        r.stop()
+
+    finally:
+        shutil.rmtree(path)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_zmq_registry_compaction():
+
+    path  = tempfile.mkdtemp()
+    fname = '%s/test.compact' % path
+
+    try:
+        # compaction only switches logs, the commit thread writes the snapshot
+        store = ru.zmq.RegistryLogStore(fname, commit_time=60, compact_min=0)
+        data  = store.load()
+        for i in range(10):
+            store.put('k%d' % i, i)
+            data['k%d' % i] = i
+
+        assert store.need_compaction()
+        with mock.patch('os.fsync') as mocked_fsync:
+            store.compact(data)
+            assert not mocked_fsync.called
+
+        assert not store.need_compaction()
+        assert os.path.exists('%s.log.old' % fname)
+        assert not os.path.exists('%s.snap' % fname)
+
+        store.put('k10', 10)
+        data['k10'] = 10
+        store.close()
+
+        assert not os.path.exists('%s.log.old' % fname)
+        assert os.path.exists('%s.snap' % fname)
+
+        store = ru.zmq.RegistryLogStore(fname, commit_time=0)
+        assert store.load() == data
+
+        # a crash after the snapshot was written leaves the old log behind: it
+        # is older than the snapshot and must not revert changes
+        store.put('a', 1)
+        shutil.copy('%s.log' % fname, '%s.bak' % fname)
+        store.put('a', 2)
+        data['a'] = 2
+        store.compact(data)
+        store.close()
+        os.rename('%s.bak' % fname, '%s.log.old' % fname)
+
+        store = ru.zmq.RegistryLogStore(fname, commit_time=0)
+        assert store.load() == data
+        assert not os.path.exists('%s.log.old' % fname)
+
+        # a crash before the snapshot was written: both logs are replayed over
+        # the previous snapshot
+        shutil.copy('%s.snap' % fname, '%s.snap.bak' % fname)
+        store.put('b', 3)
+        shutil.copy('%s.log' % fname, '%s.bak' % fname)
+        data['b'] = 3
+        store.compact(data)
+        store.put('b', 4)
+        data['b'] = 4
+        store.close()
+        os.rename('%s.snap.bak' % fname, '%s.snap' % fname)
+        os.rename('%s.bak' % fname, '%s.log.old' % fname)
+
+        store = ru.zmq.RegistryLogStore(fname, commit_time=0)
+        assert store.load() == data
+        store.close()
+
+        store = ru.zmq.RegistryLogStore(fname, commit_time=0)
+        assert store.load() == data
+        store.close()
+
+    finally:
+        shutil.rmtree(path)
 
 
 # ------------------------------------------------------------------------------
@@ -60,6 +407,11 @@ def test_zmq_registry(mocked_prof):
 if __name__ == '__main__':
 
     test_zmq_registry()
+    test_zmq_registry_ipc()
+    test_zmq_registry_bulk()
+    test_zmq_registry_cache()
+    test_zmq_registry_persistent()
+    test_zmq_registry_compaction()
 
 
 # ------------------------------------------------------------------------------
@@ -2,6 +2,13 @@
 
 # pylint: disable=no-value-for-parameter, protected-access
 
+import os
+import time
+import shutil
+import tempfile
+
+import threading as mt
+
 from typing   import Any, List, Dict
 from unittest import mock, TestCase
 
@@ -141,6 +148,88 @@ class TestZMQServer(TestCase):
 
         self.assertTrue(s._term.is_set())
 
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch('radical.utils.zmq.server.Logger')
+    @mock.patch('radical.utils.zmq.server.Profiler')
+    def test_transports(self, mocked_profiler, mocked_logger):
+
+        path = tempfile.mkdtemp()
+
+        for url in ['ipc://', 'inproc://', 'inproc://test.server.ep']:
+
+            s = Server(url=url, path=path)
+            s.start()
+
+            try:
+                schema = url.split('://')[0]
+                self.assertTrue(s.addr.startswith('%s://' % schema))
+
+                if url.endswith('://'):
+                    self.assertIn(s.uid, s.addr)
+                else:
+                    self.assertEqual(s.addr, url)
+
+                c = ru.zmq.Client(url=s.addr)
+                self.assertEqual(c.request('echo', 'foo'), 'foo')
+                c.close()
+
+            finally:
+                s.stop()
+                s.wait()
+
+            # ipc socket files are removed when the server terminates
+            self.assertFalse(os.path.exists(s.addr.split('://', 1)[1]))
+
+        shutil.rmtree(path)
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch('radical.utils.zmq.server.Logger')
+    @mock.patch('radical.utils.zmq.server.Profiler')
+    def test_ipc_endpoints(self, mocked_profiler, mocked_logger):
+
+        # servers with the same uid (e.g., in different processes) get
+        # separate endpoints
+        s_1 = Server(url='ipc://', uid='test.server.ipc')
+        s_2 = Server(url='ipc://', uid='test.server.ipc')
+        s_1.start()
+        s_2.start()
+
+        try:
+            self.assertNotEqual(s_1.addr, s_2.addr)
+            self.assertIn(str(os.getpid()), s_1.addr)
+
+            c = ru.zmq.Client(url=s_1.addr)
+            self.assertEqual(c.request('echo', 'foo'), 'foo')
+            c.close()
+
+        finally:
+            s_2.stop()
+            s_2.wait()
+
+        # stopping one server does not affect the other
+        self.assertTrue(os.path.exists(s_1.addr.split('://', 1)[1]))
+        s_1.stop()
+        s_1.wait()
+
+        # binding to an existing socket file fails, and the file is not
+        # removed by this process
+        fd, fname = tempfile.mkstemp(suffix='.ipc')
+        os.close(fd)
+
+        try:
+            s = Server(url='ipc://%s' % fname)
+            with self.assertRaisesRegex(RuntimeError, 'ipc endpoint exists'):
+                s.start()
+            s.wait()
+
+            ru.zmq.utils.zmq_unlink('ipc://%s' % fname)
+            self.assertTrue(os.path.exists(fname))
+
+        finally:
+            os.unlink(fname)
+
     # --------------------------------------------------------------------------
     #
     @mock.patch('radical.utils.zmq.server.zmq.Context')
@@ -153,7 +242,7 @@ class TestZMQServer(TestCase):
             side_effect=zmq.error.ZMQError(msg='random ZMQ error'))
 
         with self.assertRaises(zmq.error.ZMQError):
-            s._work()
+            s.start()
 
 
     # --------------------------------------------------------------------------
@@ -231,6 +320,84 @@ class TestZMQServer(TestCase):
             s.wait()
 
 
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch('radical.utils.zmq.server.Logger')
+    @mock.patch('radical.utils.zmq.server.Profiler')
+    def test_workers(self, mocked_profiler, mocked_logger):
+
+        s = Server(workers=2)
+        s.register_request('sleep', time.sleep)
+        s.start()
+
+        def slow():
+            c = ru.zmq.Client(url=s.addr)
+            c.request('sleep', 1.0)
+            c.close()
+
+        try:
+            # two slow requests are served concurrently
+            start   = time.time()
+            threads = [mt.Thread(target=slow) for _ in range(2)]
+            for t in threads:
+                t.start()
+
+            # inline requests are served while the workers are busy
+            time.sleep(0.1)
+            c = ru.zmq.Client(url=s.addr)
+            self.assertEqual(c.request('echo', 'foo'), 'foo')
+            self.assertLess(time.time() - start, 0.9)
+
+            # non-inline requests are still routed to the right client
+            with self.assertRaisesRegex(RuntimeError, 'task failed'):
+                c.request('fail', None)
+            c.close()
+
+            for t in threads:
+                t.join()
+            self.assertLess(time.time() - start, 1.9)
+
+        finally:
+            s.stop()
+            s.wait()
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch('radical.utils.zmq.server.Logger')
+    @mock.patch('radical.utils.zmq.server.Profiler')
+    def test_workers_stop(self, mocked_profiler, mocked_logger):
+
+        started = mt.Event()
+        reps    = list()
+
+        def work(arg):
+            started.set()
+            time.sleep(0.5)
+            return arg
+
+        s = Server(workers=1)
+        s.register_request('work', work)
+        s.start()
+
+        def request():
+            c = ru.zmq.Client(url=s.addr)
+            reps.append(c.request('work', 'foo'))
+            c.close()
+
+        thread = mt.Thread(target=request)
+        thread.start()
+        self.assertTrue(started.wait(timeout=5))
+
+        # `wait()` returns only after the workers are done, and their replies
+        # still reach the clients
+        s.stop()
+        s.wait()
+        self.assertFalse(s._thread.is_alive())
+
+        thread.join(timeout=5)
+        self.assertEqual(reps, ['foo'])
+
+
 # ------------------------------------------------------------------------------
 #
 if __name__ == '__main__':
@@ -239,6 +406,10 @@ if __name__ == '__main__':
     tc.test_init()
     tc.test_exec_output()
     tc.test_start()
+    tc.test_transports()
+    tc.test_ipc_endpoints()
+    tc.test_workers()
+    tc.test_workers_stop()
     tc.test_zmq()
     tc.test_server_class()
 